@@ -0,0 +1,298 @@
+"""
+Async front end for the scoring routes.
+
+Connections and body reads stay on the event loop, so slow or idle clients
+cost a coroutine rather than a thread. The blocking parts are handed off:
+the token's user lookup, body decompression and JSON parsing (up to
+MAX_DECOMPRESSED_BYTES of CPU work) go to a small DB pool, and encoding
+plus scoring go to a bounded inference pool. One process can therefore hold
+thousands of open connections while at most SENTINEL_INFERENCE_WORKERS
+encodes run at once.
+
+    uvicorn asgi:app --port 5000
+
+Only /api/rank_jobs is served natively. Every other route -- including
+/api/rank_candidates, /api/cv_gap_analysis and /api/rank_history -- is
+forwarded to the regular Flask app through asgiref's WsgiToAsgi and behaves
+exactly as under WSGI. A signed X-Sentinel-Profile header (see
+profiling.py) profiles the native route's scoring work on its pool thread.
+"""
+import asyncio
+import json
+import os
+import time
+from urllib.parse import parse_qs
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.wsgi import WsgiToAsgi
+from werkzeug.exceptions import HTTPException
+
+from auth import TokenError, user_from_token
+from blobstore import TextRefError, resolve_text_refs
+from columnstore import history_store
+from embeddings import analysis_embeddings, refresh_serving_model
+from compression import MIN_COMPRESS_BYTES, compress, decode_body, negotiate
+from metrics import REQUEST_LATENCY
+from lexical import parse_query, parse_shortlist, shortlist_analyses
+from pipeline import parse_fields, parse_rerank, rank_analyses
+from policy import select_policy
+from profiling import PROFILE_ID_HEADER, finish_profiler, start_profiler, verify_token
+from scoring import is_debug_timing, scoring_version
+from serialization import dumps
+from timing import StageTimer
+
+INFERENCE_WORKERS = int(os.environ.get('SENTINEL_INFERENCE_WORKERS', '2'))
+# Requests allowed to wait for an inference slot before we shed load with 503.
+MAX_PENDING_INFERENCE = int(os.environ.get('SENTINEL_MAX_PENDING_INFERENCE', '64'))
+MAX_BODY_BYTES = int(os.environ.get('SENTINEL_MAX_BODY_BYTES', str(32 * 1024 * 1024)))
+
+CORS_HEADERS = [
+    (b'access-control-allow-origin', b'*'),
+    (b'access-control-allow-headers', b'Authorization, Content-Type, Content-Encoding, X-Sentinel-Profile'),
+    (b'access-control-allow-methods', b'POST, OPTIONS'),
+    (b'access-control-expose-headers', b'Server-Timing, X-Scoring-Version, X-Profile-Id'),
+]
+
+
+class HTTPError(Exception):
+    def __init__(self, status, body):
+        super().__init__(status)
+        self.status = status
+        self.body = body
+
+
+def parse_body(raw, content_encoding):
+    """The JSON request body, decompressed; runs off the event loop."""
+    body = decode_body(raw, content_encoding)
+    try:
+        return json.loads(body or b'null')
+    except ValueError:
+        raise HTTPError(400, {'message': 'Request body must be valid JSON'})
+
+
+def get_header(scope, name):
+    for key, value in scope['headers']:
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+
+async def read_body(receive, limit=MAX_BODY_BYTES):
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise ConnectionResetError('client went away')
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > limit:
+            raise HTTPError(413, {'message': 'Request body too large'})
+        chunks.append(chunk)
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+
+async def send_json(send, status, payload, extra_headers=(), accept_encoding=None, timer=None):
+    headers = [(b'content-type', b'application/json'), (b'vary', b'Accept-Encoding')]
+    if timer is not None:
+        with timer.stage('serialize'):
+            body = dumps(payload)
+        headers.append((b'server-timing', timer.header().encode('latin-1')))
+        headers.append((b'timing-allow-origin', b'*'))
+    else:
+        body = dumps(payload)
+    encoding = negotiate(accept_encoding) if 200 <= status < 300 else None
+    if encoding is not None and len(body) >= MIN_COMPRESS_BYTES:
+        body = compress(body, encoding)
+        headers.append((b'content-encoding', encoding.encode('ascii')))
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            *headers,
+            (b'content-length', str(len(body)).encode('ascii')),
+            *CORS_HEADERS,
+            *extra_headers,
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+class AsyncScoringApp:
+    """ASGI application serving the scoring routes natively."""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.db_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='sentinel-db')
+        self.inference_pool = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS,
+                                                 thread_name_prefix='sentinel-infer')
+        self._pending = None
+        self.routes = {
+            '/api/rank_jobs': self.rank_jobs,
+        }
+        self.fallback = WsgiToAsgi(flask_app)
+
+    def _lookup_user(self, header):
+        with self.flask_app.app_context():
+            user = user_from_token(header)
+            return user.id, user.profession
+
+    async def authenticate(self, scope):
+        header = get_header(scope, b'authorization')
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self.db_pool, self._lookup_user, header)
+        except TokenError as e:
+            raise HTTPError(401, e.to_dict())
+
+    def _resolve_refs(self, user_id, analyses):
+        with self.flask_app.app_context():
+            try:
+                analyses, missing = resolve_text_refs(user_id, analyses)
+            except TextRefError as e:
+                raise HTTPError(400, {'message': str(e)})
+            if missing:
+                return analyses, missing, None
+            return analyses, missing, refresh_serving_model()
+
+    def _score(self, analyses, profession, fields, timer, rerank_k, policy, user_id, query, shortlist):
+        # Same steps as the WSGI route: the optional lexical shortlist, then
+        # stored embeddings are loaded and the missing ones encoded and
+        # saved, all on the inference pool.
+        with self.flask_app.app_context():
+            lexical_scores = None
+            if query:
+                with timer.stage('lexical'):
+                    analyses, lexical_scores = shortlist_analyses(user_id, analyses, query, shortlist)
+            with timer.stage('embeddings'):
+                embeddings = analysis_embeddings(analyses)
+            return rank_analyses(analyses, profession, fields, timer, rerank_k, embeddings, policy,
+                                 history_store(user_id), lexical_scores)
+
+    def _profiled(self, mode, fn, *args):
+        profiler = start_profiler(mode)
+        try:
+            result = fn(*args)
+        finally:
+            profile_id = finish_profiler(self.flask_app, mode, profiler)
+        return result, profile_id
+
+    def profile_mode(self, scope):
+        secret = self.flask_app.config.get('PROFILE_SECRET')
+        token = get_header(scope, b'x-sentinel-profile')
+        if not secret or not token:
+            return None
+        return verify_token(secret, token, scope['path'])
+
+    async def run_inference(self, fn, *args):
+        # The semaphore is created lazily so it binds to the server's loop.
+        if self._pending is None:
+            self._pending = asyncio.Semaphore(MAX_PENDING_INFERENCE)
+        if self._pending.locked():
+            raise HTTPError(503, {'message': 'Scoring is at capacity, retry shortly'})
+        async with self._pending:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.inference_pool, fn, *args)
+
+    # --- Routes ---
+    async def rank_jobs(self, scope, receive, send):
+        query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        timer = StageTimer(debug=is_debug_timing(query.get('debug', [''])[0]))
+
+        with timer.stage('auth'):
+            user_id, profession = await self.authenticate(scope)
+        raw = await read_body(receive)
+        loop = asyncio.get_running_loop()
+        with timer.stage('decode'):
+            data = await loop.run_in_executor(self.db_pool, parse_body, raw,
+                                              get_header(scope, b'content-encoding'))
+        data = data or {}
+        if not isinstance(data, dict):
+            raise HTTPError(400, {'message': 'Request body must be a JSON object'})
+        analyses = data.get('analyses', [])
+        fields = parse_fields(query['fields'][0] if 'fields' in query else data.get('fields'))
+        rerank_k = parse_rerank(query['rerank'][0] if 'rerank' in query else data.get('rerank'))
+        search = parse_query(query['q'][0] if 'q' in query else data.get('query'))
+        shortlist = parse_shortlist(query['shortlist'][0] if 'shortlist' in query else data.get('shortlist'))
+
+        if not analyses:
+            await send_json(send, 200, [], timer=timer)
+            return
+
+        analyses, missing, model = await loop.run_in_executor(self.db_pool, self._resolve_refs, user_id,
+                                                             analyses)
+        if missing:
+            await send_json(send, 409, {'message': 'Unknown text hashes', 'missing': missing}, timer=timer)
+            return
+
+        policy = select_policy(user_id)
+        args = (analyses, profession, fields, timer, rerank_k, policy, user_id, search, shortlist)
+        version = scoring_version(model, policy.version)
+        headers = [(b'x-scoring-version', version.encode('latin-1'))]
+        mode = self.profile_mode(scope)
+        if mode is None:
+            results = await self.run_inference(self._score, *args)
+        else:
+            results, profile_id = await self.run_inference(self._profiled, mode, self._score, *args)
+            headers.append((PROFILE_ID_HEADER.lower().encode('latin-1'), profile_id.encode('latin-1')))
+        await send_json(send, 200, results, headers,
+                        accept_encoding=get_header(scope, b'accept-encoding'), timer=timer)
+
+    # --- ASGI entry point ---
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+
+        handler = self.routes.get(scope['path']) if scope['type'] == 'http' else None
+        if handler is None:
+            await self.fallback(scope, receive, send)
+            return
+
+        if scope['method'] == 'OPTIONS':
+            await send({'type': 'http.response.start', 'status': 204, 'headers': CORS_HEADERS})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        if scope['method'] != 'POST':
+            await send_json(send, 405, {'message': 'Method not allowed'})
+            return
+
+        started = time.perf_counter()
+        status = {'code': 500}
+
+        async def send_and_record(message):
+            if message['type'] == 'http.response.start':
+                status['code'] = message['status']
+            await send(message)
+
+        try:
+            await handler(scope, receive, send_and_record)
+        except HTTPError as e:
+            await send_json(send_and_record, e.status, e.body)
+        except HTTPException as e:
+            await send_json(send_and_record, e.code, {'message': e.description})
+        except ConnectionResetError:
+            pass
+        finally:
+            REQUEST_LATENCY.observe(time.perf_counter() - started, route=scope['path'],
+                                    method=scope['method'], status=status['code'])
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.inference_pool.shutdown(wait=False, cancel_futures=True)
+                self.db_pool.shutdown(wait=False, cancel_futures=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def create_asgi_app(role='scoring'):
+    from app import create_app
+    return AsyncScoringApp(create_app(role))
+
+
+app = create_asgi_app(os.environ.get('SENTINEL_ROLE', 'scoring'))
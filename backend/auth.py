@@ -0,0 +1,222 @@
+from flask import Blueprint, current_app, g, request, jsonify
+from werkzeug.security import generate_password_hash, check_password_hash
+import jwt
+import datetime
+import time
+from functools import wraps
+
+from extensions import db
+from models import User, get_user_count
+
+auth_bp = Blueprint('auth', __name__)
+
+# --- Helper: Token Decorator ---
+class TokenError(Exception):
+    def __init__(self, message, error=None):
+        super().__init__(message)
+        self.message = message
+        self.error = error
+
+    def to_dict(self):
+        body = {'message': self.message}
+        if self.error is not None:
+            body['error'] = self.error
+        return body
+
+
+def user_from_token(token):
+    """Resolves an Authorization header value to a User, or raises TokenError."""
+    if not token:
+        raise TokenError('Token is missing')
+
+    try:
+        if token.startswith('Bearer '):
+            token = token[7:]
+        data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
+        current_user = User.query.filter_by(email=data['email']).first()
+    except Exception as e:
+        raise TokenError('Token is invalid', str(e))
+
+    if not current_user:
+        raise TokenError('User not found')
+    return current_user
+
+
+def token_required(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            current_user = user_from_token(request.headers.get('Authorization'))
+        except TokenError as e:
+            return jsonify(e.to_dict()), 401
+        finally:
+            # Picked up by the scoring routes' Server-Timing header.
+            g.auth_duration = time.perf_counter() - started
+
+        return f(current_user, *args, **kwargs)
+
+    return decorated
+
+# ============================================================================
+# AUTH ROUTES
+# ============================================================================
+
+@auth_bp.route('/api/signup', methods=['POST'])
+def signup():
+    data = request.get_json()
+
+    if not data or not data.get('email') or not data.get('password') or not data.get('name'):
+        return jsonify({'message': 'Name, email, and password are required'}), 400
+
+    name = data.get('name')
+    email = data.get('email').lower().strip()
+    password = data.get('password')
+    profession = data.get('profession', '').strip()
+
+    if '@' not in email or '.' not in email:
+        return jsonify({'message': 'Invalid email format'}), 400
+
+    if len(password) < 6:
+        return jsonify({'message': 'Password must be at least 6 characters long'}), 400
+
+    existing_user = User.query.filter_by(email=email).first()
+    if existing_user:
+        return jsonify({'message': 'Email already registered'}), 409
+
+    try:
+        new_user = User(
+            name=name,
+            email=email,
+            password=generate_password_hash(password),
+            profession=profession if profession else None
+        )
+        db.session.add(new_user)
+        db.session.commit()
+
+        token = jwt.encode({
+            'email': email,
+            'name': name,
+            'user_id': new_user.id,
+            'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=24)
+        }, current_app.config['SECRET_KEY'], algorithm='HS256')
+
+        return jsonify({
+            'message': 'Account created successfully',
+            'token': token,
+            'user': {
+                'id': new_user.id,
+                'email': email,
+                'name': name,
+                'profession': profession,
+                'created_at': new_user.created_at.isoformat()
+            }
+        }), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'An error occurred during signup'}), 500
+
+
+@auth_bp.route('/api/login', methods=['POST'])
+def login():
+    data = request.get_json()
+
+    if not data or not data.get('email') or not data.get('password'):
+        return jsonify({'message': 'Email and password are required'}), 400
+
+    email = data.get('email').lower().strip()
+    password = data.get('password')
+
+    user = User.query.filter_by(email=email).first()
+
+    if user and check_password_hash(user.password, password):
+        token = jwt.encode({
+            'email': email,
+            'name': user.name,
+            'user_id': user.id,
+            'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=24)
+        }, current_app.config['SECRET_KEY'], algorithm='HS256')
+
+        return jsonify({
+            'message': 'Login successful',
+            'token': token,
+            'user': {
+                'id': user.id,
+                'email': email,
+                'name': user.name,
+                'profession': user.profession,
+                'created_at': user.created_at.isoformat()
+            }
+        }), 200
+
+    return jsonify({'message': 'Invalid email or password'}), 401
+
+
+@auth_bp.route('/api/verify', methods=['GET'])
+@token_required
+def verify(current_user):
+    return jsonify({
+        'message': 'Token is valid',
+        'user': {
+            'id': current_user.id,
+            'email': current_user.email,
+            'name': current_user.name,
+            'profession': current_user.profession
+        }
+    }), 200
+
+
+@auth_bp.route('/api/user', methods=['GET'])
+@token_required
+def get_user(current_user):
+    return jsonify({
+        'user': {
+            'id': current_user.id,
+            'name': current_user.name,
+            'email': current_user.email,
+            'profession': current_user.profession,
+            'created_at': current_user.created_at.isoformat()
+        }
+    }), 200
+
+
+@auth_bp.route('/api/user', methods=['PUT'])
+@token_required
+def update_user(current_user):
+    data = request.get_json()
+
+    if data.get('name'):
+        current_user.name = data.get('name')
+
+    if data.get('profession') is not None:
+        current_user.profession = data.get('profession')
+
+    try:
+        db.session.commit()
+        return jsonify({
+            'message': 'User updated successfully',
+            'user': {
+                'id': current_user.id,
+                'name': current_user.name,
+                'email': current_user.email,
+                'profession': current_user.profession
+            }
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'An error occurred during update'}), 500
+
+
+@auth_bp.route('/api/protected', methods=['GET'])
+@token_required
+def protected(current_user):
+    return jsonify({
+        'message': 'This is a protected route',
+        'data': 'Secret data',
+        'user': current_user.name
+    }), 200
+
+
+@auth_bp.route('/api/users/count', methods=['GET'])
+def user_count():
+    return jsonify({'count': get_user_count()}), 200
@@ -0,0 +1,215 @@
+"""
+Offline batch scoring of job-posting dumps.
+
+    cd backend
+    python batch.py postings.jsonl scored.jsonl --profession "Data Scientist" \\
+        --resume resume.txt --workers 8
+
+Streams a JSONL or CSV file of postings, scores them with the same pipeline
+as /api/rank_jobs (pipeline.rank_analyses) across a process pool, and
+writes results to a JSONL file chunk by chunk, in input order. Each chunk's
+texts are encoded in batches, not one posting at a time.
+
+Each posting needs `jobDescription` (or `description` / `text`) and
+optionally `id` (defaults to the row number) and classifier output:
+`confidence` in the API's shape, or a `real_confidence` column between 0 and
+1. Postings without one score as unsafe, exactly as the API would.
+
+Progress is checkpointed in <output>.ckpt after every chunk. Re-running the
+same command after an interruption truncates any half-written tail and
+continues from the first unscored row; without a checkpoint (or with
+--restart) an existing output file is overwritten. No Flask, database or
+JWT involved.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from pipeline import DEFAULT_FIELDS, parse_fields
+from policy import POLICIES, get_policy
+
+TEXT_COLUMNS = ('jobDescription', 'description', 'text')
+# Private key a posting's position in its chunk travels under.
+INPUT_INDEX = '_batch_index'
+
+
+# --- Input ---
+def _posting(row, index):
+    text = next((row[c] for c in TEXT_COLUMNS if row.get(c)), '')
+    item = {'id': row.get('id') if row.get('id') not in (None, '') else index,
+            'jobDescription': text}
+    confidence = row.get('confidence')
+    if isinstance(confidence, str) and confidence.startswith('{'):
+        confidence = json.loads(confidence)
+    if confidence is None and row.get('real_confidence') not in (None, ''):
+        confidence = {'confidences': [{'label': 'REAL', 'confidence': float(row['real_confidence'])}]}
+    if confidence is not None:
+        item['confidence'] = confidence
+    return item
+
+
+def read_postings(path, fmt, skip=0):
+    """Yields postings lazily, skipping the first `skip` rows."""
+    with open(path, newline='', encoding='utf-8') as fh:
+        if fmt == 'csv':
+            csv.field_size_limit(2 ** 31 - 1)
+            rows = csv.DictReader(fh)
+        else:
+            rows = (json.loads(line) for line in fh if line.strip())
+        for index, row in enumerate(rows):
+            if index >= skip:
+                yield _posting(row, index)
+
+
+def chunked(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# --- Checkpointing ---
+def load_checkpoint(output_path):
+    """Returns (rows_done, byte_offset) of the last completed chunk."""
+    try:
+        with open(output_path + '.ckpt') as fh:
+            state = json.load(fh)
+        return state['rows'], state['offset']
+    except (OSError, ValueError, KeyError):
+        return 0, 0
+
+
+def save_checkpoint(output_path, rows, offset):
+    tmp = output_path + '.ckpt.tmp'
+    with open(tmp, 'w') as fh:
+        json.dump({'rows': rows, 'offset': offset}, fh)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, output_path + '.ckpt')
+
+
+# --- Workers ---
+_worker_state = {}
+
+
+def _init_worker(profession, resume_text, fields, torch_threads, policy_version):
+    import nlp
+    nlp.get_nlp_model()
+    torch = sys.modules.get('torch')
+    if torch is not None:
+        torch.set_num_threads(torch_threads)
+    _worker_state.update(profession=profession, resume_text=resume_text, fields=fields,
+                         policy=get_policy(policy_version))
+
+
+def _score_chunk(chunk):
+    from pipeline import rank_analyses
+
+    # rank_analyses sorts, and ids may be missing from `fields` or repeated,
+    # so each posting carries its place in the chunk to restore input order.
+    resume_text = _worker_state['resume_text']
+    extra = {'resumeText': resume_text} if resume_text else {}
+    chunk = [{**item, **extra, INPUT_INDEX: i} for i, item in enumerate(chunk)]
+    fields = _worker_state['fields']
+    if fields is not None:
+        fields = fields + (INPUT_INDEX,)
+    ranked = rank_analyses(chunk, _worker_state['profession'], fields,
+                           policy=_worker_state['policy'])
+    ranked.sort(key=lambda row: row[INPUT_INDEX])
+    for row in ranked:
+        del row[INPUT_INDEX]
+    return len(chunk), ranked
+
+
+# --- Main ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('input', help='JSONL or CSV file of postings.')
+    parser.add_argument('output', help='JSONL file to write results to; overwritten unless resuming '
+                                       'from its checkpoint.')
+    parser.add_argument('--format', choices=('jsonl', 'csv'), default=None,
+                        help='Input format (default: from the file extension).')
+    parser.add_argument('--profession', required=True)
+    parser.add_argument('--resume', help='Plain-text resume to compute CV match against.')
+    parser.add_argument('--fields', default=','.join(DEFAULT_FIELDS),
+                        help="Output fields, as for rank_jobs' ?fields= ('*' for everything).")
+    parser.add_argument('--policy', default=None,
+                        help='Scoring policy version (default: the configured default, see policy.py).')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=int, default=256)
+    parser.add_argument('--torch-threads', type=int, default=None,
+                        help='Intra-op threads per worker (default: cores / workers).')
+    parser.add_argument('--report-interval', type=float, default=10.0)
+    parser.add_argument('--restart', action='store_true', help='Ignore any checkpoint and start over.')
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ('csv' if args.input.lower().endswith('.csv') else 'jsonl')
+    fields = parse_fields(args.fields)
+    if args.policy is not None and args.policy not in POLICIES:
+        parser.error(f"unknown policy {args.policy!r} (known: {', '.join(sorted(POLICIES))})")
+    resume_text = None
+    if args.resume:
+        with open(args.resume, encoding='utf-8') as fh:
+            resume_text = fh.read()
+    torch_threads = args.torch_threads or max(1, (os.cpu_count() or 1) // args.workers)
+
+    done, offset = (0, 0) if args.restart else load_checkpoint(args.output)
+    out = open(args.output, 'r+b' if os.path.exists(args.output) else 'wb')
+    out.truncate(offset)  # drop rows written after the last checkpoint
+    out.seek(offset)
+    if done:
+        print(f"[batch] resuming after {done} rows")
+
+    started = time.monotonic()
+    next_report = started + args.report_interval
+    scored = 0
+    in_flight = deque()
+    chunks = chunked(read_postings(args.input, fmt, skip=done), args.chunk_size)
+
+    with ProcessPoolExecutor(args.workers, initializer=_init_worker,
+                             initargs=(args.profession, resume_text, fields, torch_threads,
+                                       args.policy)) as pool:
+        exhausted = False
+        while in_flight or not exhausted:
+            # Keep a bounded window of chunks queued so a 1M-row dump is
+            # never held in memory at once.
+            while not exhausted and len(in_flight) < args.workers * 2:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                else:
+                    in_flight.append(pool.submit(_score_chunk, chunk))
+            if not in_flight:
+                break
+
+            rows, results = in_flight.popleft().result()
+            out.write(b''.join(json.dumps(r).encode('utf-8') + b'\n' for r in results))
+            out.flush()
+            os.fsync(out.fileno())
+            done += rows
+            scored += rows
+            save_checkpoint(args.output, done, out.tell())
+
+            now = time.monotonic()
+            if now >= next_report:
+                print(f"[batch] {done} rows done, {scored / (now - started):.1f} rows/s")
+                next_report = now + args.report_interval
+
+    out.close()
+    elapsed = time.monotonic() - started
+    rate = scored / elapsed if elapsed else 0.0
+    print(f"[batch] finished: {scored} rows scored this run ({done} total) "
+          f"in {elapsed:.1f}s, {rate:.1f} rows/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Compare two benchmark result files.
+
+    python -m benchmarks.compare base.json head.json [--threshold 10]
+
+Prints the p50 latency change for every (backend, batch size, cache) row and
+exits non-zero if any row regressed by more than the threshold percent.
+"""
+import argparse
+import json
+import sys
+
+
+def load_rows(path):
+    with open(path) as fh:
+        report = json.load(fh)
+    rows = {}
+    for backend in report['backends']:
+        for row in backend['results']:
+            rows[(backend['backend'], row['batch_size'], row['cache'])] = row
+    return report, rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('base')
+    parser.add_argument('head')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='Percent p50 slowdown that counts as a regression.')
+    args = parser.parse_args(argv)
+
+    base_report, base = load_rows(args.base)
+    head_report, head = load_rows(args.head)
+    print(f"base {base_report['commit']}  ->  head {head_report['commit']}")
+    print(f"{'backend':<9} {'batch':>6} {'cache':<5} {'base p50':>11} {'head p50':>11} {'change':>8}")
+
+    regressions = 0
+    for key in sorted(base.keys() & head.keys()):
+        before = base[key]['latency_ms']['p50']
+        after = head[key]['latency_ms']['p50']
+        change = (after - before) / before * 100 if before else 0.0
+        flag = ''
+        if change > args.threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        print(f"{key[0]:<9} {key[1]:>6} {key[2]:<5} {before:>9.1f}ms {after:>9.1f}ms {change:>+7.1f}%{flag}")
+
+    for key in sorted(base.keys() ^ head.keys()):
+        print(f"{key[0]:<9} {key[1]:>6} {key[2]:<5} only in {'base' if key in base else 'head'}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Deterministic synthetic corpora for benchmarking the scoring pipeline.
+
+Everything is drawn from a seeded random.Random, so the same seed always
+yields byte-identical job descriptions, resumes and professions -- results
+from different commits are comparable.
+"""
+import random
+
+PROFESSIONS = [
+    'Software Engineer', 'Data Scientist', 'Nurse', 'Accountant', 'Graphic Designer',
+    'Mechanical Engineer', 'Teacher', 'Sales Manager', 'DevOps Engineer', 'Student',
+]
+
+SKILLS = {
+    'Software Engineer': ['Python', 'Java', 'REST APIs', 'microservices', 'Git', 'SQL', 'Docker'],
+    'Data Scientist': ['Python', 'pandas', 'machine learning', 'statistics', 'SQL', 'PyTorch'],
+    'Nurse': ['patient care', 'BLS certification', 'medication administration', 'EHR systems'],
+    'Accountant': ['GAAP', 'financial reporting', 'Excel', 'reconciliation', 'auditing'],
+    'Graphic Designer': ['Adobe Illustrator', 'Figma', 'typography', 'branding', 'Photoshop'],
+    'Mechanical Engineer': ['CAD', 'SolidWorks', 'thermodynamics', 'FEA', 'prototyping'],
+    'Teacher': ['lesson planning', 'classroom management', 'curriculum design', 'assessment'],
+    'Sales Manager': ['CRM', 'pipeline management', 'negotiation', 'forecasting', 'B2B sales'],
+    'DevOps Engineer': ['Kubernetes', 'Terraform', 'CI/CD', 'AWS', 'monitoring', 'Linux'],
+    'Student': ['teamwork', 'communication', 'Microsoft Office', 'research'],
+}
+
+# Mirrors the red-flag phrases the frontend safety net looks for.
+SCAM_PHRASES = [
+    'pay for training', 'registration fee', 'contact us on telegram', 'bitcoin',
+    'personal bank account', 'confirmation within 24 hours', 'kindly send',
+    'cash app', 'package inspection', 'training kit',
+]
+
+FILLER = [
+    'We are a fast-growing company looking for motivated people.',
+    'You will collaborate with cross-functional teams across several time zones.',
+    'The role offers competitive compensation and flexible working hours.',
+    'Our culture values ownership, curiosity and continuous learning.',
+    'You will report to the team lead and take part in planning sessions.',
+    'We offer health insurance, paid leave and a learning budget.',
+    'Candidates should be comfortable working in a dynamic environment.',
+    'The position is based in our main office with hybrid options.',
+]
+
+# Approximate sentence counts per job-description length class.
+LENGTHS = {'short': 3, 'medium': 12, 'long': 40}
+
+
+def job_description(rng, profession, length='medium', scam=False):
+    skills = SKILLS[profession]
+    sentences = [f"We are hiring a {profession} to join our team."]
+    for _ in range(LENGTHS[length]):
+        if rng.random() < 0.4:
+            picked = rng.sample(skills, k=min(2, len(skills)))
+            sentences.append(f"Experience with {picked[0]} and {picked[-1]} is required.")
+        else:
+            sentences.append(rng.choice(FILLER))
+    if scam:
+        for phrase in rng.sample(SCAM_PHRASES, k=2):
+            sentences.insert(rng.randrange(1, len(sentences) + 1), f"Please note: {phrase}.")
+    return ' '.join(sentences)
+
+
+def resume(rng, profession, sections=6):
+    skills = SKILLS[profession]
+    lines = [f"{profession} with {rng.randint(1, 12)} years of experience."]
+    for _ in range(sections):
+        skill = rng.choice(skills)
+        lines.append(f"Delivered projects using {skill}; {rng.choice(FILLER).lower()}")
+    lines.append('Skills: ' + ', '.join(rng.sample(skills, k=min(4, len(skills)))))
+    return '\n'.join(lines)
+
+
+def confidence(rng, scam):
+    real = rng.uniform(0.01, 0.3) if scam else rng.uniform(0.55, 0.99)
+    label = 'Real' if real >= 0.5 else 'Fake'
+    return {
+        'label': label,
+        'confidences': [
+            {'label': 'Real', 'confidence': round(real, 4)},
+            {'label': 'Fake', 'confidence': round(1 - real, 4)},
+        ],
+    }
+
+
+def analyses(n, seed=0, scam_ratio=0.2, with_resume=True, length_mix=('short', 'medium', 'long')):
+    """
+    Returns n analysis dicts shaped like the client's rank_jobs payload, plus
+    the profession they should be ranked for.
+    """
+    rng = random.Random(seed)
+    user_profession = rng.choice(PROFESSIONS)
+    cv = resume(rng, user_profession) if with_resume else None
+    items = []
+    for i in range(n):
+        # Two thirds of postings are in the user's field, the rest elsewhere.
+        profession = user_profession if rng.random() < 0.66 else rng.choice(PROFESSIONS)
+        scam = rng.random() < scam_ratio
+        items.append({
+            'id': i,
+            'jobDescription': job_description(rng, profession, rng.choice(length_mix), scam),
+            'resumeText': cv,
+            'confidence': confidence(rng, scam),
+        })
+    return user_profession, items
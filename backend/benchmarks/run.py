@@ -0,0 +1,165 @@
+"""
+Ranking pipeline benchmarks.
+
+    cd backend
+    python -m benchmarks.run                                  # defaults
+    python -m benchmarks.run --batch-sizes 1,10,100 --backends torch,onnx
+    python -m benchmarks.compare benchmarks/results/A.json benchmarks/results/B.json
+
+For every inference backend and batch size, the same deterministic corpus is
+ranked once with cold caches and then `--repeats` times warm. Results are
+written as JSON (one file per run, named after the commit) so they can be
+diffed across commits with benchmarks.compare.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import corpus
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def reset_caches():
+    """Empties every in-process cache the ranking path can hit."""
+    import blobstore
+    import requirement_coverage
+    import skills
+    blobstore.clear_text_cache()
+    requirement_coverage.clear_chunk_cache()
+    skills.clear_skill_cache()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies, batch_size):
+    return {
+        'runs': len(latencies),
+        'latency_ms': {
+            'min': round(min(latencies) * 1000, 3),
+            'p50': round(statistics.median(latencies) * 1000, 3),
+            'p95': round(percentile(latencies, 95) * 1000, 3),
+            'max': round(max(latencies) * 1000, 3),
+        },
+        'items_per_s': round(batch_size / statistics.median(latencies), 2),
+    }
+
+
+def run_backend(args):
+    """Benchmarks whichever backend this process was started with."""
+    import nlp
+    from pipeline import rank_analyses
+
+    started = time.perf_counter()
+    nlp.get_nlp_model()
+    model_load_s = time.perf_counter() - started
+
+    results = []
+    for batch_size in args.batch_sizes:
+        profession, items = corpus.analyses(batch_size, seed=args.seed, scam_ratio=args.scam_ratio)
+
+        reset_caches()
+        started = time.perf_counter()
+        rank_analyses(items, profession)
+        cold = [time.perf_counter() - started]
+
+        warm = []
+        for _ in range(args.repeats):
+            started = time.perf_counter()
+            rank_analyses(items, profession)
+            warm.append(time.perf_counter() - started)
+
+        for cache, latencies in (('cold', cold), ('warm', warm)):
+            row = {'batch_size': batch_size, 'cache': cache, **summarize(latencies, batch_size)}
+            results.append(row)
+            print(f"[bench] {nlp.NLP_BACKEND:<8} n={batch_size:<5} {cache:<4} "
+                  f"p50={row['latency_ms']['p50']:>10.1f} ms  {row['items_per_s']:>9.1f} items/s",
+                  file=sys.stderr)
+
+    return {'backend': nlp.NLP_BACKEND, 'model': nlp.MODEL_NAME,
+            'model_load_s': round(model_load_s, 3), 'results': results}
+
+
+def run_in_subprocess(backend, args):
+    # The child reports through a file, not stdout: model loading and
+    # library warnings print there.
+    env = dict(os.environ, SENTINEL_NLP_BACKEND=backend)
+    fd, result_path = tempfile.mkstemp(prefix='sentinel-bench-', suffix='.json')
+    os.close(fd)
+    try:
+        command = [sys.executable, '-m', 'benchmarks.run', '--child', result_path,
+                   '--batch-sizes', ','.join(map(str, args.batch_sizes)),
+                   '--repeats', str(args.repeats), '--seed', str(args.seed),
+                   '--scam-ratio', str(args.scam_ratio)]
+        subprocess.check_call(command, env=env)
+        with open(result_path) as fh:
+            return json.load(fh)
+    finally:
+        os.unlink(result_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the job ranking pipeline.')
+    parser.add_argument('--batch-sizes', default='1,10,100,1000',
+                        type=lambda s: [int(x) for x in s.split(',')])
+    parser.add_argument('--backends', default=os.environ.get('SENTINEL_NLP_BACKEND', 'torch'),
+                        type=lambda s: s.split(','))
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--scam-ratio', type=float, default=0.2)
+    parser.add_argument('--out', default=RESULTS_DIR, help='Directory for the JSON result file.')
+    parser.add_argument('--child', metavar='RESULT_PATH', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        result = run_backend(args)
+        with open(args.child, 'w') as fh:
+            json.dump(result, fh)
+        return
+
+    # Each backend gets a fresh process: the model is a per-process singleton
+    # and a cold start is part of what we measure.
+    backends = [run_in_subprocess(backend, args) for backend in args.backends]
+
+    commit = git_commit()
+    report = {
+        'commit': commit,
+        'timestamp': datetime.datetime.utcnow().isoformat() + 'Z',
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'seed': args.seed,
+        'repeats': args.repeats,
+        'backends': backends,
+    }
+
+    os.makedirs(args.out, exist_ok=True)
+    stamp = datetime.datetime.utcnow().strftime('%Y%m%dT%H%M%S')
+    path = os.path.join(args.out, f"{commit}-{stamp}.json")
+    with open(path, 'w') as fh:
+        json.dump(report, fh, indent=2)
+    print(f"[bench] results written to {path}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
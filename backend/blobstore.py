@@ -0,0 +1,286 @@
+"""
+Content-addressed text store.
+
+Clients upload each job description / resume once and afterwards refer to it
+by SHA-256 (`jd_hash`, `resume_hash`) inside rank_jobs analyses, so repeat
+ranking requests carry hashes instead of documents.
+
+Texts are stored zstd-compressed (zlib when `zstandard` is not installed) and
+reference-counted per user. A user can only resolve hashes they hold a
+BlobRef for, however many other users stored the same text, so a hash is
+never a way to read (or probe for) somebody else's documents. Because a hash
+always names the same bytes, decoded texts are cached in-process by hash;
+the ownership check runs on every lookup, cached or not.
+"""
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+
+from flask import Blueprint, request, jsonify
+
+from auth import token_required
+from extensions import db
+from metrics import cache_lookup
+from models import BLOB_KINDS, Blob, BlobRef, Embedding
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+blobs_bp = Blueprint('blobs', __name__)
+
+MAX_HASHES_PER_REQUEST = 10000
+TEXT_CACHE_SIZE = 2048
+ZSTD_LEVEL = 6
+
+# Analysis keys that may be sent as a hash reference instead of inline text.
+TEXT_REFS = {
+    'jd_hash': 'jobDescription',
+    'resume_hash': 'resumeText',
+}
+
+
+def hash_text(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _is_sha256(value):
+    return isinstance(value, str) and len(value) == 64 and all(c in '0123456789abcdef' for c in value)
+
+
+class TextRefError(ValueError):
+    """A `jd_hash` / `resume_hash` that is not a SHA-256 hex digest (client error, 400)."""
+
+
+def check_ref(ref_key, value):
+    """Raises TextRefError unless `value`, sent as `ref_key`, is a SHA-256 hex digest."""
+    if not _is_sha256(value):
+        raise TextRefError(f'{ref_key} must be a lowercase SHA-256 hex digest')
+
+
+# --- Codec ---
+def encode_text(text):
+    raw = text.encode('utf-8')
+    if zstandard is not None:
+        return 'zstd', raw, zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    return 'zlib', raw, zlib.compress(raw, 6)
+
+
+def decode_blob(codec, data):
+    if codec == 'zstd':
+        return zstandard.ZstdDecompressor().decompress(data).decode('utf-8')
+    if codec == 'zlib':
+        return zlib.decompress(data).decode('utf-8')
+    return data.decode('utf-8')
+
+
+# --- Decoded Text Cache ---
+_text_cache = OrderedDict()
+_text_cache_lock = threading.Lock()
+
+
+def _cache_get(sha):
+    with _text_cache_lock:
+        text = _text_cache.get(sha)
+        if text is not None:
+            _text_cache.move_to_end(sha)
+    cache_lookup('blob_text', text is not None)
+    return text
+
+
+def _cache_put(sha, text):
+    with _text_cache_lock:
+        _text_cache[sha] = text
+        _text_cache.move_to_end(sha)
+        while len(_text_cache) > TEXT_CACHE_SIZE:
+            _text_cache.popitem(last=False)
+
+
+def _cache_evict(sha):
+    with _text_cache_lock:
+        _text_cache.pop(sha, None)
+
+
+def clear_text_cache():
+    with _text_cache_lock:
+        _text_cache.clear()
+
+
+# --- Store Operations ---
+def put_text(user_id, text, kind=None):
+    """
+    Stores `text` (if new) and records a reference from the user, as `kind`
+    (one of BLOB_KINDS, or None if unknown). Returns its hash. Nothing is
+    cached until the caller's commit succeeds (cache_texts()).
+    """
+    sha = hash_text(text)
+    blob = db.session.get(Blob, sha)
+    if blob is None:
+        codec, raw, data = encode_text(text)
+        blob = Blob(sha256=sha, codec=codec, size=len(raw), data=data, refcount=0)
+        db.session.add(blob)
+    ref = db.session.get(BlobRef, (user_id, sha))
+    if ref is None:
+        db.session.add(BlobRef(user_id=user_id, sha256=sha, kind=kind))
+        blob.refcount += 1
+    elif kind is not None and ref.kind is None:
+        ref.kind = kind
+    return sha
+
+
+def cache_texts(texts):
+    """Caches committed texts, {sha: text}."""
+    for sha, text in texts.items():
+        _cache_put(sha, text)
+
+
+def release_text(user_id, sha):
+    """Drops the user's reference; the blob is deleted with its last reference."""
+    ref = db.session.get(BlobRef, (user_id, sha))
+    if ref is None:
+        return False
+    blob = db.session.get(Blob, sha)
+    db.session.delete(ref)
+    _cache_evict(sha)
+    if blob is not None:
+        blob.refcount -= 1
+        if blob.refcount <= 0:
+            db.session.delete(blob)
+            Embedding.query.filter_by(sha256=sha).delete(synchronize_session=False)
+    return True
+
+
+def owned_hashes(user_id, hashes):
+    """The subset of `hashes` the user holds a reference to."""
+    wanted = {h for h in hashes if _is_sha256(h)}
+    if not wanted:
+        return set()
+    return {sha for (sha,) in db.session.query(BlobRef.sha256)
+            .filter(BlobRef.user_id == user_id, BlobRef.sha256.in_(wanted))}
+
+
+def find_missing(user_id, hashes):
+    """Hashes among `hashes` the user has not stored (and so must upload)."""
+    wanted = {h for h in hashes if _is_sha256(h)}
+    return sorted(wanted - owned_hashes(user_id, wanted))
+
+
+def get_texts(user_id, hashes):
+    """Returns {sha: text} for every hash among `hashes` the user has stored."""
+    return load_texts(owned_hashes(user_id, hashes))
+
+
+def load_texts(hashes):
+    """
+    {sha: text} for every stored hash, whoever stored it. Only for callers
+    that are not serving a user's lookup (e.g. the embedding migrator);
+    request handlers use get_texts().
+    """
+    found = {}
+    to_load = set()
+    for sha in set(hashes):
+        text = _cache_get(sha)
+        if text is not None:
+            found[sha] = text
+        else:
+            to_load.add(sha)
+    if to_load:
+        for blob in Blob.query.filter(Blob.sha256.in_(to_load)):
+            text = decode_blob(blob.codec, blob.data)
+            _cache_put(blob.sha256, text)
+            found[blob.sha256] = text
+    return found
+
+
+def resolve_text_refs(user_id, analyses):
+    """
+    Replaces `jd_hash` / `resume_hash` references with the user's stored
+    texts. Returns (resolved_analyses, missing_hashes); items without
+    references are passed through untouched. Raises TextRefError for a
+    reference that is not a SHA-256 hex digest.
+    """
+    hashes = set()
+    for item in analyses:
+        if isinstance(item, dict):
+            for ref_key in TEXT_REFS:
+                if item.get(ref_key):
+                    check_ref(ref_key, item[ref_key])
+                    hashes.add(item[ref_key])
+    if not hashes:
+        return analyses, []
+
+    texts = get_texts(user_id, hashes)
+    missing = sorted(h for h in hashes if h not in texts)
+    if missing:
+        return analyses, missing
+
+    resolved = []
+    for item in analyses:
+        if isinstance(item, dict) and any(item.get(k) for k in TEXT_REFS):
+            item = dict(item)
+            for ref_key, text_key in TEXT_REFS.items():
+                if item.get(ref_key):
+                    item[text_key] = texts[item[ref_key]]
+        resolved.append(item)
+    return resolved, []
+
+
+# ============================================================================
+# BLOB ROUTES
+# ============================================================================
+
+@blobs_bp.route('/api/blobs', methods=['POST'])
+@token_required
+def upload_blobs(current_user):
+    data = request.get_json()
+    texts = (data or {}).get('texts')
+
+    if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+        return jsonify({'message': 'texts must be a list of strings'}), 400
+    if len(texts) > MAX_HASHES_PER_REQUEST:
+        return jsonify({'message': f'At most {MAX_HASHES_PER_REQUEST} texts per request'}), 400
+    kinds = data.get('kinds') or [None] * len(texts)
+    if not isinstance(kinds, list) or len(kinds) != len(texts) or \
+            not all(k is None or k in BLOB_KINDS for k in kinds):
+        return jsonify({'message': f'kinds must list one of {BLOB_KINDS} (or null) per text'}), 400
+
+    try:
+        hashes = [put_text(current_user.id, text, kind) for text, kind in zip(texts, kinds)]
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'An error occurred while storing texts'}), 500
+    cache_texts(dict(zip(hashes, texts)))
+
+    return jsonify({'hashes': hashes}), 201
+
+
+@blobs_bp.route('/api/blobs/missing', methods=['POST'])
+@token_required
+def missing_blobs(current_user):
+    data = request.get_json()
+    hashes = (data or {}).get('hashes')
+
+    if not isinstance(hashes, list):
+        return jsonify({'message': 'hashes must be a list'}), 400
+    if len(hashes) > MAX_HASHES_PER_REQUEST:
+        return jsonify({'message': f'At most {MAX_HASHES_PER_REQUEST} hashes per request'}), 400
+
+    return jsonify({'missing': find_missing(current_user.id, hashes)}), 200
+
+
+@blobs_bp.route('/api/blobs/<sha>', methods=['DELETE'])
+@token_required
+def delete_blob(current_user, sha):
+    try:
+        released = release_text(current_user.id, sha)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'An error occurred while deleting the text'}), 500
+
+    if not released:
+        return jsonify({'message': 'Not found'}), 404
+    return jsonify({'message': 'Deleted'}), 200
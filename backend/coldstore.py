@@ -0,0 +1,297 @@
+"""
+Tiered storage and retention for the analysis history.
+
+Recent analyses stay *hot*: job description, resume text and SHAP HTML sit
+in plain columns. Analyses stored more than SENTINEL_HOT_DAYS ago (by the
+server's created_at; client ids are whatever the browser sent) go *cold*: those three fields are
+packed into one compressed blob per row. Per-row blobs are small, so they
+are compressed against a shared dictionary trained on the stored SHAP HTML
+and job postings, which are highly repetitive across analyses (zstd; zlib
+with a preset dictionary when `zstandard` is not installed).
+
+Reads do not change: history.to_dict() unpacks cold rows transparently and
+the FTS index keeps covering them. Analyses older than
+SENTINEL_RETENTION_DAYS are deleted (0, the default, keeps them forever).
+
+    flask --app app archive-analyses [--train-dict] [--vacuum]   # one pass
+    python serve.py --role scoring --archive                     # a pass every interval
+
+The periodic compactor runs in exactly one process, a child serve.py forks
+after the workers (SENTINEL_ARCHIVE=1 turns it on by default); create_app()
+never starts it.
+"""
+import datetime
+import json
+import os
+import threading
+import zlib
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from extensions import db
+from metrics import ANALYSES_ARCHIVED, ARCHIVE_BYTES
+from models import Analysis, ArchiveDictionary
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+HOT_DAYS = float(os.environ.get('SENTINEL_HOT_DAYS', '30'))
+RETENTION_DAYS = float(os.environ.get('SENTINEL_RETENTION_DAYS', '0'))  # 0 = keep forever
+ARCHIVE_INTERVAL = float(os.environ.get('SENTINEL_ARCHIVE_INTERVAL', '3600'))  # seconds between passes
+ARCHIVE_BATCH = 200
+ZSTD_LEVEL = 19  # archiving is offline, so spend the CPU on ratio
+ZSTD_DICT_SIZE = 112 * 1024
+ZLIB_DICT_SIZE = 32 * 1024  # zlib only looks back 32 KB
+DICT_SAMPLES = 2000
+MIN_DICT_SAMPLES = 50
+
+# The large fields moved out of the row, keyed as in the packed JSON.
+ARCHIVED_FIELDS = {
+    'job_description': 'jobDescription',
+    'resume_text': 'resumeText',
+    'shap_explanation': 'shapExplanation',
+}
+
+_dictionaries = {}  # id -> (codec, bytes)
+_codecs = {}        # (id, 'c'|'d') -> compressor / decompressor
+_codecs_lock = threading.Lock()
+
+
+# --- Dictionaries ---
+def available_codec():
+    return 'zstd' if zstandard is not None else 'zlib'
+
+
+def load_dictionaries():
+    """Caches every stored dictionary. Needed before deleting cold rows (see _archived_text)."""
+    rows = ArchiveDictionary.query.filter(ArchiveDictionary.id.notin_(list(_dictionaries)))
+    for row in rows:
+        _dictionaries[row.id] = (row.codec, row.data)
+
+
+def _samples(limit=DICT_SAMPLES):
+    samples = []
+    rows = (db.session.query(Analysis.shap_explanation, Analysis.job_description)
+            .filter(Analysis.tier == 'hot').order_by(Analysis.created_at.desc()).limit(limit))
+    for shap, job_description in rows:
+        samples.extend(s.encode('utf-8') for s in (shap, job_description) if s)
+    return samples
+
+
+def train_dictionary():
+    """Trains a dictionary on the newest hot rows. Returns its id, or None with too few samples."""
+    samples = _samples()
+    if len(samples) < MIN_DICT_SAMPLES:
+        return None
+    codec = available_codec()
+    if codec == 'zstd':
+        try:
+            data = zstandard.train_dictionary(ZSTD_DICT_SIZE, samples).as_bytes()
+        except zstandard.ZstdError as e:
+            print(f"[archive] dictionary training failed: {e}")
+            return None
+    else:
+        # zlib has no trainer; its preset dictionary works best filled with
+        # typical content, most common strings last.
+        data = b''.join(samples)[-ZLIB_DICT_SIZE:]
+    row = ArchiveDictionary(codec=codec, data=data, samples=len(samples))
+    db.session.add(row)
+    db.session.commit()
+    _dictionaries[row.id] = (codec, data)
+    print(f"[archive] trained {codec} dictionary {row.id} on {len(samples)} samples ({len(data)} bytes)")
+    return row.id
+
+
+def current_dictionary():
+    """The newest dictionary usable with the installed codec, training one if needed."""
+    row = (ArchiveDictionary.query.filter_by(codec=available_codec())
+           .order_by(ArchiveDictionary.id.desc()).first())
+    if row is None:
+        return train_dictionary()
+    _dictionaries[row.id] = (row.codec, row.data)
+    return row.id
+
+
+# --- Codec ---
+def _codec(dict_id, mode):
+    key = (dict_id, mode)
+    with _codecs_lock:
+        obj = _codecs.get(key)
+        if obj is None and dict_id is not None and _dictionaries[dict_id][0] == 'zstd':
+            zdict = zstandard.ZstdCompressionDict(_dictionaries[dict_id][1])
+            if mode == 'c':
+                obj = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=zdict)
+            else:
+                obj = zstandard.ZstdDecompressor(dict_data=zdict)
+            _codecs[key] = obj
+        return obj
+
+
+def pack(fields, dict_id=None):
+    """Compresses {column: text} for the cold tier. Returns (codec, data)."""
+    raw = json.dumps({ARCHIVED_FIELDS[k]: v for k, v in fields.items()}).encode('utf-8')
+    codec = _dictionaries[dict_id][0] if dict_id is not None else available_codec()
+    if codec == 'zstd':
+        compressor = _codec(dict_id, 'c') or zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+        data = compressor.compress(raw)
+    else:
+        compressobj = zlib.compressobj(9, zdict=_dictionaries[dict_id][1]) if dict_id is not None \
+            else zlib.compressobj(9)
+        data = compressobj.compress(raw) + compressobj.flush()
+    ARCHIVE_BYTES.inc(len(raw), kind='raw')
+    ARCHIVE_BYTES.inc(len(data), kind='compressed')
+    return codec, data
+
+
+def unpack(codec, dict_id, data):
+    """Inverse of pack(): {column: text}. The dictionary must be cached (load_dictionaries())."""
+    if codec == 'zstd':
+        raw = (_codec(dict_id, 'd') or zstandard.ZstdDecompressor()).decompress(data)
+    else:
+        decompressobj = zlib.decompressobj(zdict=_dictionaries[dict_id][1]) if dict_id is not None \
+            else zlib.decompressobj()
+        raw = decompressobj.decompress(data) + decompressobj.flush()
+    packed = json.loads(raw)
+    return {column: packed.get(key) for column, key in ARCHIVED_FIELDS.items()}
+
+
+def archived_fields(analysis):
+    """{column: text} of the large fields, whichever tier the row is in."""
+    if analysis.tier == 'cold':
+        if analysis.archive_dict_id is not None and analysis.archive_dict_id not in _dictionaries:
+            load_dictionaries()
+        return unpack(analysis.archive_codec, analysis.archive_dict_id, analysis.archive)
+    return {column: getattr(analysis, column) for column in ARCHIVED_FIELDS}
+
+
+# The FTS delete and update triggers need the original job description of
+# cold rows. SQLite functions cannot query their own connection, so
+# dictionaries must already be cached: callers deleting or updating rows run
+# load_dictionaries() first.
+def _archived_text(codec, dict_id, data):
+    return unpack(codec, dict_id, data)['job_description'] or ''
+
+
+@event.listens_for(Engine, 'connect')
+def _register_sql_functions(dbapi_connection, connection_record):
+    if hasattr(dbapi_connection, 'create_function'):
+        dbapi_connection.create_function('sentinel_archived_text', 3, _archived_text, deterministic=True)
+
+
+# --- Tiering & Retention ---
+def _cutoff(days):
+    """created_at (naive UTC, as the model's default writes it) `days` ago."""
+    return datetime.datetime.utcnow() - datetime.timedelta(days=days)
+
+
+def archive_batch(cutoff, dict_id, batch_size=ARCHIVE_BATCH):
+    """Moves up to batch_size hot rows stored before `cutoff` (a datetime) to the cold tier."""
+    rows = (Analysis.query.filter(Analysis.tier == 'hot', Analysis.created_at < cutoff)
+            .order_by(Analysis.created_at).limit(batch_size).all())
+    for row in rows:
+        codec, data = pack({column: getattr(row, column) for column in ARCHIVED_FIELDS}, dict_id)
+        row.archive, row.archive_codec, row.archive_dict_id = data, codec, dict_id
+        row.tier = 'cold'
+        row.job_description = ''
+        row.resume_text = None
+        row.shap_explanation = None
+    db.session.commit()
+    ANALYSES_ARCHIVED.inc(len(rows), action='archived')
+    return len(rows)
+
+
+def apply_retention(cutoff, batch_size=ARCHIVE_BATCH):
+    """Deletes up to batch_size rows stored before `cutoff` (a datetime), in any tier."""
+    load_dictionaries()
+    # Both tiers spelled out so ix_analysis_tier_created serves the range.
+    ids = [i for (i,) in db.session.query(Analysis.id)
+           .filter(Analysis.tier.in_(('hot', 'cold')), Analysis.created_at < cutoff).limit(batch_size)]
+    if ids:
+        Analysis.query.filter(Analysis.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        ANALYSES_ARCHIVED.inc(len(ids), action='deleted')
+    return len(ids)
+
+
+class ArchiveCompactor:
+    """
+    Every `interval` seconds: deletes rows past retention, then moves rows
+    older than `hot_days` to the cold tier, one batch at a time. run()
+    blocks; stop() (from another thread or a signal handler) ends it after
+    the current batch.
+    """
+
+    def __init__(self, app, hot_days=HOT_DAYS, retention_days=RETENTION_DAYS, interval=ARCHIVE_INTERVAL):
+        self.app = app
+        self.hot_days = hot_days
+        self.retention_days = retention_days
+        self.interval = interval
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    self.run_once()
+                    db.session.remove()
+            except Exception as e:
+                print(f"[archive] pass failed: {e}")
+            self._stop.wait(self.interval)
+
+    def run_once(self):
+        """One full pass; returns (deleted, archived)."""
+        deleted = archived = 0
+        if self.retention_days > 0:
+            cutoff = _cutoff(self.retention_days)
+            while not self._stop.is_set():
+                count = apply_retention(cutoff)
+                deleted += count
+                if count < ARCHIVE_BATCH:
+                    break
+
+        cutoff = _cutoff(self.hot_days)
+        if Analysis.query.filter(Analysis.tier == 'hot', Analysis.created_at < cutoff).first() is None:
+            return deleted, archived
+        dict_id = current_dictionary()
+        while not self._stop.is_set():
+            count = archive_batch(cutoff, dict_id)
+            archived += count
+            if count < ARCHIVE_BATCH:
+                break
+        if deleted or archived:
+            print(f"[archive] deleted {deleted} expired, archived {archived} analyses")
+        return deleted, archived
+
+
+def init_app(app):
+    app.cli.add_command(archive_analyses_command)
+
+
+# --- CLI ---
+@click.command('archive-analyses')
+@click.option('--hot-days', type=click.FloatRange(min=0), default=HOT_DAYS, help='Keep analyses this recent hot.')
+@click.option('--retention-days', type=click.FloatRange(min=0), default=RETENTION_DAYS,
+              help='Delete analyses older than this (0 keeps everything).')
+@click.option('--train-dict', is_flag=True, help='Train a fresh dictionary for newly archived rows first.')
+@click.option('--vacuum', is_flag=True, help='Afterwards, VACUUM so the freed pages shrink the file.')
+@with_appcontext
+def archive_analyses_command(hot_days, retention_days, train_dict, vacuum):
+    """Move old analyses to compressed cold storage and apply retention."""
+    if train_dict and train_dictionary() is None:
+        print(f"Not enough hot analyses to train a dictionary (need {MIN_DICT_SAMPLES} samples)")
+    compactor = ArchiveCompactor(current_app._get_current_object(), hot_days, retention_days)
+    deleted, archived = compactor.run_once()
+    print(f"Deleted {deleted} expired and archived {archived} analyses")
+    if vacuum:
+        db.session.remove()
+        with db.engine.connect() as connection:
+            connection.execution_options(isolation_level='AUTOCOMMIT').exec_driver_sql('VACUUM')
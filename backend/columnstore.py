@@ -0,0 +1,430 @@
+"""
+Per-user columnar history of scored analyses, memory-mapped for re-ranking.
+
+Every analysis rank_jobs scores (and that carries an `id`) is recorded as a
+row of a few numeric columns plus its job-description embedding, so a
+user's whole history can be re-ranked (new policy, new profession) without
+the client resending it and without touching any JSON.
+
+Files under <SENTINEL_HISTORY_DIR>/<user_id>/:
+
+    meta.json              generation, row count, dims, model, profession
+    columns-<gen>.bin      keyhash u64 | base f32 | relevance f32 | cv f32 | flags u8,
+                           each column stored contiguously
+    ids-<gen>.bin          analysis ids as JSON, 64 bytes each
+    embeddings-<gen>.bin   float32 matrix, rows x dims, L2-normalized
+    log-<gen>.bin          fixed-size records appended since <gen> was written
+
+Reads are np.memmap views of the column files, so re-ranking 50k rows with
+the recorded profession touches ~1 MB; the embeddings matrix is only read
+when relevance must be recomputed. Appends only ever go to the log. Once it
+holds COMPACT_AFTER records a background thread folds it into generation
+<gen + 1> (latest row per id wins) and swaps meta.json atomically. Writers
+in different worker processes serialize on an flock.
+
+The history is a cache of what clients have sent; it starts over when the
+serving embedding model changes.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import queue
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+
+from metrics import HISTORY_COMPACTIONS
+
+HISTORY_DIR = os.environ.get(
+    'SENTINEL_HISTORY_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'history'))
+HISTORY_ENABLED = os.environ.get('SENTINEL_HISTORY', '1') != '0'
+COMPACT_AFTER = int(os.environ.get('SENTINEL_HISTORY_COMPACT_AFTER', '512'))  # log records
+OPEN_STORES = 64
+ID_BYTES = 64
+
+FLAG_EMBEDDED = 1  # the row has a job-description embedding
+
+
+def _key_hash(analysis_id):
+    digest = hashlib.sha256(str(analysis_id).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'little')
+
+
+def _encode_id(analysis_id):
+    # JSON, so an int id comes back an int, as rank_jobs returns it. An id
+    # longer than ID_BYTES is kept as a prefix of its text, still valid JSON.
+    raw = json.dumps(analysis_id, default=str).encode('utf-8')
+    if len(raw) > ID_BYTES:
+        text = analysis_id if isinstance(analysis_id, str) else raw.decode('utf-8')
+        while len(raw) > ID_BYTES:
+            text = text[:min(len(text) - 1, ID_BYTES)]
+            raw = json.dumps(text).encode('utf-8')
+    return raw
+
+
+def _decode_id(raw):
+    return json.loads(raw.decode('utf-8'))
+
+
+def _as_vector(embedding):
+    """A normalized float32 vector from an embed() tensor or a stored numpy vector."""
+    if embedding is None:
+        return None
+    if hasattr(embedding, 'cpu'):
+        embedding = embedding.detach().cpu().numpy()
+    vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+def _log_dtype(dims):
+    return np.dtype([('keyhash', '<u8'), ('id', f'S{ID_BYTES}'), ('base', '<f4'), ('relevance', '<f4'),
+                     ('cv', '<f4'), ('flags', 'u1'), ('embedding', '<f4', (dims,))])
+
+
+def _column_offsets(rows):
+    # keyhash first keeps every column naturally aligned.
+    return {'keyhash': 0, 'base': 8 * rows, 'relevance': 12 * rows, 'cv': 16 * rows, 'flags': 20 * rows}
+
+
+COLUMN_DTYPES = {'keyhash': '<u8', 'base': '<f4', 'relevance': '<f4', 'cv': '<f4', 'flags': 'u1'}
+
+
+class ColumnStore:
+    """One user's history. Safe to share between threads; see the module docstring for processes."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._mapped = None  # (generation, {column: memmap})
+        self._compacting = False
+
+    # --- Files ---
+    def _file(self, name, generation):
+        return os.path.join(self.path, f"{name}-{generation}.bin")
+
+    @contextmanager
+    def _flock(self):
+        os.makedirs(self.path, exist_ok=True)
+        with self._lock, open(os.path.join(self.path, 'lock'), 'a') as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def meta(self):
+        try:
+            with open(os.path.join(self.path, 'meta.json')) as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {'generation': 0, 'rows': 0, 'dims': 0, 'model': None, 'profession': None}
+
+    def _write_meta(self, meta):
+        tmp = os.path.join(self.path, 'meta.json.tmp')
+        with open(tmp, 'w') as fh:
+            json.dump(meta, fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, os.path.join(self.path, 'meta.json'))
+
+    def _columns(self, meta):
+        """Read-only memmaps of the compacted columns of meta's generation."""
+        generation, rows, dims = meta['generation'], meta['rows'], meta['dims']
+        with self._lock:
+            if self._mapped is not None and self._mapped[0] == generation:
+                return self._mapped[1]
+            columns = {}
+            if rows:
+                path = self._file('columns', generation)
+                for name, offset in _column_offsets(rows).items():
+                    columns[name] = np.memmap(path, dtype=COLUMN_DTYPES[name], mode='r',
+                                              offset=offset, shape=(rows,))
+                columns['id'] = np.memmap(self._file('ids', generation), dtype=f'S{ID_BYTES}',
+                                          mode='r', shape=(rows,))
+                if dims:
+                    columns['embedding'] = np.memmap(self._file('embeddings', generation), dtype='<f4',
+                                                     mode='r', shape=(rows, dims))
+            self._mapped = (generation, columns)
+            return columns
+
+    def _read_log(self, meta, limit=None):
+        dtype = _log_dtype(meta['dims'])
+        try:
+            with open(self._file('log', meta['generation']), 'rb') as fh:
+                # A torn trailing record (crash mid-append) is ignored.
+                data = fh.read()
+        except FileNotFoundError:
+            return np.zeros(0, dtype=dtype)
+        count = len(data) // dtype.itemsize
+        if limit is not None:
+            count = min(count, limit)
+        return np.frombuffer(data, dtype=dtype, count=count)
+
+    # --- Writing ---
+    def append(self, ids, base, relevance, cv, embeddings, profession, model):
+        """
+        Records scored analyses. `cv` holds NaN where there is no CV score;
+        `embeddings` holds JD embeddings (or None) as returned by embed().
+        """
+        vectors = [_as_vector(e) for e in embeddings]
+        dims = next((len(v) for v in vectors if v is not None), 0)
+        with self._flock():
+            meta = self.meta()
+            if meta['model'] != model or (dims and dims != meta['dims']):
+                meta = self._reset(meta, model, dims)
+            if meta['profession'] != profession:
+                # Rows recorded so far hold relevance for the old profession;
+                # the next compaction recomputes them from the embeddings.
+                meta.update(profession=profession, stale_relevance=bool(meta['rows'] or self._read_log(meta).size))
+                self._write_meta(meta)
+
+            records = np.zeros(len(ids), dtype=_log_dtype(meta['dims']))
+            records['keyhash'] = [_key_hash(i) for i in ids]
+            records['id'] = [_encode_id(i) for i in ids]
+            records['base'] = base
+            records['relevance'] = relevance
+            records['cv'] = cv
+            for i, vector in enumerate(vectors):
+                if vector is not None and len(vector) == meta['dims'] and meta['dims']:
+                    records['embedding'][i] = vector
+                    records['flags'][i] = FLAG_EMBEDDED
+
+            path = self._file('log', meta['generation'])
+            with open(path, 'ab') as fh:
+                size = fh.tell()
+                fh.truncate(size - size % records.dtype.itemsize)
+                fh.seek(0, os.SEEK_END)
+                fh.write(records.tobytes())
+                fh.flush()
+                logged = fh.tell() // records.dtype.itemsize
+        if logged >= COMPACT_AFTER:
+            compact_async(self)
+
+    def _reset(self, meta, model, dims):
+        self._remove_generation(meta['generation'])
+        meta = {'generation': meta['generation'] + 1, 'rows': 0, 'dims': dims, 'model': model,
+                'profession': meta['profession']}
+        self._write_meta(meta)
+        return meta
+
+    def _remove_generation(self, generation):
+        for name in ('columns', 'ids', 'embeddings', 'log'):
+            try:
+                os.remove(self._file(name, generation))
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        with self._flock():
+            meta = self.meta()
+            self._reset(meta, meta['model'], meta['dims'])
+
+    # --- Reading ---
+    def view(self):
+        """
+        The current history as {column: array} plus 'live', an index of the
+        rows to use (None when every row is live). Without a pending log the
+        arrays are zero-copy memmap views.
+        """
+        meta = self.meta()
+        columns = self._columns(meta)
+        log = self._read_log(meta)
+        rows = meta['rows']
+        if not log.size:
+            view = dict(columns)
+            live = None
+        else:
+            view = {}
+            for name in ('keyhash', 'id', 'base', 'relevance', 'cv', 'flags'):
+                view[name] = np.concatenate([columns[name], log[name]]) if rows else log[name]
+            if meta['dims']:
+                view['embedding'] = np.concatenate([columns['embedding'], log['embedding']]) \
+                    if rows else log['embedding']
+            # Latest row per id wins: first occurrence in reverse order.
+            _, last = np.unique(view['keyhash'][::-1], return_index=True)
+            live = np.sort(len(view['keyhash']) - 1 - last)
+        view.update(live=live, meta=meta)
+        return view
+
+    # --- Compaction ---
+    def compact(self, encode_profession=None):
+        """
+        Folds the log into a new generation. A stale relevance column is
+        recomputed when `encode_profession` (profession -> normalized vector)
+        is given.
+        """
+        with self._flock():
+            meta = self.meta()
+            logged = self._read_log(meta).size
+        if not logged and not meta.get('stale_relevance'):
+            return False
+
+        # Build the next generation outside the lock; appends keep landing
+        # in the current log meanwhile.
+        columns = self._columns(meta)
+        log = self._read_log(meta, limit=logged)
+        rows, dims = meta['rows'], meta['dims']
+        merged = {name: np.concatenate([columns[name], log[name]]) if rows else log[name]
+                  for name in ('keyhash', 'id', 'base', 'relevance', 'cv', 'flags')}
+        if dims:
+            merged['embedding'] = np.concatenate([columns['embedding'], log['embedding']]) \
+                if rows else log['embedding']
+        _, last = np.unique(merged['keyhash'][::-1], return_index=True)
+        live = np.sort(len(merged['keyhash']) - 1 - last)
+        merged = {name: np.ascontiguousarray(values[live]) for name, values in merged.items()}
+        profession_vector = None
+        if meta.get('stale_relevance') and encode_profession is not None and dims:
+            profession_vector = encode_profession(meta['profession'])
+        if profession_vector is not None:
+            embedded = (merged['flags'] & FLAG_EMBEDDED) > 0
+            scores = np.maximum(merged['embedding'] @ profession_vector, 0) * 100
+            merged['relevance'] = np.where(embedded, np.round(scores, 1), 0.0).astype(np.float32)
+
+        generation, count = meta['generation'] + 1, len(live)
+        with open(self._file('columns', generation), 'wb') as fh:
+            for name in _column_offsets(count):
+                fh.write(merged[name].astype(COLUMN_DTYPES[name]).tobytes())
+            fh.flush()
+            os.fsync(fh.fileno())
+        for name, key in (('ids', 'id'), ('embeddings', 'embedding')):
+            if key in merged:
+                with open(self._file(name, generation), 'wb') as fh:
+                    fh.write(merged[key].tobytes())
+                    fh.flush()
+                    os.fsync(fh.fileno())
+
+        with self._flock():
+            current = self.meta()
+            if current['generation'] != meta['generation']:
+                # Reset or compacted by another process in the meantime.
+                if current['generation'] != generation:
+                    self._remove_generation(generation)
+                return False
+            # Carry over whatever was appended while we were building.
+            tail = self._read_log(current)[logged:]
+            with open(self._file('log', generation), 'wb') as fh:
+                fh.write(tail.tobytes())
+            stale = current['profession'] != meta['profession'] or \
+                (meta.get('stale_relevance') and profession_vector is None and dims)
+            self._write_meta({**current, 'generation': generation, 'rows': count,
+                              'stale_relevance': bool(stale)})
+            self._remove_generation(meta['generation'])
+        return True
+
+
+# --- Store Registry ---
+_stores = OrderedDict()
+_stores_lock = threading.Lock()
+
+
+def history_store(user_id):
+    """The ColumnStore of a user, or None when SENTINEL_HISTORY=0."""
+    if not HISTORY_ENABLED:
+        return None
+    with _stores_lock:
+        store = _stores.get(user_id)
+        if store is None:
+            store = _stores[user_id] = ColumnStore(os.path.join(HISTORY_DIR, str(int(user_id))))
+        _stores.move_to_end(user_id)
+        while len(_stores) > OPEN_STORES:
+            _stores.popitem(last=False)
+        return store
+
+
+# --- Background Compaction ---
+_queue = queue.Queue()
+_worker = {'pid': None}
+
+
+def _compact_worker():
+    from nlp import embed
+
+    while True:
+        store = _queue.get()
+        try:
+            done = store.compact(lambda profession: _as_vector(embed(profession)))
+            HISTORY_COMPACTIONS.inc(result='done' if done else 'skipped')
+        except Exception as e:
+            print(f"History compaction failed for {store.path}: {e}")
+            HISTORY_COMPACTIONS.inc(result='error')
+        finally:
+            with store._lock:
+                store._compacting = False
+
+
+def compact_async(store):
+    """Queues `store` for the compaction thread (started per process, after any fork)."""
+    with store._lock:
+        if store._compacting:
+            return
+        store._compacting = True
+    with _stores_lock:
+        if _worker['pid'] != os.getpid():
+            threading.Thread(target=_compact_worker, name='sentinel-history-compactor', daemon=True).start()
+            _worker['pid'] = os.getpid()
+    _queue.put(store)
+
+
+# ============================================================================
+# RE-RANKING
+# ============================================================================
+def rank_history(store, profession, policy, top_k=50, offset=0, timer=None):
+    """
+    Re-ranks a user's whole history with `policy`, in rank_jobs order (safe
+    first, then composite score). Returns (rows, total). Relevance comes from
+    the recorded column when it was computed for `profession`, else from the
+    embeddings matrix.
+    """
+    from nlp import embed
+    from timing import StageTimer
+
+    timer = timer or StageTimer()
+    user_profession = (profession or "Student").lower().strip()
+    with timer.stage('history'):
+        view = store.view()
+        meta, live = view['meta'], view['live']
+        if not len(view.get('keyhash', ())):
+            return [], 0
+
+        relevance = view['relevance']
+        if meta['profession'] != user_profession or meta.get('stale_relevance'):
+            relevance = np.zeros(len(view['keyhash']), dtype=np.float32)
+            if 'embedding' in view:
+                vector = _as_vector(embed(user_profession))
+                if vector is not None:
+                    embedded = (view['flags'] & FLAG_EMBEDDED) > 0
+                    scores = np.round(np.maximum(view['embedding'] @ vector, 0) * 100, 1)
+                    relevance = np.where(embedded, scores, 0.0)
+
+        base, cv = view['base'], view['cv']
+        if live is not None:
+            base, relevance, cv = base[live], relevance[live], cv[live]
+            index = live
+        else:
+            index = np.arange(len(base))
+
+    with timer.stage('policy'):
+        result = policy.evaluate(base, relevance, cv)
+        composite = np.round(result['composite'], 1)
+    with timer.stage('sort'):
+        # lexsort is stable and sorts by the last key first.
+        order = np.lexsort((-composite, ~result['is_safe']))[offset:offset + top_k]
+
+    rows = []
+    for i in order.tolist():
+        is_safe = bool(result['is_safe'][i])
+        rows.append({
+            'id': _decode_id(view['id'][index[i]]),
+            'base_real_score': round(float(base[i]), 1),
+            'personalized_score': round(float(result['personalized'][i]), 1),
+            'composite_score': round(float(result['composite'][i]), 1),
+            'cvMatchScore': None if np.isnan(cv[i]) else round(float(cv[i]), 1),
+            'is_relevant': bool(result['is_relevant'][i]),
+            'is_safe': is_safe,
+            'risk_level': "LOW" if is_safe else "HIGH",
+        })
+    return rows, len(base)
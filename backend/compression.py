@@ -0,0 +1,150 @@
+"""
+Content-Encoding support for request and response bodies.
+
+Requests: a WSGI middleware swaps wsgi.input for a streaming decoder when
+the client sends `Content-Encoding: gzip` or `zstd`. Output is capped at
+MAX_DECOMPRESSED_BYTES while it is produced, so a decompression bomb fails
+with 413 after reading at most the cap, never after inflating it fully.
+
+Responses: compress_response() negotiates zstd/gzip from Accept-Encoding.
+
+zstd needs the optional `zstandard` package; without it only gzip is offered
+and zstd request bodies are rejected with 415.
+"""
+import gzip
+import io
+import zlib
+
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge, UnsupportedMediaType
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+MAX_DECOMPRESSED_BYTES = 32 * 1024 * 1024
+# Bodies smaller than this are not worth the CPU (or the header bytes).
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 5
+ZSTD_LEVEL = 3
+
+
+def supported_encodings():
+    return ('zstd', 'gzip') if zstandard is not None else ('gzip',)
+
+
+class LimitedDecoder(io.RawIOBase):
+    """Reads decoded bytes from `raw`, failing once more than `limit` come out."""
+
+    def __init__(self, raw, encoding, limit=MAX_DECOMPRESSED_BYTES):
+        if encoding == 'gzip':
+            self._decoder = gzip.GzipFile(fileobj=raw, mode='rb')
+        elif encoding == 'zstd' and zstandard is not None:
+            self._decoder = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+        else:
+            raise UnsupportedMediaType(f'Unsupported Content-Encoding: {encoding}')
+        self._limit = limit
+        self._produced = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        # Never ask for more than one byte past the cap, so the decoder cannot
+        # be coaxed into materializing a huge block in one call.
+        want = min(len(buffer), self._limit - self._produced + 1)
+        try:
+            data = self._decoder.read(want)
+        except (OSError, EOFError, zlib.error) as e:
+            raise BadRequest(f'Malformed compressed body: {e}')
+        except Exception as e:
+            if zstandard is not None and isinstance(e, zstandard.ZstdError):
+                raise BadRequest(f'Malformed compressed body: {e}')
+            raise
+        self._produced += len(data)
+        if self._produced > self._limit:
+            raise RequestEntityTooLarge('Decompressed request body is too large')
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def open_decoder(raw, encoding, limit=MAX_DECOMPRESSED_BYTES):
+    return io.BufferedReader(LimitedDecoder(raw, encoding, limit))
+
+
+def decode_body(data, encoding, limit=MAX_DECOMPRESSED_BYTES):
+    """Decodes an in-memory body with the same cap as the streaming path."""
+    if not encoding or encoding == 'identity':
+        return data
+    return open_decoder(io.BytesIO(data), encoding, limit).read()
+
+
+class RequestDecompressionMiddleware:
+    def __init__(self, wsgi_app, limit=MAX_DECOMPRESSED_BYTES):
+        self.wsgi_app = wsgi_app
+        self.limit = limit
+
+    def __call__(self, environ, start_response):
+        encoding = environ.get('HTTP_CONTENT_ENCODING', '').strip().lower()
+        if encoding and encoding != 'identity':
+            try:
+                environ['wsgi.input'] = open_decoder(environ['wsgi.input'], encoding, self.limit)
+            except UnsupportedMediaType as e:
+                return e(environ, start_response)
+            # The decoded length is unknown; tell werkzeug to read until EOF.
+            environ.pop('CONTENT_LENGTH', None)
+            environ.pop('HTTP_CONTENT_ENCODING', None)
+            environ['wsgi.input_terminated'] = True
+        return self.wsgi_app(environ, start_response)
+
+
+# --- Response Side ---
+def negotiate(accept_encoding):
+    """Picks the best encoding we support from an Accept-Encoding header value."""
+    if not accept_encoding:
+        return None
+    best, best_q = None, 0.0
+    offered = supported_encodings()
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        candidates = offered if name == '*' else (name,)
+        for candidate in candidates:
+            # Ties go to the order in `offered`, i.e. zstd before gzip.
+            if candidate in offered and q > 0 and (
+                    q > best_q or (q == best_q and offered.index(candidate) < offered.index(best))):
+                best, best_q = candidate, q
+    return best
+
+
+def compress(data, encoding):
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=GZIP_LEVEL)
+    return data
+
+
+def compress_response(response, accept_encoding):
+    """after_request helper: compresses a buffered response in place."""
+    response.vary.add('Accept-Encoding')
+    if (response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.status_code < 200 or response.status_code >= 300):
+        return response
+
+    data = response.get_data()
+    encoding = negotiate(accept_encoding)
+    if encoding is None or len(data) < MIN_COMPRESS_BYTES:
+        return response
+
+    response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
@@ -0,0 +1,264 @@
+"""
+Persisted, model-versioned embeddings and the background re-embedding migrator.
+
+Every stored text (see blobstore.py) gets its embedding saved in the
+Embedding table, keyed by (sha256, model). Requests are served by the single *active* model in
+EmbeddingModel; vectors from other models are never mixed in.
+
+Changing SENTINEL_EMBEDDING_MODEL does not switch models at once. The new
+model is registered as 'migrating' and an EmbeddingMigrator re-embeds the
+stored texts in throttled batches while the old model keeps serving. Once
+SENTINEL_EMBEDDING_CUTOVER (default 95%) of the texts have a new vector,
+the new model becomes active and the old one is retired. The remaining
+texts are embedded on demand or by the migrator as it finishes.
+
+    flask --app app migrate-embeddings              # foreground, throttled
+    python serve.py --role scoring --migrate-embeddings
+
+The migrator runs in exactly one process: the CLI command, or a dedicated
+child that serve.py forks after the workers (SENTINEL_EMBEDDING_MIGRATE=1
+turns that on by default). It is never started by create_app(), which
+every worker and CLI invocation runs.
+
+Progress is exported as sentinel_embedding_migration_progress.
+"""
+import datetime
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from blobstore import TEXT_REFS, load_texts
+from extensions import db
+from metrics import (EMBEDDING_MIGRATION_PROGRESS, EMBEDDING_SERVING, EMBEDDINGS_MIGRATED,
+                     cache_lookup)
+from models import Blob, Embedding, EmbeddingModel
+from nlp import MODEL_NAME, encode, serving_model, set_serving_model
+
+CUTOVER_THRESHOLD = float(os.environ.get('SENTINEL_EMBEDDING_CUTOVER', '0.95'))
+MIGRATE_BATCH = 32
+MIGRATE_RATE = float(os.environ.get('SENTINEL_EMBEDDING_MIGRATE_RATE', '20'))  # texts/s
+ACTIVE_MODEL_TTL = 5.0  # seconds a worker may serve a stale active-model read
+VECTOR_CACHE_SIZE = 4096
+
+_active = {'expires': 0.0}
+_vector_cache = OrderedDict()
+_vector_cache_lock = threading.Lock()
+
+
+# --- Model Lifecycle ---
+def sync_models():
+    """
+    Registers the configured model: active if nothing is yet, otherwise
+    'migrating' until the migrator cuts it over.
+    """
+    active = EmbeddingModel.query.filter_by(state='active').first()
+    if active is None:
+        db.session.merge(EmbeddingModel(name=MODEL_NAME, state='active',
+                                        activated_at=datetime.datetime.utcnow()))
+    elif active.name != MODEL_NAME:
+        configured = db.session.get(EmbeddingModel, MODEL_NAME)
+        if configured is None or configured.state == 'retired':
+            db.session.merge(EmbeddingModel(name=MODEL_NAME, state='migrating'))
+    db.session.commit()
+    _active['expires'] = 0.0
+
+
+def refresh_serving_model():
+    """Points nlp at the active model, re-reading it at most every ACTIVE_MODEL_TTL seconds."""
+    now = time.monotonic()
+    if now < _active['expires']:
+        return serving_model()
+    rows = EmbeddingModel.query.all()
+    for row in rows:
+        if row.state == 'active':
+            set_serving_model(row.name)
+    for name in {row.name for row in rows} | {serving_model()}:
+        EMBEDDING_SERVING.set(1 if name == serving_model() else 0, model=name)
+    _active['expires'] = now + ACTIVE_MODEL_TTL
+    return serving_model()
+
+
+# --- Vector Store ---
+def _to_vector(row):
+    import numpy as np
+    return np.frombuffer(row.vector, dtype=np.float32)
+
+
+def clear_vector_cache():
+    with _vector_cache_lock:
+        _vector_cache.clear()
+
+
+def load_embeddings(shas, model=None):
+    """Returns {sha: vector} for the stored embeddings of `shas` under `model`."""
+    model = model or serving_model()
+    found = {}
+    to_load = set()
+    with _vector_cache_lock:
+        for sha in set(shas):
+            vector = _vector_cache.get((model, sha))
+            if vector is not None:
+                _vector_cache.move_to_end((model, sha))
+                found[sha] = vector
+            else:
+                to_load.add(sha)
+    for sha in set(shas):
+        cache_lookup('embedding', sha not in to_load)
+    if to_load:
+        rows = Embedding.query.filter(Embedding.model == model, Embedding.sha256.in_(to_load))
+        with _vector_cache_lock:
+            for row in rows:
+                found[row.sha256] = _vector_cache[(model, row.sha256)] = _to_vector(row)
+            while len(_vector_cache) > VECTOR_CACHE_SIZE:
+                _vector_cache.popitem(last=False)
+    return found
+
+
+def store_embeddings(texts, model=None):
+    """
+    Encodes `texts` ({sha: text}) with `model` in one batch and saves the
+    vectors of those backed by a stored Blob. Returns {sha: vector}.
+    """
+    import numpy as np
+
+    model = model or serving_model()
+    shas = list(texts)
+    vectors = encode([texts[sha] for sha in shas], model=model, normalize_embeddings=True,
+                     convert_to_numpy=True).astype(np.float32)
+    stored = {sha for (sha,) in db.session.query(Blob.sha256).filter(Blob.sha256.in_(shas))}
+    for sha, vector in zip(shas, vectors):
+        if sha in stored:
+            db.session.merge(Embedding(sha256=sha, model=model, dims=len(vector), vector=vector.tobytes()))
+    db.session.commit()
+    with _vector_cache_lock:
+        for sha, vector in zip(shas, vectors):
+            _vector_cache[(model, sha)] = vector
+        while len(_vector_cache) > VECTOR_CACHE_SIZE:
+            _vector_cache.popitem(last=False)
+    return dict(zip(shas, vectors))
+
+
+def hashed_texts(analyses):
+    """{sha: text} for every text an analysis referenced by hash (after resolve_text_refs)."""
+    texts = {}
+    for item in analyses:
+        if isinstance(item, dict):
+            for ref_key, text_key in TEXT_REFS.items():
+                if item.get(ref_key) and item.get(text_key):
+                    texts[item[ref_key]] = item[text_key]
+    return texts
+
+
+def analysis_embeddings(analyses, compute_missing=True):
+    """
+    Embeddings of the hashed texts in `analyses`, as {text: vector} for
+    pipeline.rank_analyses(embeddings=...). With compute_missing, texts
+    without a stored vector are encoded in one batch and saved.
+    """
+    texts = hashed_texts(analyses)
+    if not texts:
+        return {}
+    vectors = load_embeddings(texts)
+    missing = {sha: text for sha, text in texts.items() if sha not in vectors}
+    if missing and compute_missing:
+        vectors.update(store_embeddings(missing))
+    return {texts[sha]: vector for sha, vector in vectors.items()}
+
+
+# ============================================================================
+# MIGRATOR
+# ============================================================================
+def migration_progress(model):
+    total = db.session.query(db.func.count(Blob.sha256)).scalar() or 0
+    done = db.session.query(db.func.count(Embedding.sha256)).filter(Embedding.model == model).scalar() or 0
+    return done / total if total else 1.0
+
+
+class EmbeddingMigrator:
+    """
+    Re-embeds stored texts for the 'migrating' model at no more than `rate`
+    texts per second, cutting over once `cutover` of them are done. run()
+    blocks; stop() (from another thread or a signal handler) ends it after
+    the current batch.
+    """
+
+    def __init__(self, app, batch_size=MIGRATE_BATCH, rate=MIGRATE_RATE, cutover=CUTOVER_THRESHOLD):
+        self.app = app
+        self.batch_size = batch_size
+        self.rate = rate
+        self.cutover = cutover
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        with self.app.app_context():
+            sync_models()
+            target = EmbeddingModel.query.filter_by(state='migrating').first()
+            if target is None:
+                return
+            print(f"[embeddings] migrating stored texts to {target.name}")
+            while not self._stop.is_set():
+                if not self.step(target.name):
+                    break
+            db.session.remove()
+
+    def step(self, model):
+        """Embeds one batch; returns False when nothing is left to do."""
+        started = time.monotonic()
+        shas = [sha for (sha,) in db.session.query(Blob.sha256)
+                .outerjoin(Embedding, (Embedding.sha256 == Blob.sha256) & (Embedding.model == model))
+                .filter(Embedding.sha256.is_(None))
+                .limit(self.batch_size)]
+        if shas:
+            store_embeddings(load_texts(shas), model=model)
+            EMBEDDINGS_MIGRATED.inc(len(shas), model=model)
+
+        progress = migration_progress(model)
+        EMBEDDING_MIGRATION_PROGRESS.set(round(progress, 4), model=model)
+        target = db.session.get(EmbeddingModel, model)
+        if target.state == 'migrating' and progress >= self.cutover:
+            self.cut_over(model)
+        if not shas:
+            return False
+
+        # Throttle to `rate` texts per second so serving traffic keeps the CPU.
+        self._stop.wait(max(0.0, len(shas) / self.rate - (time.monotonic() - started)))
+        return True
+
+    def cut_over(self, model):
+        for row in EmbeddingModel.query.filter_by(state='active'):
+            row.state = 'retired'
+        target = db.session.get(EmbeddingModel, model)
+        target.state = 'active'
+        target.activated_at = datetime.datetime.utcnow()
+        db.session.commit()
+        _active['expires'] = 0.0
+        print(f"[embeddings] cut over to {model}")
+
+
+def init_app(app):
+    app.cli.add_command(migrate_embeddings_command)
+
+
+# --- CLI ---
+@click.command('migrate-embeddings')
+@click.option('--rate', type=click.FloatRange(min=0.1), default=MIGRATE_RATE, help='Max texts embedded per second.')
+@click.option('--prune', is_flag=True, help='Afterwards, delete embeddings of retired models.')
+@with_appcontext
+def migrate_embeddings_command(rate, prune):
+    """Re-embed stored texts for the configured model, then cut over."""
+    migrator = EmbeddingMigrator(current_app._get_current_object(), rate=rate)
+    migrator.run()
+    if prune:
+        retired = [m.name for m in EmbeddingModel.query.filter_by(state='retired')]
+        if retired:
+            deleted = Embedding.query.filter(Embedding.model.in_(retired)).delete(synchronize_session=False)
+            db.session.commit()
+            print(f"Deleted {deleted} embeddings of retired models")
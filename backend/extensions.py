@@ -0,0 +1,6 @@
+"""Shared extension instances, bound to an app inside create_app()."""
+from flask_cors import CORS
+from flask_sqlalchemy import SQLAlchemy
+
+db = SQLAlchemy()
+cors = CORS()
@@ -0,0 +1,184 @@
+"""
+Resume text extraction (PDF, DOCX, TXT) in short-lived worker processes.
+
+Parsers run in a separate process per file so a pathological document can
+be killed when it exceeds its timeout instead of wedging a request thread.
+At most EXTRACT_WORKERS run at once; beyond MAX_PENDING_EXTRACTIONS waiting
+callers are turned away with a 503. Processes come from a forkserver, which
+starts them from a small, thread-free parent rather than the (large,
+threaded) serving process.
+
+This module is deliberately Flask-free; the route lives in resume.py.
+"""
+import codecs
+import multiprocessing
+import os
+import threading
+import time
+import zipfile
+from xml.etree import ElementTree
+
+from metrics import EXTRACT_LATENCY, EXTRACTIONS
+
+try:
+    import pypdf
+except ImportError:  # in requirements.txt; without it PDF uploads are rejected
+    pypdf = None
+
+EXTRACT_WORKERS = int(os.environ.get('SENTINEL_EXTRACT_WORKERS', '2'))
+MAX_PENDING_EXTRACTIONS = int(os.environ.get('SENTINEL_MAX_PENDING_EXTRACTIONS', '16'))
+EXTRACT_TIMEOUT = float(os.environ.get('SENTINEL_EXTRACT_TIMEOUT', '10'))
+MAX_PDF_PAGES = 20
+MAX_DOCX_XML_BYTES = 20 * 1024 * 1024  # uncompressed word/document.xml
+MAX_TEXT_CHARS = 200_000
+MIN_TEXT_CHARS = 20
+
+KINDS = ('pdf', 'docx', 'txt')
+_W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+
+class ExtractionError(Exception):
+    def __init__(self, message, status=422):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def detect_kind(head, filename=''):
+    """Picks a parser from the first bytes of the file; the name is only a tiebreak."""
+    if head.startswith(b'%PDF-'):
+        return 'pdf'
+    if head.startswith(b'PK\x03\x04'):
+        return 'docx'
+    if head.startswith(b'\xd0\xcf\x11\xe0'):
+        raise ExtractionError('Legacy .doc files are not supported, save as DOCX or PDF', 415)
+    if filename.lower().endswith(('.pdf', '.docx', '.doc')):
+        raise ExtractionError('File contents do not match its extension', 415)
+    return 'txt'
+
+
+# --- Parsers (run inside the worker process) ---
+def _extract_pdf(path):
+    if pypdf is None:
+        raise ExtractionError('PDF extraction is not available on this server', 415)
+    reader = pypdf.PdfReader(path)
+    total = len(reader.pages)
+    pages = []
+    for page in reader.pages[:MAX_PDF_PAGES]:
+        pages.append(page.extract_text() or '')
+    return '\n'.join(pages), min(total, MAX_PDF_PAGES), total > MAX_PDF_PAGES
+
+
+def _extract_docx(path):
+    with zipfile.ZipFile(path) as archive:
+        try:
+            info = archive.getinfo('word/document.xml')
+        except KeyError:
+            raise ExtractionError('Not a Word document', 415)
+        if info.file_size > MAX_DOCX_XML_BYTES:
+            raise ExtractionError('Word document is too large to extract', 413)
+        root = ElementTree.fromstring(archive.read(info))
+    paragraphs = []
+    for paragraph in root.iter(f'{_W_NS}p'):
+        parts = []
+        for node in paragraph.iter():
+            if node.tag == f'{_W_NS}t' and node.text:
+                parts.append(node.text)
+            elif node.tag == f'{_W_NS}tab':
+                parts.append('\t')
+        paragraphs.append(''.join(parts))
+    return '\n'.join(paragraphs), None, False
+
+
+def _decode_text(raw):
+    """
+    UTF-16 only with a BOM (any even-length byte string "decodes" as UTF-16),
+    then UTF-8, then cp1252 -- what Windows editors save -- and latin-1,
+    which accepts every byte.
+    """
+    if raw.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return raw.decode('utf-16', errors='replace')
+    try:
+        return raw.decode('utf-8-sig')
+    except UnicodeDecodeError as e:
+        # The read limit can split the last character; that alone is not cp1252.
+        if e.reason == 'unexpected end of data':
+            return raw[:e.start].decode('utf-8-sig')
+    try:
+        return raw.decode('cp1252')
+    except UnicodeDecodeError:
+        return raw.decode('latin-1')
+
+
+def _extract_txt(path):
+    with open(path, 'rb') as fh:
+        raw = fh.read(MAX_TEXT_CHARS * 4)
+    return _decode_text(raw), None, False
+
+
+PARSERS = {'pdf': _extract_pdf, 'docx': _extract_docx, 'txt': _extract_txt}
+
+
+def _worker(conn, path, kind):
+    try:
+        text, pages, truncated = PARSERS[kind](path)
+        conn.send(('ok', text, pages, truncated))
+    except ExtractionError as e:
+        conn.send(('error', e.message, e.status))
+    except Exception as e:
+        conn.send(('error', f'Could not read this {kind.upper()} file ({type(e).__name__})', 422))
+    finally:
+        conn.close()
+
+
+# --- Bounded Runner ---
+_context = multiprocessing.get_context('forkserver')
+_context.set_forkserver_preload(['extraction'])
+_slots = threading.BoundedSemaphore(EXTRACT_WORKERS)
+_pending = threading.BoundedSemaphore(EXTRACT_WORKERS + MAX_PENDING_EXTRACTIONS)
+
+
+def run_extraction(path, kind, timeout=EXTRACT_TIMEOUT):
+    """
+    Parses the file at `path` in a worker process. Returns
+    {'text', 'pages', 'truncated'}; raises ExtractionError on bad input,
+    timeout (the worker is killed) or when too many extractions are queued.
+    """
+    if not _pending.acquire(blocking=False):
+        raise ExtractionError('Resume extraction is at capacity, retry shortly', 503)
+    started = time.perf_counter()
+    result = 'error'
+    try:
+        with _slots:
+            receiver, sender = _context.Pipe(duplex=False)
+            process = _context.Process(target=_worker, args=(sender, path, kind), daemon=True)
+            process.start()
+            sender.close()
+            try:
+                if not receiver.poll(timeout):
+                    result = 'timeout'
+                    raise ExtractionError('Extraction took too long; try a smaller file', 422)
+                message = receiver.recv()
+            except EOFError:
+                raise ExtractionError('Extraction worker crashed', 422)
+            finally:
+                receiver.close()
+                process.join(0.5)
+                if process.is_alive():
+                    process.kill()
+                    process.join()
+
+        if message[0] == 'error':
+            raise ExtractionError(message[1], message[2])
+        _, text, pages, truncated = message
+        text = '\n'.join(line.strip() for line in text.splitlines()).strip()
+        if len(text) > MAX_TEXT_CHARS:
+            text, truncated = text[:MAX_TEXT_CHARS], True
+        if len(text) < MIN_TEXT_CHARS:
+            raise ExtractionError('Could not extract enough text. Is this a scanned image PDF?', 422)
+        result = 'ok'
+        return {'text': text, 'pages': pages, 'truncated': truncated}
+    finally:
+        _pending.release()
+        EXTRACTIONS.inc(kind=kind, result=result)
+        EXTRACT_LATENCY.observe(time.perf_counter() - started, kind=kind)
@@ -0,0 +1,216 @@
+"""
+Server-side analysis history with full-text search.
+
+The dashboard keeps saving analyses to localStorage and mirrors them here, so
+the History page can search and page through thousands of them without
+loading everything into the browser:
+
+    GET /api/analyses?q=python+remote&min_score=60&risk=low&page=2&per_page=20
+
+`q` is matched against job descriptions and resume file names through the
+analysis_fts FTS5 index (see models.py); every term must match, as a prefix.
+The label counts shown above the list do not depend on the filters and come
+from GET /api/analyses/stats, so searching and paging never recount them.
+"""
+import json
+import re
+
+from flask import Blueprint, request, jsonify
+from sqlalchemy import func, literal_column, table, column
+from sqlalchemy.dialects.sqlite import insert
+
+from auth import token_required
+from coldstore import archived_fields, load_dictionaries
+from extensions import db
+from models import Analysis
+from policy import select_policy
+
+history_bp = Blueprint('history', __name__)
+
+MAX_ANALYSES_PER_REQUEST = 1000
+MAX_PAGE_SIZE = 100
+DEFAULT_PAGE_SIZE = 20
+MAX_QUERY_TERMS = 16
+# client_id is a SQLite INTEGER: larger ids would fail at the bind, not here.
+CLIENT_ID_RANGE = range(-2 ** 63, 2 ** 63)
+
+QUERY_TERM_RE = re.compile(r"\w+", re.UNICODE)
+analysis_fts = table('analysis_fts', column('rowid'))
+
+
+def fts_query(raw):
+    """
+    Turns free text into a safe FTS5 query: every word quoted (so FTS5
+    operators and syntax errors cannot come from user input) and
+    prefix-matched. Returns None when there is nothing to search for.
+    """
+    terms = QUERY_TERM_RE.findall(raw or '')[:MAX_QUERY_TERMS]
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def real_score(confidence):
+    """The REAL confidence as 0-100, exactly as pipeline.rank_analyses derives base_real_score."""
+    if not isinstance(confidence, dict):
+        return 0.0
+    conf_list = confidence.get('confidences') or []
+    real_data = next((c for c in conf_list if isinstance(c, dict) and str(c.get('label', '')).upper() == 'REAL'),
+                     None)
+    try:
+        return float(real_data['confidence']) * 100 if real_data else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _row(user_id, item):
+    client_id = int(item['id'])
+    if client_id not in CLIENT_ID_RANGE:
+        raise ValueError(f"id {client_id} is out of range")
+    if not isinstance(item['jobDescription'], str) or not isinstance(item.get('resumeText') or '', str):
+        raise TypeError('jobDescription and resumeText must be strings')
+    confidence = item.get('confidence')
+    return {
+        'user_id': user_id,
+        'client_id': client_id,
+        'timestamp': item.get('timestamp'),
+        'label': confidence.get('label') if isinstance(confidence, dict) else None,
+        'real_score': real_score(confidence),
+        'cv_match_score': item.get('cvMatchScore'),
+        'confidence': json.dumps(confidence) if confidence is not None else None,
+        'shap_explanation': item.get('shapExplanation'),
+        'job_description': item['jobDescription'],
+        'resume_text': item.get('resumeText'),
+        'resume_file_name': item.get('resumeFileName'),
+    }
+
+
+def to_dict(analysis):
+    """The analysis in the shape JobAnalysisService keeps in localStorage, from either tier."""
+    fields = archived_fields(analysis)
+    return {
+        'id': analysis.client_id,
+        'timestamp': analysis.timestamp,
+        'confidence': json.loads(analysis.confidence) if analysis.confidence else None,
+        'shapExplanation': fields['shap_explanation'],
+        'jobDescription': fields['job_description'],
+        'resumeText': fields['resume_text'],
+        'resumeFileName': analysis.resume_file_name,
+        'cvMatchScore': analysis.cv_match_score,
+    }
+
+
+def history_stats(user_id):
+    counts = dict(db.session.query(func.lower(Analysis.label), func.count(Analysis.id))
+                  .filter(Analysis.user_id == user_id)
+                  .group_by(func.lower(Analysis.label)))
+    total = sum(counts.values())
+    fake, real = counts.get('fake', 0), counts.get('real', 0)
+    return {
+        'total': total,
+        'fake': fake,
+        'real': real,
+        'fakePercentage': f"{fake / total * 100:.1f}" if total else 0,
+        'realPercentage': f"{real / total * 100:.1f}" if total else 0,
+    }
+
+
+# ============================================================================
+# HISTORY ROUTES
+# ============================================================================
+
+@history_bp.route('/api/analyses', methods=['POST'])
+@token_required
+def save_analyses(current_user):
+    """Saves one analysis or {"analyses": [...]}; ids already stored are skipped."""
+    data = request.get_json() or {}
+    items = data.get('analyses', [data] if 'id' in data else None)
+
+    if not isinstance(items, list) or not all(isinstance(i, dict) for i in items):
+        return jsonify({'message': 'analyses must be a list of objects'}), 400
+    if len(items) > MAX_ANALYSES_PER_REQUEST:
+        return jsonify({'message': f'At most {MAX_ANALYSES_PER_REQUEST} analyses per request'}), 400
+    try:
+        rows = [_row(current_user.id, item) for item in items]
+    except (KeyError, TypeError, ValueError, OverflowError):  # OverflowError: int(float('inf'))
+        return jsonify({'message': 'Each analysis needs a 64-bit integer id and a string jobDescription'}), 400
+
+    saved = 0
+    if rows:
+        statement = insert(Analysis.__table__).on_conflict_do_nothing(index_elements=['user_id', 'client_id'])
+        try:
+            saved = db.session.connection().execute(statement, rows).rowcount
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Saving analyses failed: {e}")
+            return jsonify({'message': 'Could not save analyses'}), 500
+    return jsonify({'saved': saved, 'skipped': len(rows) - saved}), 201
+
+
+@history_bp.route('/api/analyses', methods=['GET'])
+@token_required
+def search_analyses(current_user):
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    min_score = request.args.get('min_score', type=float)
+    max_score = request.args.get('max_score', type=float)
+    risk = (request.args.get('risk') or '').lower()
+    if risk not in ('', 'low', 'high'):
+        return jsonify({'message': "risk must be 'low' or 'high'"}), 400
+
+    query = Analysis.query.filter(Analysis.user_id == current_user.id)
+    if min_score is not None:
+        query = query.filter(Analysis.real_score >= min_score)
+    if max_score is not None:
+        query = query.filter(Analysis.real_score <= max_score)
+    if risk:
+        # Same rule as rank_jobs' risk_level, under the user's scoring policy.
+        threshold = select_policy(current_user.id).safe_threshold
+        query = query.filter(Analysis.real_score >= threshold if risk == 'low' else Analysis.real_score < threshold)
+
+    match = fts_query(request.args.get('q'))
+    if match:
+        query = (query.join(analysis_fts, analysis_fts.c.rowid == Analysis.id)
+                 .filter(literal_column('analysis_fts').op('MATCH')(match))
+                 .order_by(func.bm25(literal_column('analysis_fts')), Analysis.client_id.desc()))
+    else:
+        # Client ids are creation times, so this is newest first.
+        query = query.order_by(Analysis.client_id.desc())
+
+    results = query.paginate(page=page, per_page=per_page, error_out=False)
+    return jsonify({
+        'analyses': [to_dict(a) for a in results.items],
+        'total': results.total,
+        'page': page,
+        'perPage': per_page,
+        'pages': results.pages,
+    })
+
+
+@history_bp.route('/api/analyses/stats', methods=['GET'])
+@token_required
+def analysis_stats(current_user):
+    return jsonify(history_stats(current_user.id))
+
+
+@history_bp.route('/api/analyses/<int:client_id>', methods=['DELETE'])
+@token_required
+def delete_analysis(current_user, client_id):
+    if client_id not in CLIENT_ID_RANGE:
+        return jsonify({'message': 'Analysis not found'}), 404
+    load_dictionaries()  # the FTS trigger unpacks cold rows
+    deleted = Analysis.query.filter_by(user_id=current_user.id, client_id=client_id).delete()
+    db.session.commit()
+    if not deleted:
+        return jsonify({'message': 'Analysis not found'}), 404
+    return jsonify({'deleted': deleted})
+
+
+@history_bp.route('/api/analyses', methods=['DELETE'])
+@token_required
+def clear_analyses(current_user):
+    load_dictionaries()
+    deleted = Analysis.query.filter_by(user_id=current_user.id).delete()
+    db.session.commit()
+    return jsonify({'deleted': deleted})
@@ -0,0 +1,269 @@
+"""
+Lexical (BM25) retrieval over a user's stored job descriptions, blended with
+embeddings.
+
+Cosine over MiniLM embeddings blurs exact requirements -- a certification or
+a tool name counts for little in a whole-document vector -- and costs a model
+call per document. Search therefore runs in two stages:
+
+1. BM25 over an in-memory inverted index of the user's stored job
+   descriptions (BlobRef rows of kind 'jd') shortlists candidates;
+2. only the shortlist goes on to dense scoring: /api/search_texts embeds it
+   and blends both signals; rank_jobs with `?q=` runs the full scoring
+   pipeline on it (see shortlist_analyses()).
+
+Indexes are built per user on first use and kept up to date incrementally.
+Each index remembers the user's blob version (a counter bumped in the same
+transaction as every BlobRef change, see models.py); only when it moved does
+the index diff the user's JD hashes and add or remove the documents that
+changed. Because the counter is read from committed rows, uploads handled by
+other workers are picked up and rolled-back uploads never indexed.
+"""
+import math
+import threading
+from collections import OrderedDict
+
+from flask import Blueprint, request, jsonify
+
+from auth import token_required
+from blobstore import hash_text, load_texts
+from extensions import db
+from metrics import cache_lookup
+from models import BlobRef, get_blob_version
+from nlp import encode
+from skills import tokenize
+
+lexical_bp = Blueprint('lexical', __name__)
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+DEFAULT_SHORTLIST = 100
+DEFAULT_ALPHA = 0.5  # weight of the lexical score in the blend
+MAX_SHORTLIST = 1000
+MAX_INDEXED_USERS = 256
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the
+their this to was we were will with you your our us
+""".split())
+
+
+def terms(text):
+    return [t for t in tokenize(text) if t not in STOPWORDS]
+
+
+def parse_query(raw):
+    """A search query from a request, or None for "no lexical stage"."""
+    return raw.strip() if isinstance(raw, str) and raw.strip() else None
+
+
+def parse_shortlist(raw):
+    try:
+        return min(max(int(raw), 1), MAX_SHORTLIST)
+    except (TypeError, ValueError):
+        return DEFAULT_SHORTLIST
+
+
+# ============================================================================
+# BM25 INDEX
+# ============================================================================
+class BM25Index:
+    """Inverted index with incremental add/remove. Documents are keyed by sha256."""
+
+    def __init__(self, k1=BM25_K1, b=BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}     # term -> {doc: term frequency}
+        self.doc_terms = {}    # doc -> {term: tf}, needed to unindex a document
+        self.doc_length = {}
+        self.total_length = 0
+        self.version = None    # blob version of the user's texts last synced
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.doc_length)
+
+    def __contains__(self, doc):
+        return doc in self.doc_length
+
+    def add(self, doc, text):
+        counts = {}
+        for term in terms(text):
+            counts[term] = counts.get(term, 0) + 1
+        if doc in self.doc_length:
+            self.remove(doc)
+        for term, tf in counts.items():
+            self.postings.setdefault(term, {})[doc] = tf
+        self.doc_terms[doc] = counts
+        self.doc_length[doc] = sum(counts.values())
+        self.total_length += self.doc_length[doc]
+
+    def remove(self, doc):
+        counts = self.doc_terms.pop(doc, None)
+        if counts is None:
+            return
+        for term in counts:
+            docs = self.postings[term]
+            docs.pop(doc, None)
+            if not docs:
+                del self.postings[term]
+        self.total_length -= self.doc_length.pop(doc)
+
+    def search(self, query, limit=DEFAULT_SHORTLIST, restrict=None):
+        """Returns [(doc, score)] best first, only documents sharing a query term."""
+        n = len(self.doc_length)
+        if not n:
+            return []
+        avgdl = self.total_length / n or 1.0
+        scores = {}
+        for term in set(terms(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc, tf in docs.items():
+                if restrict is not None and doc not in restrict:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_length[doc] / avgdl)
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda x: (-x[1], x[0]))[:limit]
+
+
+# --- Per-User Indexes ---
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def clear_indexes():
+    with _indexes_lock:
+        _indexes.clear()
+
+
+def user_index(user_id):
+    """The user's BM25 index, synced with their stored job descriptions."""
+    with _indexes_lock:
+        index = _indexes.get(user_id)
+        cache_lookup('bm25_index', index is not None)
+        if index is None:
+            index = _indexes[user_id] = BM25Index()
+        _indexes.move_to_end(user_id)
+        while len(_indexes) > MAX_INDEXED_USERS:
+            _indexes.popitem(last=False)
+
+    version = get_blob_version(user_id)
+    with index.lock:
+        if index.version == version:
+            return index
+        stored = {sha for (sha,) in db.session.query(BlobRef.sha256)
+                  .filter(BlobRef.user_id == user_id, BlobRef.kind == 'jd')}
+        removed = [doc for doc in index.doc_length if doc not in stored]
+        added = [sha for sha in stored if sha not in index]
+        for doc in removed:
+            index.remove(doc)
+        if added:
+            for sha, text in load_texts(added).items():
+                index.add(sha, text)
+        index.version = version
+    return index
+
+
+# ============================================================================
+# HYBRID RANKING
+# ============================================================================
+def lexical_shortlist(index, query, shortlist=DEFAULT_SHORTLIST, restrict=None):
+    """
+    The cheap first stage: the best `shortlist` documents as [(doc, score)],
+    best first, with BM25 scaled by the best score to 0.0-1.0.
+    """
+    with index.lock:
+        candidates = index.search(query, shortlist, restrict)
+    if not candidates:
+        return []
+    top = candidates[0][1] or 1.0
+    return [(doc, score / top) for doc, score in candidates]
+
+
+def hybrid_search(index, query, top_k=10, shortlist=DEFAULT_SHORTLIST,
+                  alpha=DEFAULT_ALPHA, restrict=None, load_texts=load_texts):
+    """
+    BM25-shortlists `shortlist` documents, embeds only those, and returns the
+    top_k as [{hash, lexicalScore, semanticScore, score}] with every score on
+    a 0.0-100.0 scale. BM25 is scaled by the best shortlist score so the two
+    signals are comparable; alpha=1.0 skips the model entirely.
+    """
+    candidates = lexical_shortlist(index, query, shortlist, restrict)
+    if not candidates:
+        return []
+    lexical = dict(candidates)
+
+    semantic = {}
+    if alpha < 1.0:
+        texts = load_texts([doc for doc, _ in candidates])
+        docs = [doc for doc, _ in candidates if doc in texts]
+        vectors = encode([query] + [texts[doc] for doc in docs],
+                         normalize_embeddings=True, convert_to_numpy=True)
+        similarities = vectors[1:] @ vectors[0]
+        semantic = {doc: max(float(s), 0.0) for doc, s in zip(docs, similarities.tolist())}
+
+    results = []
+    for doc, _ in candidates:
+        blended = alpha * lexical[doc] + (1 - alpha) * semantic.get(doc, 0.0)
+        results.append({
+            'hash': doc,
+            'lexicalScore': round(lexical[doc] * 100, 1),
+            'semanticScore': round(semantic[doc] * 100, 1) if doc in semantic else None,
+            'score': round(blended * 100, 1),
+        })
+    results.sort(key=lambda r: r['score'], reverse=True)
+    return results[:top_k]
+
+
+def shortlist_analyses(user_id, analyses, query, shortlist=DEFAULT_SHORTLIST):
+    """
+    The lexical stage of rank_jobs: keeps the analyses whose job descriptions
+    are among the `shortlist` best BM25 matches for `query`, so only those
+    are embedded and scored. Returns (analyses, lexical_scores) best first,
+    scores 0.0-1.0. Uses the user's index when it holds every job
+    description of the batch (the hashed-upload path), otherwise an index
+    over the batch alone. Items whose jobDescription is not a string are
+    dropped, as rank_analyses() would skip them.
+    """
+    items = [item for item in analyses
+             if isinstance(item, dict) and isinstance(item.get('jobDescription') or '', str)]
+    keys = [item.get('jd_hash') or hash_text(item.get('jobDescription') or '') for item in items]
+    index = user_index(user_id)
+    if not all(key in index for key in keys):
+        index = BM25Index()
+        for key, item in zip(keys, items):
+            index.add(key, item.get('jobDescription') or '')
+    scores = dict(lexical_shortlist(index, query, shortlist, restrict=set(keys)))
+    kept = sorted((i for i, key in enumerate(keys) if key in scores), key=lambda i: -scores[keys[i]])
+    return [items[i] for i in kept], [scores[keys[i]] for i in kept]
+
+
+# ============================================================================
+# SEARCH ROUTE
+# ============================================================================
+@lexical_bp.route('/api/search_texts', methods=['POST'])
+@token_required
+def search_texts(current_user):
+    data = request.get_json() or {}
+    query = data.get('query')
+    if not isinstance(query, str) or not query.strip():
+        return jsonify({'message': 'query is required'}), 400
+
+    top_k = data.get('top_k', 10)
+    shortlist = data.get('shortlist', DEFAULT_SHORTLIST)
+    alpha = data.get('alpha', DEFAULT_ALPHA)
+    if not isinstance(top_k, int) or not isinstance(shortlist, int) or top_k < 1 or shortlist < 1:
+        return jsonify({'message': 'top_k and shortlist must be positive integers'}), 400
+    if not isinstance(alpha, (int, float)) or not 0.0 <= alpha <= 1.0:
+        return jsonify({'message': 'alpha must be between 0 and 1'}), 400
+
+    restrict = data.get('hashes')
+    restrict = {sha for sha in restrict if isinstance(sha, str)} if isinstance(restrict, list) else None
+    shortlist = min(max(shortlist, top_k), MAX_SHORTLIST)
+
+    index = user_index(current_user.id)
+    results = hybrid_search(index, query, top_k, shortlist, alpha, restrict)
+    return jsonify({'results': results, 'indexed': len(index)}), 200
@@ -0,0 +1,177 @@
+"""
+Local stand-in for the Hugging Face Space classifier (`/analyze_text`).
+
+Returns the same two outputs the frontend reads from `hfResponse.data`:
+a label/confidences dict and a SHAP explanation HTML string. The label is
+derived from the same red-flag phrases the frontend safety net uses, so
+scam-heavy corpora still come back mostly "Fake".
+
+    python -m loadtest.fake_gradio --port 7860 --latency-ms 300 --jitter-ms 100 --error-rate 0.02
+
+Endpoints:
+    POST /analyze_text                      {"data": [text]} -> {"data": [confidence, shap_html]}
+    POST /gradio_api/call/analyze_text      {"data": [text]} -> {"event_id": ...}
+    GET  /gradio_api/call/analyze_text/<id> server-sent "complete" event with the data
+"""
+import argparse
+import html
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.corpus import SCAM_PHRASES
+
+
+def classify(text, rng):
+    lowered = text.lower()
+    hits = [p for p in SCAM_PHRASES if p in lowered]
+    real = rng.uniform(0.01, 0.2) if hits else rng.uniform(0.6, 0.98)
+    confidence = {
+        'label': 'Real' if real >= 0.5 else 'Fake',
+        'confidences': [
+            {'label': 'Real' if real >= 0.5 else 'Fake', 'confidence': round(max(real, 1 - real), 4)},
+            {'label': 'Fake' if real >= 0.5 else 'Real', 'confidence': round(min(real, 1 - real), 4)},
+        ],
+    }
+    return confidence, shap_html(text, hits, rng)
+
+
+def shap_html(text, hits, rng):
+    # Roughly the size and shape of the real SHAP output: one span per token.
+    spans = []
+    for token in re.findall(r'\S+', text)[:400]:
+        weight = rng.uniform(-0.05, 0.05)
+        if any(token.lower().strip('.,') in p for p in hits):
+            weight = rng.uniform(0.2, 0.6)
+        colour = f"rgba(255,0,0,{abs(weight):.2f})" if weight > 0 else f"rgba(0,0,255,{abs(weight):.2f})"
+        spans.append(f'<span style="background-color:{colour}" title="{weight:.3f}">{html.escape(token)}</span>')
+    return '<div class="shap-explanation">' + ' '.join(spans) + '</div>'
+
+
+class FakeGradioServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms, jitter_ms, error_rate, seed):
+        super().__init__(address, Handler)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.events = {}
+        self.events_lock = threading.Lock()
+
+    def draw(self):
+        with self.rng_lock:
+            delay = max(0.0, self.rng.gauss(self.latency_ms, self.jitter_ms)) / 1000
+            failed = self.rng.random() < self.error_rate
+            seed = self.rng.random()
+        return delay, failed, random.Random(seed)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_text(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        data = payload.get('data') or [payload.get('text', '')]
+        return data[0] if isinstance(data[0], str) else data[0].get('text', '')
+
+    def _predict(self, text):
+        delay, failed, rng = self.server.draw()
+        time.sleep(delay)
+        if failed:
+            return None
+        return list(classify(text, rng))
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_POST(self):
+        try:
+            text = self._read_text()
+        except (ValueError, IndexError, AttributeError):
+            self._send_json(400, {'error': 'expected {"data": [text]}'})
+            return
+
+        if self.path == '/analyze_text':
+            data = self._predict(text)
+            if data is None:
+                self._send_json(500, {'error': 'Simulated upstream failure'})
+            else:
+                self._send_json(200, {'data': data})
+        elif self.path == '/gradio_api/call/analyze_text':
+            event_id = uuid.uuid4().hex
+            with self.server.events_lock:
+                self.server.events[event_id] = text
+            self._send_json(200, {'event_id': event_id})
+        else:
+            self._send_json(404, {'error': 'Not found'})
+
+    def do_GET(self):
+        prefix = '/gradio_api/call/analyze_text/'
+        if not self.path.startswith(prefix):
+            self._send_json(404, {'error': 'Not found'})
+            return
+        with self.server.events_lock:
+            text = self.server.events.pop(self.path[len(prefix):], None)
+        if text is None:
+            self._send_json(404, {'error': 'Unknown event'})
+            return
+
+        data = self._predict(text)
+        if data is None:
+            body = 'event: error\ndata: null\n\n'
+        else:
+            body = f'event: complete\ndata: {json.dumps(data)}\n\n'
+        encoded = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Content-Length', str(len(encoded)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(encoded)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Local stand-in for the Gradio classifier.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7860)
+    parser.add_argument('--latency-ms', type=float, default=300.0)
+    parser.add_argument('--jitter-ms', type=float, default=100.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    server = FakeGradioServer((args.host, args.port), args.latency_ms, args.jitter_ms,
+                              args.error_rate, args.seed)
+    print(f"[fake-gradio] listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
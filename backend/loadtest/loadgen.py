@@ -0,0 +1,186 @@
+"""
+Scripted load generator replaying realistic user sessions.
+
+Each virtual user runs: signup -> login -> N x (analyze -> rank) -> history,
+where `analyze` calls the classifier (normally loadtest.fake_gradio),
+`rank` scores the freshly analyzed job like JobDescription.jsx does, and
+`history` re-ranks the user's whole accumulated history like the Ranking tab.
+
+    python -m loadtest.fake_gradio --port 7860 &
+    python -m loadtest.loadgen --api http://127.0.0.1:5000 \\
+        --classifier http://127.0.0.1:7860 --users 50 --duration 120
+
+Reports per-step throughput, error counts and latency percentiles.
+"""
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+from benchmarks import corpus
+
+
+class Client:
+    """One keep-alive connection per host, per virtual user."""
+
+    def __init__(self, base_url, timeout):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.https = parts.scheme == 'https'
+        self.timeout = timeout
+        self.conn = None
+
+    def _connect(self):
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        self.conn = cls(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method, path, payload=None, token=None):
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        for attempt in (0, 1):
+            if self.conn is None:
+                self._connect()
+            try:
+                self.conn.request(method, path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                data = response.read()
+                return response.status, data
+            except (http.client.HTTPException, ConnectionError, OSError):
+                # Stale keep-alive socket: reconnect once, then give up.
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, step, seconds, ok):
+        with self.lock:
+            self.latencies.setdefault(step, []).append(seconds)
+            if not ok:
+                self.errors[step] = self.errors.get(step, 0) + 1
+
+    def report(self, elapsed):
+        print(f"{'step':<10} {'reqs':>7} {'err':>5} {'req/s':>8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        for step in ('signup', 'login', 'analyze', 'rank', 'history'):
+            values = sorted(self.latencies.get(step, []))
+            if not values:
+                continue
+
+            def pct(p):
+                return values[min(len(values) - 1, int(p / 100 * len(values)))] * 1000
+
+            print(f"{step:<10} {len(values):>7} {self.errors.get(step, 0):>5} "
+                  f"{len(values) / elapsed:>8.1f} {pct(50):>9.1f} {pct(90):>9.1f} "
+                  f"{pct(99):>9.1f} {values[-1] * 1000:>9.1f}")
+
+
+def timed(stats, step, fn):
+    started = time.perf_counter()
+    try:
+        status, data = fn()
+    except Exception:
+        stats.record(step, time.perf_counter() - started, False)
+        return None, None
+    stats.record(step, time.perf_counter() - started, 200 <= status < 300)
+    return status, data
+
+
+def run_session(user_index, args, stats, deadline):
+    rng = random.Random(args.seed * 100003 + user_index)
+    api = Client(args.api, args.timeout)
+    classifier = Client(args.classifier, args.timeout)
+
+    email = f"load-{uuid.uuid4().hex[:12]}@example.com"
+    profession = rng.choice(corpus.PROFESSIONS)
+    credentials = {'email': email, 'password': 'loadtest123'}
+
+    status, data = timed(stats, 'signup', lambda: api.request(
+        'POST', '/api/signup', {'name': f'Load {user_index}', 'profession': profession, **credentials}))
+    if status != 201:
+        time.sleep(1.0)  # don't spin against a backend that is down
+        return
+    status, data = timed(stats, 'login', lambda: api.request('POST', '/api/login', credentials))
+    if status != 200:
+        time.sleep(1.0)
+        return
+    token = json.loads(data)['token']
+    resume = corpus.resume(rng, profession)
+
+    history = []
+    for step in range(args.analyses_per_user):
+        if time.monotonic() >= deadline:
+            break
+        scam = rng.random() < args.scam_ratio
+        posting_profession = profession if rng.random() < 0.66 else rng.choice(corpus.PROFESSIONS)
+        text = corpus.job_description(rng, posting_profession, rng.choice(list(corpus.LENGTHS)), scam)
+
+        status, data = timed(stats, 'analyze', lambda: classifier.request(
+            'POST', '/analyze_text', {'data': [text]}))
+        if status != 200:
+            continue
+        confidence, shap = json.loads(data)['data']
+
+        analysis = {'id': len(history), 'jobDescription': text, 'resumeText': resume,
+                    'confidence': confidence, 'shapExplanation': shap}
+        timed(stats, 'rank', lambda: api.request(
+            'POST', '/api/rank_jobs', {'analyses': [analysis]}, token))
+        history.append(analysis)
+        time.sleep(rng.uniform(0, args.think_time))
+
+    if history and time.monotonic() < deadline:
+        timed(stats, 'history', lambda: api.request(
+            'POST', '/api/rank_jobs', {'analyses': history}, token))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay user sessions against the backend.')
+    parser.add_argument('--api', default='http://127.0.0.1:5000')
+    parser.add_argument('--classifier', default='http://127.0.0.1:7860')
+    parser.add_argument('--users', type=int, default=20, help='Concurrent virtual users.')
+    parser.add_argument('--duration', type=float, default=60.0, help='Seconds to keep starting sessions.')
+    parser.add_argument('--analyses-per-user', type=int, default=5)
+    parser.add_argument('--think-time', type=float, default=1.0, help='Max seconds between steps.')
+    parser.add_argument('--scam-ratio', type=float, default=0.2)
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    stats = Stats()
+    started = time.monotonic()
+    deadline = started + args.duration
+    counter = {'next': 0}
+    counter_lock = threading.Lock()
+
+    def virtual_user():
+        while time.monotonic() < deadline:
+            with counter_lock:
+                index = counter['next']
+                counter['next'] += 1
+            run_session(index, args, stats, deadline)
+
+    threads = [threading.Thread(target=virtual_user, daemon=True) for _ in range(args.users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    elapsed = time.monotonic() - started
+    print(f"{counter['next']} sessions from {args.users} users in {elapsed:.1f}s")
+    stats.report(elapsed)
+
+
+if __name__ == '__main__':
+    main()
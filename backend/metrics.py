@@ -0,0 +1,290 @@
+"""
+In-process metrics with a Prometheus text endpoint (GET /metrics).
+
+A deliberately small registry (counters, gauges, histograms with labels) so
+the backend has no hard dependency on prometheus_client. Values are per
+process: under serve.py every forked worker keeps its own registry and
+reports its pid in `sentinel_process_info`.
+"""
+import bisect
+import os
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+BATCH_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 384, 512, 1024, 2048, 4096)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    pairs.extend(f'{n}="{_escape(v)}"' for n, v in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, '')) for n in self.labelnames)
+
+    def header(self):
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {value}')
+        return lines
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        super().__init__(name, documentation, labelnames)
+        # A callback returning {label_tuple: value} is evaluated at scrape time.
+        self.callback = callback
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def render(self):
+        lines = self.header()
+        values = self.callback() if self.callback else None
+        with self._lock:
+            items = sorted((values if values is not None else self._values).items())
+        for key, value in items:
+            lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {value}')
+        return lines
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            items = sorted((k, ([*v[0]], v[1], v[2])) for k, v in self._values.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                labels = _format_labels(self.labelnames, key, [('le', bound)])
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key, [('le', '+Inf')])
+            lines.append(f'{self.name}_bucket{labels} {count}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {total}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+REGISTRY = []
+
+
+# --- Process Memory ---
+def memory_usage(pid='self'):
+    """
+    Returns {'rss', 'pss', 'uss'} in bytes for a process. USS (private clean +
+    private dirty) is what the process would free if it exited, i.e. the part
+    that is NOT shared with a forking master.
+    """
+    usage = {'rss': 0, 'pss': 0, 'uss': 0}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as fh:
+            for line in fh:
+                key, _, rest = line.partition(':')
+                parts = rest.split()
+                if not parts or not parts[0].isdigit():
+                    continue
+                kb = int(parts[0]) * 1024
+                if key == 'Rss':
+                    usage['rss'] = kb
+                elif key == 'Pss':
+                    usage['pss'] = kb
+                elif key in ('Private_Clean', 'Private_Dirty'):
+                    usage['uss'] += kb
+    except OSError:
+        try:
+            import resource
+            # ru_maxrss is KiB on Linux; good enough where /proc is missing.
+            usage['rss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        except (ImportError, OSError):
+            pass
+    return usage
+
+
+_process = {'role': ''}
+
+
+def _process_values():
+    # Evaluated per scrape so forked workers report their own pid.
+    return {(os.getpid(), _process['role']): 1}
+
+
+def _memory_values():
+    usage = memory_usage()
+    return {(kind,): value for kind, value in usage.items()}
+
+
+# ============================================================================
+# METRIC DEFINITIONS
+# ============================================================================
+REQUEST_LATENCY = Histogram(
+    'sentinel_http_request_duration_seconds', 'HTTP request latency by route.',
+    ('route', 'method', 'status'))
+ENCODE_CALLS = Counter(
+    'sentinel_encode_calls_total', 'Calls into the sentence embedding model.', ('model',))
+ENCODE_BATCH_SIZE = Histogram(
+    'sentinel_encode_batch_size', 'Texts per embedding model call.', ('model',), BATCH_BUCKETS)
+ENCODE_TOKENS = Histogram(
+    'sentinel_encode_tokens', 'Tokenizer length of each encoded text.', ('model',), TOKEN_BUCKETS)
+ENCODE_LATENCY = Histogram(
+    'sentinel_encode_duration_seconds', 'Wall time of embedding model calls.', ('model',))
+CACHE_REQUESTS = Counter(
+    'sentinel_cache_requests_total', 'Cache lookups by cache and result.', ('cache', 'result'))
+ITEMS_SKIPPED = Counter(
+    'sentinel_items_skipped_total', 'Ranking items skipped, by exception class.', ('route', 'error'))
+SIMILARITY_ERRORS = Counter(
+    'sentinel_similarity_errors_total', 'Embedding or similarity failures in the NLP helpers.', ('error',))
+RERANK_ITEMS = Counter(
+    'sentinel_rerank_items_total', 'Top-k items offered to the cross-encoder, by outcome.', ('result',))
+EXTRACTIONS = Counter(
+    'sentinel_resume_extractions_total', 'Resume files parsed, by file kind and result.', ('kind', 'result'))
+EXTRACT_LATENCY = Histogram(
+    'sentinel_resume_extraction_duration_seconds', 'Wall time of resume extraction, incl. queueing.', ('kind',))
+EMBEDDING_SERVING = Gauge(
+    'sentinel_embedding_serving', '1 for the embedding model serving requests, else 0.', ('model',))
+EMBEDDING_MIGRATION_PROGRESS = Gauge(
+    'sentinel_embedding_migration_progress', 'Share of stored texts embedded with the model, 0-1.', ('model',))
+EMBEDDINGS_MIGRATED = Counter(
+    'sentinel_embeddings_migrated_total', 'Stored texts re-embedded by the migrator.', ('model',))
+HISTORY_COMPACTIONS = Counter(
+    'sentinel_history_compactions_total', 'Column store compactions of analysis history, by result.', ('result',))
+ANALYSES_ARCHIVED = Counter(
+    'sentinel_analyses_archived_total', 'History rows moved to cold storage or deleted by retention.', ('action',))
+ARCHIVE_BYTES = Counter(
+    'sentinel_archive_bytes_total', 'Text archived to cold storage, before (raw) and after compression.', ('kind',))
+RANK_BATCH_SIZE = Histogram(
+    'sentinel_rank_batch_size', 'Analyses per ranking request.', (), BATCH_BUCKETS)
+SERIALIZE_LATENCY = Histogram(
+    'sentinel_serialize_duration_seconds', 'JSON encoding time of scoring responses.', (), DB_BUCKETS)
+DB_QUERY_LATENCY = Histogram(
+    'sentinel_db_query_duration_seconds', 'Database statement latency.', ('statement',), DB_BUCKETS)
+PROCESS_MEMORY = Gauge(
+    'sentinel_process_memory_bytes', 'Resident memory of this process.', ('kind',),
+    callback=_memory_values)
+PROCESS_INFO = Gauge(
+    'sentinel_process_info', 'Constant 1, labelled with the serving process.', ('pid', 'role'),
+    callback=_process_values)
+
+
+def cache_lookup(cache, hit):
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+# --- DB Timing ---
+# Listening on the Engine class covers every engine Flask-SQLAlchemy creates.
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('sentinel_query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('sentinel_query_start')
+    if starts:
+        verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'UNKNOWN'
+        DB_QUERY_LATENCY.observe(time.perf_counter() - starts.pop(), statement=verb)
+
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; drop its start
+    # time so the stack stays balanced on long-lived pooled connections.
+    conn = exception_context.connection
+    if conn is None or exception_context.is_pre_ping:
+        return
+    starts = conn.info.get('sentinel_query_start')
+    if starts:
+        starts.pop()
+
+
+# --- Request Timing ---
+# Flask is only imported here, so the registry itself (and everything that
+# records into it) stays usable from Flask-free code such as batch.py.
+def init_app(app):
+    from flask import Response, g, request
+
+    _process['role'] = app.config.get('SENTINEL_ROLE', '')
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _record_latency(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            REQUEST_LATENCY.observe(time.perf_counter() - started, route=route,
+                                    method=request.method, status=response.status_code)
+        return response
+
+    def metrics():
+        return Response(render(), mimetype='text/plain; version=0.0.4')
+
+    app.add_url_rule('/metrics', 'metrics', metrics, methods=['GET'])
@@ -0,0 +1,252 @@
+import datetime
+import time
+
+from sqlalchemy import DDL, event
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from werkzeug.security import generate_password_hash
+
+from extensions import db
+from metrics import cache_lookup
+
+# --- User Model ---
+class User(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    email = db.Column(db.String(100), unique=True, nullable=False)
+    password = db.Column(db.String(200), nullable=False)
+    profession = db.Column(db.String(100), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+    def __repr__(self):
+        return f'<User {self.email}>'
+
+# --- Counter Model ---
+# Materialized aggregates kept in step with the tables they count, so hot
+# read paths never need a full-table COUNT(*).
+class Counter(db.Model):
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+USER_COUNTER = 'users'
+USER_COUNT_TTL = 5.0  # seconds a cached count may be served before re-reading
+_user_count_cache = {'value': None, 'expires': 0.0}
+
+def _bump_user_counter(connection, delta):
+    # Runs on the flush connection, i.e. inside the same transaction as the
+    # INSERT/DELETE on the user table, so the counter can never drift.
+    counters = Counter.__table__
+    connection.execute(
+        counters.update()
+        .where(counters.c.name == USER_COUNTER)
+        .values(value=counters.c.value + delta)
+    )
+    _user_count_cache['expires'] = 0.0
+
+@event.listens_for(User, 'after_insert')
+def _user_inserted(mapper, connection, target):
+    _bump_user_counter(connection, 1)
+
+@event.listens_for(User, 'after_delete')
+def _user_deleted(mapper, connection, target):
+    _bump_user_counter(connection, -1)
+
+def get_user_count():
+    """Returns the materialized user count, cached in-process for a short TTL."""
+    now = time.monotonic()
+    hit = _user_count_cache['value'] is not None and now < _user_count_cache['expires']
+    cache_lookup('user_count', hit)
+    if not hit:
+        counter = db.session.get(Counter, USER_COUNTER)
+        _user_count_cache['value'] = counter.value if counter else 0
+        _user_count_cache['expires'] = now + USER_COUNT_TTL
+    return _user_count_cache['value']
+
+def clear_user_count_cache():
+    _user_count_cache.update(value=None, expires=0.0)
+
+# --- Database Initialization ---
+# Schema creation and seeding run out-of-band (`flask --app app init-db`)
+# rather than at import, so workers never pay for DDL or scrypt hashing.
+def init_db():
+    db.create_all()
+    if db.session.get(Counter, USER_COUNTER) is None:
+        # One-off backfill; from here on the counter is maintained by the
+        # User insert/delete listeners.
+        db.session.add(Counter(name=USER_COUNTER, value=User.query.count()))
+        db.session.commit()
+    # Read the row itself: get_user_count() may serve a count cached before
+    # the tables were (re)created.
+    users = db.session.query(Counter.value).filter(Counter.name == USER_COUNTER).scalar()
+    if users == 0:
+        default_users = [
+            User(
+                name='Admin User',
+                email='admin@example.com',
+                password=generate_password_hash('password123'),
+                profession='Administrator'
+            ),
+            User(
+                name='Regular User',
+                email='user@example.com',
+                password=generate_password_hash('user123'),
+                profession='Developer'
+            )
+        ]
+        db.session.add_all(default_users)
+        db.session.commit()
+        print("✅ Default users created!")
+
+# --- Content-Addressed Blobs ---
+# Large texts (job descriptions, resumes) stored once, keyed by the SHA-256 of
+# their UTF-8 bytes. `refcount` mirrors the number of BlobRef rows and is
+# updated in the same transaction; a blob is dropped when it reaches zero.
+class Blob(db.Model):
+    sha256 = db.Column(db.String(64), primary_key=True)
+    codec = db.Column(db.String(10), nullable=False)
+    size = db.Column(db.Integer, nullable=False)  # uncompressed bytes
+    data = db.Column(db.LargeBinary, nullable=False)
+    refcount = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+# `kind` says what the user stored the text as ('jd' or 'resume'; NULL when
+# the uploader did not say). Every insert, delete or update of a user's refs
+# bumps their 'blobs:<user_id>' counter in the same transaction, so caches
+# built from the refs (see lexical.py) notice changes with one PK read.
+BLOB_KINDS = ('jd', 'resume')
+
+class BlobRef(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    sha256 = db.Column(db.String(64), db.ForeignKey('blob.sha256'), primary_key=True)
+    kind = db.Column(db.String(10), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+def blob_counter(user_id):
+    return f'blobs:{int(user_id)}'
+
+def _bump_blob_version(mapper, connection, target):
+    counters = Counter.__table__
+    connection.execute(
+        sqlite_insert(counters)
+        .values(name=blob_counter(target.user_id), value=1)
+        .on_conflict_do_update(index_elements=['name'], set_={'value': counters.c.value + 1})
+    )
+
+for _event in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(BlobRef, _event, _bump_blob_version)
+
+def get_blob_version(user_id):
+    """Changes whenever the user's stored texts do."""
+    return db.session.query(Counter.value).filter(Counter.name == blob_counter(user_id)).scalar() or 0
+
+# --- Resume Extractions ---
+# Maps the SHA-256 of an uploaded file to the blob holding its extracted text,
+# so re-uploading the same file skips parsing. No foreign key: the text blob
+# may be released later, in which case the file is simply parsed again.
+class Extraction(db.Model):
+    file_sha256 = db.Column(db.String(64), primary_key=True)
+    text_sha256 = db.Column(db.String(64), nullable=False)
+    kind = db.Column(db.String(10), nullable=False)
+    pages = db.Column(db.Integer, nullable=True)
+    truncated = db.Column(db.Boolean, nullable=False, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+# --- Persisted Embeddings ---
+# One row per (text, model): vectors from different models are never
+# comparable, so the model name is part of the key. Vectors do not depend
+# on the scoring policy, so the policy version is not part of it.
+class Embedding(db.Model):
+    sha256 = db.Column(db.String(64), primary_key=True)
+    model = db.Column(db.String(200), primary_key=True)
+    dims = db.Column(db.Integer, nullable=False)
+    vector = db.Column(db.LargeBinary, nullable=False)  # float32, normalised
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+# Lifecycle of embedding models: exactly one is 'active' (serving); a newly
+# configured one is 'migrating' until enough stored texts are re-embedded,
+# then it is cut over and the old one becomes 'retired'.
+class EmbeddingModel(db.Model):
+    name = db.Column(db.String(200), primary_key=True)
+    state = db.Column(db.String(20), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    activated_at = db.Column(db.DateTime, nullable=True)
+
+# --- Analysis History ---
+# Analyses saved from the dashboard, one row per (user, client_id) where
+# client_id is the id the browser assigned (Date.now()). `real_score` is the
+# classifier's REAL confidence as 0-100, for score and risk filters.
+# Old rows are moved to the 'cold' tier: job_description, resume_text and
+# shap_explanation are emptied and kept compressed in `archive` instead
+# (see coldstore.py).
+class Analysis(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    client_id = db.Column(db.BigInteger, nullable=False)
+    timestamp = db.Column(db.String(64), nullable=True)  # as displayed by the client
+    label = db.Column(db.String(20), nullable=True)
+    real_score = db.Column(db.Float, nullable=False, default=0.0)
+    cv_match_score = db.Column(db.Float, nullable=True)
+    confidence = db.Column(db.Text, nullable=True)  # JSON
+    shap_explanation = db.Column(db.Text, nullable=True)
+    job_description = db.Column(db.Text, nullable=False)
+    resume_text = db.Column(db.Text, nullable=True)
+    resume_file_name = db.Column(db.String(255), nullable=True)
+    tier = db.Column(db.String(10), nullable=False, default='hot', server_default='hot')
+    archive = db.Column(db.LargeBinary, nullable=True)
+    archive_codec = db.Column(db.String(10), nullable=True)
+    archive_dict_id = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'client_id'),
+        db.Index('ix_analysis_user_created', 'user_id', 'created_at'),
+        db.Index('ix_analysis_tier_created', 'tier', 'created_at'),
+    )
+
+# Compression dictionaries for cold analyses, trained on stored SHAP HTML and
+# job descriptions. Never modified or deleted while rows reference them.
+class ArchiveDictionary(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    codec = db.Column(db.String(10), nullable=False)
+    data = db.Column(db.LargeBinary, nullable=False)
+    samples = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+# Full-text index over the searchable columns. External content: the FTS5
+# table stores only the index and reads column values from the
+# analysis_search view; the triggers keep it in step with every
+# INSERT/UPDATE/DELETE, whichever code path issues them. Moving a row between
+# tiers leaves its index entry alone. Cold rows keep an empty job_description
+# column, so the view and the triggers unpack the indexed text through the
+# sentinel_archived_text() SQL function that coldstore.py registers on every
+# connection.
+def _search_text(row=None):
+    """SQL for the indexed job description of `row` ('old', 'new' or the table itself)."""
+    p = f"{row}." if row else ""
+    return (f"CASE WHEN {p}tier = 'cold' THEN sentinel_archived_text({p}archive_codec, {p}archive_dict_id, "
+            f"{p}archive) ELSE {p}job_description END")
+
+
+ANALYSIS_FTS_DDL = (
+    f"CREATE VIEW IF NOT EXISTS analysis_search AS SELECT id, {_search_text()} AS job_description, "
+    "resume_file_name FROM analysis",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS analysis_fts USING fts5("
+    "job_description, resume_file_name, content='analysis_search', content_rowid='id', "
+    "tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS analysis_fts_insert AFTER INSERT ON analysis BEGIN "
+    "INSERT INTO analysis_fts(rowid, job_description, resume_file_name) "
+    "VALUES (new.id, new.job_description, new.resume_file_name); END",
+    "CREATE TRIGGER IF NOT EXISTS analysis_fts_delete AFTER DELETE ON analysis BEGIN "
+    "INSERT INTO analysis_fts(analysis_fts, rowid, job_description, resume_file_name) "
+    f"VALUES ('delete', old.id, {_search_text('old')}, old.resume_file_name); END",
+    "CREATE TRIGGER IF NOT EXISTS analysis_fts_update AFTER UPDATE OF job_description, resume_file_name "
+    "ON analysis WHEN old.tier = new.tier BEGIN "
+    "INSERT INTO analysis_fts(analysis_fts, rowid, job_description, resume_file_name) "
+    f"VALUES ('delete', old.id, {_search_text('old')}, old.resume_file_name); "
+    "INSERT INTO analysis_fts(rowid, job_description, resume_file_name) "
+    f"VALUES (new.id, {_search_text('new')}, new.resume_file_name); END",
+)
+
+for _statement in ANALYSIS_FTS_DDL:
+    event.listen(Analysis.__table__, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+for _statement in ("DROP TABLE IF EXISTS analysis_fts", "DROP VIEW IF EXISTS analysis_search"):
+    event.listen(Analysis.__table__, 'after_drop', DDL(_statement).execute_if(dialect='sqlite'))
@@ -0,0 +1,188 @@
+import os
+import threading
+import time
+
+from metrics import (ENCODE_BATCH_SIZE, ENCODE_CALLS, ENCODE_LATENCY, ENCODE_TOKENS,
+                     SIMILARITY_ERRORS)
+from timing import STARTUP_TIMINGS
+
+MODEL_NAME = os.environ.get('SENTINEL_EMBEDDING_MODEL', 'all-MiniLM-L6-v2')
+# sentence-transformers inference backend: 'torch' (default), 'onnx' or 'openvino'.
+NLP_BACKEND = os.environ.get('SENTINEL_NLP_BACKEND', 'torch')
+# Texts per forward pass when a request's texts are encoded together.
+EMBED_BATCH_SIZE = int(os.environ.get('SENTINEL_EMBED_BATCH_SIZE', '64'))
+
+# --- NLP Model (lazy) ---
+# Only processes that actually serve NLP routes import the sentence
+# transformers stack. Set SENTINEL_PRELOAD_NLP=1 to load it at startup instead
+# of on the first scoring request.
+#
+# Several embedding models can be loaded at once while stored embeddings are
+# migrated to a new one (see embeddings.py); requests are always served by
+# the single *serving* model so vectors from different models never meet.
+_models = {}
+_serving = {'model': MODEL_NAME}
+_nlp_util = None
+_nlp_lock = threading.Lock()
+
+def serving_model():
+    return _serving['model']
+
+def set_serving_model(name):
+    if name != _serving['model']:
+        print(f"Serving embeddings from {name}")
+        _serving['model'] = name
+
+def get_nlp_model(name=None):
+    global _nlp_util
+    name = name or _serving['model']
+    model = _models.get(name)
+    if model is None:
+        with _nlp_lock:
+            model = _models.get(name)
+            if model is None:
+                started = time.perf_counter()
+                from sentence_transformers import SentenceTransformer, util
+                STARTUP_TIMINGS.setdefault('nlp_import', time.perf_counter() - started)
+
+                started = time.perf_counter()
+                print(f"Loading Sentence Transformer model {name}...")
+                _nlp_util = util
+                if NLP_BACKEND == 'torch':
+                    model = SentenceTransformer(name)
+                else:
+                    model = SentenceTransformer(name, backend=NLP_BACKEND)
+                _models[name] = model
+                STARTUP_TIMINGS.setdefault('nlp_model', time.perf_counter() - started)
+                print("Model loaded successfully!")
+    return model
+
+# --- Cross-Encoder Reranker (lazy, optional) ---
+# Scores (job description, resume) pairs jointly. Far more accurate than the
+# bi-encoder cosine but a full forward pass per pair, so it is only ever run
+# on a short list; see scoring.rerank_top().
+RERANK_MODEL_NAME = os.environ.get('SENTINEL_RERANK_MODEL', 'cross-encoder/ms-marco-MiniLM-L-6-v2')
+RERANK_BATCH_SIZE = 8
+_reranker = None
+
+def get_reranker():
+    global _reranker
+    if _reranker is None:
+        with _nlp_lock:
+            if _reranker is None:
+                started = time.perf_counter()
+                from sentence_transformers import CrossEncoder
+                print("Loading cross-encoder reranker...")
+                _reranker = CrossEncoder(RERANK_MODEL_NAME, device='cpu')
+                STARTUP_TIMINGS['rerank_model'] = time.perf_counter() - started
+    return _reranker
+
+def rerank_scores(pairs):
+    """Cross-encoder relevance of (text_a, text_b) pairs, each 0.0-100.0."""
+    reranker = get_reranker()
+    ENCODE_CALLS.inc(model=RERANK_MODEL_NAME)
+    ENCODE_BATCH_SIZE.observe(len(pairs), model=RERANK_MODEL_NAME)
+    started = time.perf_counter()
+    try:
+        # Single-label cross-encoders apply a sigmoid, so scores are 0-1.
+        scores = reranker.predict(pairs, batch_size=RERANK_BATCH_SIZE, convert_to_numpy=True)
+    finally:
+        ENCODE_LATENCY.observe(time.perf_counter() - started, model=RERANK_MODEL_NAME)
+    return [float(round(min(max(s, 0.0), 1.0) * 100, 1)) for s in scores.tolist()]
+
+def encode(texts, model=None, **kwargs):
+    """
+    The single entry point to the embedding models, so every call is counted:
+    batch size, tokenizer length per text and wall time. `model` defaults to
+    the serving model.
+    """
+    model = model or _serving['model']
+    nlp_model = get_nlp_model(model)
+    batch = [texts] if isinstance(texts, str) else list(texts)
+
+    ENCODE_CALLS.inc(model=model)
+    ENCODE_BATCH_SIZE.observe(len(batch), model=model)
+    try:
+        for ids in nlp_model.tokenizer(batch, add_special_tokens=True)['input_ids']:
+            ENCODE_TOKENS.observe(len(ids), model=model)
+    except Exception:
+        pass  # token accounting must never break inference
+
+    started = time.perf_counter()
+    try:
+        return nlp_model.encode(texts, **kwargs)
+    finally:
+        ENCODE_LATENCY.observe(time.perf_counter() - started, model=model)
+
+def embed(text):
+    """
+    Encodes one text to a tensor, or returns None (after logging) if encoding
+    fails. Callers treat None as "no similarity", matching
+    compute_nlp_similarity's 0.0-on-error behaviour.
+    """
+    if not text:
+        return None
+    try:
+        return encode(text, convert_to_tensor=True)
+    except Exception as e:
+        print(f"Error in semantic matching: {e}")
+        SIMILARITY_ERRORS.inc(error=type(e).__name__)
+        return None
+
+
+def embed_many(texts, batch_size=EMBED_BATCH_SIZE):
+    """
+    Encodes the distinct non-empty texts in one batched encode() call and
+    returns {text: embedding}. If the batch fails every text maps to None,
+    as embed() does for a single text.
+    """
+    batch = list(dict.fromkeys(t for t in texts if isinstance(t, str) and t))
+    if not batch:
+        return {}
+    try:
+        matrix = encode(batch, batch_size=batch_size, convert_to_tensor=True)
+    except Exception as e:
+        print(f"Error in semantic matching: {e}")
+        SIMILARITY_ERRORS.inc(error=type(e).__name__)
+        return dict.fromkeys(batch)
+    return dict(zip(batch, matrix))
+
+
+def similarity_score(embedding1, embedding2):
+    """Cosine similarity of two embeddings from embed(), as a 0.0-100.0 score."""
+    if embedding1 is None or embedding2 is None:
+        return 0.0
+    try:
+        similarity = _nlp_util.cos_sim(embedding1, embedding2)[0][0].item()
+        return float(round(max(similarity, 0) * 100, 1))
+    except Exception as e:
+        print(f"Error in semantic matching: {e}")
+        SIMILARITY_ERRORS.inc(error=type(e).__name__)
+        return 0.0
+
+# --- NEW HELPER: SEMANTIC NLP MATCHING ---
+def compute_nlp_similarity(text1, text2):
+    """
+    Uses Sentence Transformers to compare the semantic meaning of two strings.
+    Returns a score between 0.0 and 100.0
+    """
+    if not text1 or not text2:
+        return 0.0
+    
+    try:
+        # Convert texts to dense semantic vectors
+        embeddings1 = encode(text1, convert_to_tensor=True)
+        embeddings2 = encode(text2, convert_to_tensor=True)
+        
+        # Calculate cosine similarity of the dense vectors
+        cosine_scores = _nlp_util.cos_sim(embeddings1, embeddings2)
+        
+        # Extract the value from the tensor object
+        similarity = cosine_scores[0][0].item()
+        
+        # Force Python float and ensure it doesn't dip below 0
+        return float(round(max(similarity, 0) * 100, 1))
+    except Exception as e:
+        print(f"Error in semantic matching: {e}")
+        SIMILARITY_ERRORS.inc(error=type(e).__name__)
+        return 0.0
@@ -0,0 +1,381 @@
+"""
+The scoring pipeline: ranking a user's analyses (rank_analyses) and ranking
+candidates against one job (rank_candidates).
+
+Flask-free, so the HTTP routes (scoring.py, asgi.py), the offline batch CLI
+(batch.py) and the benchmarks all run exactly the same code.
+"""
+import os
+import time
+
+from metrics import ITEMS_SKIPPED, RANK_BATCH_SIZE, RERANK_ITEMS
+from nlp import (RERANK_BATCH_SIZE, embed, embed_many, encode, rerank_scores, serving_model,
+                 similarity_score)
+from policy import DEFAULT_POLICY, get_policy
+from skills import skill_overlap
+from timing import StageTimer
+
+# Version of the default scoring rules (see policy.py). Responses report the
+# version actually applied in X-Scoring-Version, so results from different
+# rule sets are never mixed up.
+POLICY_VERSION = DEFAULT_POLICY.version
+
+# --- Response Projection ---
+# Fields computed by the ranker. By default only these plus the client's `id`
+# are returned: echoing jobDescription/resumeText/shapExplanation back to the
+# client that just sent them multiplied the payload size for nothing.
+SCORE_FIELDS = (
+    'base_real_score', 'personalized_score', 'composite_score', 'cvMatchScore',
+    'is_relevant', 'is_safe', 'relevance_alert', 'risk_level', 'user_profession',
+    'matchedSkills', 'missingSkills', 'skillOverlapScore', 'rerankScore', 'lexicalScore',
+)
+DEFAULT_FIELDS = ('id',) + SCORE_FIELDS
+ALL_FIELDS = '*'
+
+
+def parse_fields(raw):
+    """
+    Parses a `fields` selector (comma-separated string or list) into a tuple
+    of keys. Returns None for '*', meaning "every input key plus the scores".
+    """
+    if raw is None or raw == '' or raw == []:
+        return DEFAULT_FIELDS
+    if isinstance(raw, str):
+        raw = raw.split(',')
+    fields = tuple(f.strip() for f in raw if isinstance(f, str) and f.strip())
+    if ALL_FIELDS in fields:
+        return None
+    return fields or DEFAULT_FIELDS
+
+
+# --- Cross-Encoder Rerank ---
+# Opt-in per request (`?rerank=1`, or `?rerank=<k>`). Only the top-k safe items
+# with a resume are rescored, in batches, until the time budget runs out, so
+# the cost is bounded by k and the budget rather than by history size.
+RERANK_TOP_K = int(os.environ.get('SENTINEL_RERANK_TOP_K', '20'))
+RERANK_MAX_K = 100
+RERANK_BUDGET = float(os.environ.get('SENTINEL_RERANK_BUDGET_MS', '300')) / 1000
+
+
+def parse_rerank(raw):
+    """Maps a `rerank` selector to k: 0 (off), the default k, or an explicit k."""
+    if raw is None or raw is False or str(raw).lower() in ('', '0', 'false'):
+        return 0
+    if raw is True or str(raw).lower() == 'true':
+        return RERANK_TOP_K
+    try:
+        k = int(raw)
+    except (TypeError, ValueError):
+        return RERANK_TOP_K
+    if k <= 1:  # `rerank=1` means "on", not "rerank one item"
+        return RERANK_TOP_K
+    return min(k, RERANK_MAX_K)
+
+
+def rerank_top(entries, k, budget=RERANK_BUDGET, policy=None):
+    """
+    Rescores the first k rerankable entries (already sorted best first) with
+    the cross-encoder, which replaces the bi-encoder cvMatchScore in the
+    composite, then reorders the rescored entries among the positions they
+    already held; everything else keeps its place. Entries are
+    [sort_key, row, context] lists and are updated in place; context is
+    (job_description, resume_text, personalized_score) or None. Whole batches
+    are skipped once the budget is spent, so at most one batch overruns it.
+    """
+    policy = policy or get_policy()
+    positions = [i for i, entry in enumerate(entries) if entry[2] is not None][:k]
+    pool = [entries[i] for i in positions]
+    deadline = time.perf_counter() + budget
+    done = 0
+    for start in range(0, len(pool), RERANK_BATCH_SIZE):
+        if time.perf_counter() >= deadline:
+            RERANK_ITEMS.inc(len(pool) - start, result='over_budget')
+            break
+        batch = pool[start:start + RERANK_BATCH_SIZE]
+        scores = rerank_scores([(entry[2][0], entry[2][1]) for entry in batch])
+        for entry, score in zip(batch, scores):
+            composite = round(policy.composite(entry[2][2], score), 1)
+            entry[0] = (entry[0][0], composite)
+            row = entry[1]
+            if 'composite_score' in row:
+                row['composite_score'] = composite
+            if 'rerankScore' in row:
+                row['rerankScore'] = score
+        RERANK_ITEMS.inc(len(batch), result='reranked')
+        done += len(batch)
+
+    reranked = sorted(pool[:done], key=lambda entry: entry[0], reverse=True)
+    for i, entry in zip(positions, reranked):
+        entries[i] = entry
+
+
+# ============================================================================
+# SMART RANKING ALGORITHM
+# ============================================================================
+def rank_analyses(analyses, profession, fields=DEFAULT_FIELDS, timer=None, rerank_k=0,
+                  embeddings=None, policy=None, history=None, lexical_scores=None):
+    """
+    Scores and sorts a user's analyses. Framework-free so the sync route, the
+    async app and offline tooling all share one implementation. `fields` is a
+    tuple from parse_fields(); None keeps every input key. Stage durations are
+    accumulated on `timer` (a timing.StageTimer) when one is passed. With
+    rerank_k > 0 the top items are rescored by rerank_top(). `embeddings`
+    maps texts to precomputed vectors (e.g. stored ones, see embeddings.py);
+    the other texts are encoded here, in batches rather than one by one.
+    `policy` is a policy.ScoringPolicy and defaults to the configured default
+    policy. Items with an `id` are recorded in `history` (a
+    columnstore.ColumnStore) when one is passed.
+    `lexical_scores` (0.0-1.0, aligned with `analyses`) are the BM25 scores
+    of a lexical shortlist (see lexical.shortlist_analyses), reported as
+    lexicalScore.
+    """
+    import numpy as np
+
+    timer = timer or StageTimer()
+    policy = policy or get_policy()
+    user_profession = (profession or "Student").lower().strip()
+    RANK_BATCH_SIZE.observe(len(analyses))
+
+    # The profession is the same for every item, so it is encoded once.
+    with timer.stage('profession_encode'):
+        profession_embedding = embed(user_profession)
+
+    # --- A. Extract Real Value Score ---
+    # Read first: it decides which resumes need encoding at all.
+    prepared = []
+    for position, item in enumerate(analyses):
+        try:
+            with timer.stage('confidence'):
+                confidence_data = item.get('confidence', {})
+                base_real_score = 0.0
+                if isinstance(confidence_data, dict):
+                    conf_list = confidence_data.get('confidences', [])
+                    real_data = next((c for c in conf_list if c['label'].upper() == 'REAL'), None)
+                    base_real_score = (real_data['confidence'] * 100) if real_data else 0.0
+        except Exception as e:
+            print(f"Skipping error item: {e}")
+            ITEMS_SKIPPED.inc(route='rank_jobs', error=type(e).__name__)
+            continue
+        prepared.append((position, item, base_real_score))
+
+    # Every text without a precomputed vector is encoded in one batched call
+    # per kind: the job descriptions, then the resumes of safe items (only
+    # those get a CV match). Repeated texts are encoded once.
+    vectors = dict(embeddings or {})
+    missing = [item.get('jobDescription', "") for _, item, _ in prepared]
+    missing = [text for text in missing if isinstance(text, str) and text not in vectors]
+    if missing:
+        with timer.stage('jd_encode'):
+            vectors.update(embed_many(missing))
+    missing = [item.get('resumeText', "") for _, item, base_real_score in prepared
+               if base_real_score >= policy.safe_threshold]
+    missing = [text for text in missing if isinstance(text, str) and text not in vectors]
+    if missing:
+        with timer.stage('cv_encode'):
+            vectors.update(embed_many(missing))
+
+    # Pass 2 gathers the per-item signals (similarities, skill matching);
+    # pass 3 applies the policy to the whole batch at once.
+    kept = []
+    base_scores = []
+    relevance_scores = []
+    cv_scores = []
+    jd_embeddings = []
+    for position, item, base_real_score in prepared:
+        timer.start_item()
+        try:
+            job_description = item.get('jobDescription', "")
+            resume_text = item.get('resumeText', "")
+
+            # --- B. NLP Relevance Score (Profession vs Job Description) ---
+            # The JD embedding is reused for the CV match below.
+            jd_embedding = vectors.get(job_description)
+            with timer.stage('similarity'):
+                profession_match_score = similarity_score(profession_embedding, jd_embedding)
+
+            # --- C. TRUE CV Match Score (Resume vs Job Description) ---
+            cv_match_score = None
+            if base_real_score >= policy.safe_threshold and resume_text:
+                with timer.stage('similarity'):
+                    cv_match_score = similarity_score(vectors.get(resume_text), jd_embedding)
+
+            # --- D. Explicit Skill Overlap (vocabulary match, no model calls) ---
+            skills = (None, None, None)
+            if resume_text:
+                with timer.stage('skills'):
+                    skills = skill_overlap(job_description, resume_text)
+
+            base_scores.append(base_real_score)
+            relevance_scores.append(profession_match_score)
+            cv_scores.append(np.nan if cv_match_score is None else cv_match_score)
+            jd_embeddings.append(jd_embedding)
+            lexical = lexical_scores[position] if lexical_scores is not None else None
+            kept.append((item, cv_match_score, skills, lexical, timer.finish_item()))
+
+        except Exception as e:
+            timer.finish_item()
+            print(f"Skipping error item: {e}")
+            ITEMS_SKIPPED.inc(route='rank_jobs', error=type(e).__name__)
+            continue
+
+    # --- E. Record History (columnar, for later re-ranking) ---
+    if history is not None:
+        with timer.stage('history'):
+            recorded = [i for i, entry in enumerate(kept) if entry[0].get('id') is not None]
+            try:
+                if recorded:
+                    history.append([kept[i][0]['id'] for i in recorded],
+                                   [base_scores[i] for i in recorded],
+                                   [relevance_scores[i] for i in recorded],
+                                   [cv_scores[i] for i in recorded],
+                                   [jd_embeddings[i] for i in recorded],
+                                   user_profession, serving_model())
+            except Exception as e:
+                # History is a convenience; the ranking itself must not fail.
+                print(f"Recording history failed: {e}")
+
+    # --- F. Apply Scoring Policy (vectorized over the batch) ---
+    with timer.stage('policy'):
+        result = policy.evaluate(base_scores, relevance_scores, cv_scores)
+        is_safe = result['is_safe'].tolist()
+        is_relevant = result['is_relevant'].tolist()
+        penalized = result['penalized'].tolist()
+        personalized = result['personalized'].tolist()
+        composite = result['composite'].tolist()
+
+        processed_results = []
+        for i, (item, cv_match_score, skills, lexical, item_timings) in enumerate(kept):
+            if not is_safe[i]:
+                alert = "CRITICAL: Potential Fake Job detected."
+            elif penalized[i]:
+                alert = f"Authentic job, but might not align with a {user_profession} role."
+            else:
+                alert = None
+
+            scores = {
+                "base_real_score": round(base_scores[i], 1),
+                "personalized_score": round(personalized[i], 1),
+                "composite_score": round(composite[i], 1),
+                "cvMatchScore": cv_match_score,
+                "is_relevant": is_relevant[i],
+                "is_safe": is_safe[i],
+                "relevance_alert": alert,
+                "risk_level": "LOW" if is_safe[i] else "HIGH",
+                "user_profession": profession,
+                "matchedSkills": skills[0],
+                "missingSkills": skills[1],
+                "skillOverlapScore": skills[2],
+                "rerankScore": None,
+                "lexicalScore": round(lexical * 100, 1) if lexical is not None else None,
+            }
+            if fields is None:
+                row = {**item, **scores}
+            else:
+                row = {}
+                for field in fields:
+                    if field in scores:
+                        row[field] = scores[field]
+                    elif field in item:
+                        row[field] = item[field]
+            if item_timings is not None:
+                row['_timings'] = item_timings
+
+            rerank_context = None
+            if rerank_k and cv_match_score is not None:
+                rerank_context = (item.get('jobDescription', ""), item['resumeText'], personalized[i])
+            processed_results.append([(is_safe[i], scores['composite_score']), row, rerank_context])
+
+    # --- G. Sorting Strategy ---
+    with timer.stage('sort'):
+        processed_results.sort(key=lambda x: x[0], reverse=True)
+
+    if rerank_k:
+        with timer.stage('rerank'):
+            try:
+                rerank_top(processed_results, rerank_k, policy=policy)
+            except Exception as e:
+                # The bi-encoder order is a complete answer on its own.
+                print(f"Rerank failed, keeping first-stage order: {e}")
+                ITEMS_SKIPPED.inc(route='rerank', error=type(e).__name__)
+
+    return [row for _, row, _ in processed_results]
+
+
+# ============================================================================
+# RECRUITER-SIDE CANDIDATE RANKING
+# ============================================================================
+# Resumes are encoded in fixed-size chunks and scored against the job with one
+# matrix-vector product per chunk. Only (id, score) pairs outlive a chunk, so
+# memory stays bounded by the chunk size rather than the number of candidates.
+CANDIDATE_CHUNK_SIZE = 256
+CANDIDATE_ENCODE_BATCH = 64
+MAX_CANDIDATES = 20000
+
+
+def _resume_ref(candidate):
+    """The candidate's resume_hash when its text has to be loaded, else None."""
+    ref = candidate.get('resume_hash')
+    if candidate.get('resumeText') or not isinstance(ref, str):
+        return None
+    return ref or None
+
+
+def _candidate_text(candidate, texts):
+    if candidate.get('resumeText'):
+        return candidate['resumeText']
+    return texts.get(_resume_ref(candidate))
+
+
+def rank_candidates(job_description, candidates, top_k=None, load_texts=None,
+                    chunk_size=CANDIDATE_CHUNK_SIZE, timer=None):
+    """
+    Ranks resumes by CV match against one job description. `candidates` are
+    dicts with an `id` and either `resumeText` or `resume_hash`; hashes are
+    resolved chunk by chunk through `load_texts(hashes) -> {hash: text}`.
+    Returns (ranked, skipped_ids) where ranked is [{id, cvMatchScore, rank}].
+    """
+    import numpy as np
+
+    timer = timer or StageTimer()
+    with timer.stage('jd_encode'):
+        jd_vector = encode([job_description], normalize_embeddings=True,
+                           convert_to_numpy=True)[0]
+
+    ids = []
+    scores = []
+    skipped = []
+    for start in range(0, len(candidates), chunk_size):
+        chunk = candidates[start:start + chunk_size]
+        hashes = [ref for ref in map(_resume_ref, chunk) if ref]
+        texts = load_texts(hashes) if hashes and load_texts else {}
+
+        chunk_ids = []
+        chunk_texts = []
+        for candidate in chunk:
+            text = _candidate_text(candidate, texts)
+            if text:
+                chunk_ids.append(candidate.get('id'))
+                chunk_texts.append(text)
+            else:
+                skipped.append(candidate.get('id'))
+        if not chunk_texts:
+            continue
+
+        with timer.stage('cv_encode'):
+            matrix = encode(chunk_texts, batch_size=CANDIDATE_ENCODE_BATCH,
+                            normalize_embeddings=True, convert_to_numpy=True)
+        with timer.stage('similarity'):
+            similarities = matrix @ jd_vector
+        ids.extend(chunk_ids)
+        # Same scale and rounding as cvMatchScore in rank_jobs.
+        scores.extend(float(round(max(s, 0) * 100, 1)) for s in similarities.tolist())
+
+    with timer.stage('sort'):
+        order = np.argsort(-np.asarray(scores, dtype=np.float32), kind='stable')
+        if top_k:
+            order = order[:top_k]
+        ranked = [
+            {'id': ids[i], 'cvMatchScore': scores[i], 'rank': position + 1}
+            for position, i in enumerate(order.tolist())
+        ]
+    return ranked, skipped
@@ -0,0 +1,129 @@
+"""
+Versioned scoring policies, evaluated over a whole batch with NumPy.
+
+A policy holds every constant of the rank_jobs scoring rules. Version '1' is
+the original rule set, and evaluate() reproduces its per-item branches
+exactly:
+
+    is_safe      = base >= safe_threshold
+    is_relevant  = relevance > relevance_cutoff
+    personalized = min(base * relevant_boost, boost_cap)   if relevant
+                   base * irrelevant_penalty               if not relevant and base > penalty_floor
+                   base                                    otherwise
+    composite    = authenticity_weight * personalized + cv_weight * cv
+                   (only for safe items with a CV score)
+
+Extra policies and an A/B split can be loaded from SENTINEL_POLICY_FILE
+without a code change:
+
+    {
+      "default": "1",
+      "policies": [{"version": "2", "relevant_boost": 1.25}],
+      "experiment": {"2": 0.1}
+    }
+
+Fields a policy leaves out are inherited from version '1'. Users are
+bucketed by a stable hash of their id, so each user always sees the same
+policy.
+"""
+import dataclasses
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class ScoringPolicy:
+    version: str = '1'
+    safe_threshold: float = 50.0
+    relevance_cutoff: float = 10.0
+    relevant_boost: float = 1.2
+    boost_cap: float = 100.0
+    penalty_floor: float = 60.0
+    irrelevant_penalty: float = 0.6
+    authenticity_weight: float = 0.60
+    cv_weight: float = 0.40
+
+    def evaluate(self, base, relevance, cv):
+        """
+        Scores a batch. `base` and `relevance` are float arrays; `cv` holds
+        the CV match score or NaN where there is none. Returns a dict of
+        arrays: is_safe, is_relevant, penalized, personalized, composite,
+        has_cv (whether the CV score entered the composite).
+        """
+        import numpy as np
+
+        base = np.asarray(base, dtype=np.float64)
+        relevance = np.asarray(relevance, dtype=np.float64)
+        cv = np.asarray(cv, dtype=np.float64)
+
+        is_safe = base >= self.safe_threshold
+        is_relevant = relevance > self.relevance_cutoff
+        penalized = ~is_relevant & (base > self.penalty_floor)
+        personalized = np.where(
+            is_relevant, np.minimum(base * self.relevant_boost, self.boost_cap),
+            np.where(penalized, base * self.irrelevant_penalty, base))
+        has_cv = is_safe & ~np.isnan(cv)
+        composite = np.where(
+            has_cv, (self.authenticity_weight * personalized) + (self.cv_weight * np.nan_to_num(cv)),
+            personalized)
+        return {
+            'is_safe': is_safe,
+            'is_relevant': is_relevant,
+            'penalized': penalized,
+            'personalized': personalized,
+            'composite': composite,
+            'has_cv': has_cv,
+        }
+
+    def composite(self, personalized, cv):
+        """Scalar composite, for rescoring single items (see pipeline.rerank_top)."""
+        return (self.authenticity_weight * personalized) + (self.cv_weight * cv)
+
+
+DEFAULT_POLICY = ScoringPolicy()
+
+POLICIES = {DEFAULT_POLICY.version: DEFAULT_POLICY}
+_config = {'default': DEFAULT_POLICY.version, 'experiment': {}}
+
+
+def load_policies(path):
+    """Registers the policies and experiment split from a JSON config file."""
+    with open(path) as fh:
+        config = json.load(fh)
+    fields = {f.name for f in dataclasses.fields(ScoringPolicy)}
+    for spec in config.get('policies', []):
+        unknown = set(spec) - fields
+        if unknown:
+            raise ValueError(f"Unknown policy fields {sorted(unknown)} in {path}")
+        policy = dataclasses.replace(DEFAULT_POLICY, **spec)
+        POLICIES[policy.version] = policy
+    default = str(config.get('default', DEFAULT_POLICY.version))
+    experiment = {str(k): float(v) for k, v in config.get('experiment', {}).items()}
+    for version in [default, *experiment]:
+        if version not in POLICIES:
+            raise ValueError(f"Policy {version!r} referenced in {path} is not defined")
+    if sum(experiment.values()) > 1.0:
+        raise ValueError(f"Experiment shares in {path} add up to more than 1")
+    _config.update(default=default, experiment=experiment)
+
+
+def get_policy(version=None):
+    return POLICIES[version or _config['default']]
+
+
+def select_policy(user_id):
+    """The policy a user is bucketed into: an experiment arm or the default."""
+    if _config['experiment']:
+        digest = hashlib.sha256(f"policy:{user_id}".encode('utf-8')).digest()
+        bucket = int.from_bytes(digest[:8], 'big') / 2 ** 64
+        for version, share in sorted(_config['experiment'].items()):
+            if bucket < share:
+                return POLICIES[version]
+            bucket -= share
+    return get_policy()
+
+
+if os.environ.get('SENTINEL_POLICY_FILE'):
+    load_policies(os.environ['SENTINEL_POLICY_FILE'])
@@ -0,0 +1,206 @@
+"""
+On-demand profiling of individual requests.
+
+Off unless SENTINEL_PROFILE_SECRET is set; without it no hooks are
+registered, so the normal request path pays nothing. With it, a request
+carrying a valid signed header is wrapped in a profiler:
+
+    X-Sentinel-Profile: <expires>.<mode>.<signature>
+
+where mode is `cprofile` (deterministic, saved as .pstats) or `sample`
+(a 5 ms stack sampler, saved as collapsed stacks for flame graphs), and
+signature = HMAC-SHA256(secret, "<expires>.<mode>.<path>"). Tokens are
+minted with `flask --app app profile-token --path /api/rank_jobs`.
+
+The response carries `X-Profile-Id`; admins fetch the file from
+/api/admin/profiles/<id> with a token minted for that path.
+"""
+import cProfile
+import hashlib
+import hmac
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter as _Counter
+
+import click
+from flask import Blueprint, abort, current_app, g, jsonify, request, send_from_directory
+from flask.cli import with_appcontext
+
+profiling_bp = Blueprint('profiling', __name__)
+
+PROFILE_HEADER = 'X-Sentinel-Profile'
+PROFILE_ID_HEADER = 'X-Profile-Id'
+MODES = ('cprofile', 'sample')
+SAMPLE_INTERVAL = 0.005
+ADMIN_PATH = '/api/admin/profiles'
+
+
+# --- Signing ---
+def sign(secret, expires, mode, path):
+    message = f"{expires}.{mode}.{path}".encode('utf-8')
+    return hmac.new(secret.encode('utf-8'), message, hashlib.sha256).hexdigest()
+
+
+def make_token(secret, path, mode='cprofile', ttl=300):
+    expires = int(time.time()) + ttl
+    return f"{expires}.{mode}.{sign(secret, expires, mode, path)}"
+
+
+def verify_token(secret, token, path):
+    """Returns the profiling mode for a valid, unexpired token, else None."""
+    try:
+        expires, mode, signature = token.split('.', 2)
+        expires = int(expires)
+    except (AttributeError, ValueError):
+        return None
+    if mode not in MODES or expires < time.time():
+        return None
+    if not hmac.compare_digest(signature, sign(secret, expires, mode, path)):
+        return None
+    return mode
+
+
+# --- Sampling Profiler ---
+class StackSampler:
+    """Samples one thread's Python stack on a timer into collapsed-stack counts."""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = _Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='sentinel-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def dump(self, path):
+        with open(path, 'w') as fh:
+            for stack, count in self.stacks.most_common():
+                fh.write(f"{stack} {count}\n")
+
+
+# --- Request Hooks ---
+def _profile_dir(app):
+    return app.config.get('PROFILE_DIR') or os.path.join(app.instance_path, 'profiles')
+
+
+def start_profiler(mode):
+    """Starts profiling the calling thread."""
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+    else:
+        profiler = StackSampler(threading.get_ident())
+        profiler.start()
+    return profiler
+
+
+def finish_profiler(app, mode, profiler):
+    """Stops a start_profiler() profiler, saves it and returns its profile id."""
+    profile_id = uuid.uuid4().hex
+    directory = _profile_dir(app)
+    if mode == 'cprofile':
+        profiler.disable()
+        profiler.dump_stats(os.path.join(directory, f"{profile_id}.pstats"))
+    else:
+        profiler.stop()
+        profiler.dump(os.path.join(directory, f"{profile_id}.collapsed"))
+    return profile_id
+
+
+def init_app(app):
+    secret = app.config.get('PROFILE_SECRET') or os.environ.get('SENTINEL_PROFILE_SECRET')
+    app.cli.add_command(profile_token_command)
+    if not secret:
+        return
+    app.config['PROFILE_SECRET'] = secret
+    os.makedirs(_profile_dir(app), exist_ok=True)
+
+    @app.before_request
+    def _start_profile():
+        token = request.headers.get(PROFILE_HEADER)
+        if not token:
+            return
+        mode = verify_token(secret, token, request.path)
+        if mode is None:
+            return
+        g.profile = (mode, start_profiler(mode))
+
+    @app.after_request
+    def _finish_profile(response):
+        active = g.pop('profile', None)
+        if active is None:
+            return response
+        response.headers[PROFILE_ID_HEADER] = finish_profiler(app, *active)
+        return response
+
+    app.register_blueprint(profiling_bp)
+
+
+# ============================================================================
+# ADMIN ROUTES
+# ============================================================================
+
+def _require_admin(path):
+    token = request.headers.get(PROFILE_HEADER)
+    if not token or verify_token(current_app.config['PROFILE_SECRET'], token, path) is None:
+        abort(403)
+
+
+@profiling_bp.route(ADMIN_PATH, methods=['GET'])
+def list_profiles():
+    _require_admin(ADMIN_PATH)
+    directory = _profile_dir(current_app)
+    profiles = []
+    for name in sorted(os.listdir(directory)):
+        profile_id, _, kind = name.partition('.')
+        stat = os.stat(os.path.join(directory, name))
+        profiles.append({'id': profile_id, 'format': kind, 'size': stat.st_size,
+                         'created_at': int(stat.st_mtime)})
+    return jsonify({'profiles': profiles}), 200
+
+
+@profiling_bp.route(f'{ADMIN_PATH}/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    _require_admin(ADMIN_PATH)
+    if not all(c in '0123456789abcdef' for c in profile_id):
+        abort(404)
+    directory = _profile_dir(current_app)
+    for kind in ('pstats', 'collapsed'):
+        name = f"{profile_id}.{kind}"
+        if os.path.exists(os.path.join(directory, name)):
+            return send_from_directory(directory, name, as_attachment=True)
+    abort(404)
+
+
+# --- CLI ---
+@click.command('profile-token')
+@click.option('--path', default='/api/rank_jobs', help='Request path the token is valid for.')
+@click.option('--mode', type=click.Choice(MODES), default='cprofile')
+@click.option('--ttl', type=int, default=300, help='Seconds until the token expires.')
+@with_appcontext
+def profile_token_command(path, mode, ttl):
+    """Mint a signed X-Sentinel-Profile header value."""
+    secret = current_app.config.get('PROFILE_SECRET')
+    if not secret:
+        raise click.ClickException('SENTINEL_PROFILE_SECRET is not set')
+    print(make_token(secret, path, mode, ttl))
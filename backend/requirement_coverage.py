@@ -0,0 +1,172 @@
+"""
+Requirement coverage: which job requirements a resume backs up, and where.
+
+The job description is split into requirement bullets and the resume into
+lines/sentences. Both sides are embedded chunk by chunk, with chunk vectors
+cached by (model, content hash). Since resumes and job posts are re-analysed far more
+often than they change, a warm request encodes only the chunks it has not
+seen before. One requirement x chunk matrix product then gives every pairwise
+cosine.
+
+Framework-free; the route is /api/cv_gap_analysis in scoring.py.
+"""
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+from metrics import cache_lookup
+from nlp import encode, serving_model
+from timing import StageTimer
+
+CHUNK_CACHE_SIZE = 20000  # ~30 MB of 384-d float32 vectors
+MAX_REQUIREMENTS = 40
+MAX_CHUNKS = 200
+MIN_WORDS = 3
+MAX_WORDS = 60
+COVERED_THRESHOLD = 0.55
+PARTIAL_THRESHOLD = 0.40
+EVIDENCE_PER_REQUIREMENT = 2
+
+BULLET_RE = re.compile(r'^\s*(?:[-*•·●▪◦>]+|\(?\d{1,2}[.)]|[a-z][.)])\s+')
+SENTENCE_RE = re.compile(r'(?<=[.!?;])\s+')
+
+
+# --- Chunking ---
+def _split_long(line):
+    if len(line.split()) <= MAX_WORDS:
+        return [line]
+    return [s for s in SENTENCE_RE.split(line) if s]
+
+
+def _clean(lines, limit):
+    seen = set()
+    chunks = []
+    for line in lines:
+        line = ' '.join(line.split())
+        if len(line.split()) < MIN_WORDS or line.endswith(':'):
+            continue  # headers ("Requirements:") and fragments
+        key = line.lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        chunks.append(line)
+        if len(chunks) >= limit:
+            break
+    return chunks
+
+
+def split_requirements(job_description):
+    """
+    Bullet points when the posting has them (that is where requirements
+    live), otherwise every sentence.
+    """
+    lines = [l for l in job_description.splitlines() if l.strip()]
+    bullets = [BULLET_RE.sub('', l) for l in lines if BULLET_RE.match(l)]
+    if len(bullets) >= 2:
+        return _clean((s for b in bullets for s in _split_long(b)), MAX_REQUIREMENTS)
+    sentences = (s for l in lines for s in SENTENCE_RE.split(l.strip()) if s)
+    return _clean((s for sentence in sentences for s in _split_long(sentence)), MAX_REQUIREMENTS)
+
+
+def split_resume(resume_text):
+    lines = (BULLET_RE.sub('', l) for l in resume_text.splitlines() if l.strip())
+    return _clean((s for l in lines for s in _split_long(l)), MAX_CHUNKS)
+
+
+# --- Chunk Embedding Cache ---
+_chunk_cache = OrderedDict()
+_chunk_cache_lock = threading.Lock()
+
+
+def clear_chunk_cache():
+    with _chunk_cache_lock:
+        _chunk_cache.clear()
+
+
+def embed_chunks(chunks):
+    """Normalised embeddings (n x d numpy array) for `chunks`, encoding only cache misses."""
+    import numpy as np
+
+    # Keyed by model too: after an embedding cut-over (see embeddings.py) the
+    # old model's vectors must not be stacked with the new one's.
+    model = serving_model()
+    keys = [(model, hashlib.sha256(c.encode('utf-8')).digest()) for c in chunks]
+    vectors = [None] * len(chunks)
+    with _chunk_cache_lock:
+        for i, key in enumerate(keys):
+            vector = _chunk_cache.get(key)
+            if vector is not None:
+                _chunk_cache.move_to_end(key)
+                vectors[i] = vector
+    misses = [i for i, v in enumerate(vectors) if v is None]
+    for vector in vectors:
+        cache_lookup('chunk_embedding', vector is not None)
+
+    if misses:
+        encoded = encode([chunks[i] for i in misses], model=model, normalize_embeddings=True,
+                         convert_to_numpy=True).astype(np.float32)
+        with _chunk_cache_lock:
+            for i, vector in zip(misses, encoded):
+                vectors[i] = vector
+                _chunk_cache[keys[i]] = vector
+            while len(_chunk_cache) > CHUNK_CACHE_SIZE:
+                _chunk_cache.popitem(last=False)
+    return np.stack(vectors)
+
+
+# --- Gap Analysis ---
+def analyze_coverage(job_description, resume_text, timer=None):
+    """
+    Returns {'requirements': [{requirement, status, score, evidence}],
+    'coverageScore', 'covered', 'partial', 'missing'}. Status is 'covered',
+    'partial' or 'missing'; evidence lists the best matching resume lines.
+    """
+    timer = timer or StageTimer()
+
+    requirements = split_requirements(job_description)
+    chunks = split_resume(resume_text)
+    result = {'requirements': [], 'coverageScore': None, 'covered': 0, 'partial': 0,
+              'missing': len(requirements)}
+    if not requirements:
+        return result
+    if not chunks:
+        result['requirements'] = [{'requirement': r, 'status': 'missing', 'score': 0.0, 'evidence': []}
+                                  for r in requirements]
+        result['coverageScore'] = 0.0
+        return result
+
+    with timer.stage('jd_encode'):
+        req_matrix = embed_chunks(requirements)
+    with timer.stage('cv_encode'):
+        chunk_matrix = embed_chunks(chunks)
+    with timer.stage('similarity'):
+        similarity = req_matrix @ chunk_matrix.T  # requirements x chunks
+        k = min(EVIDENCE_PER_REQUIREMENT, len(chunks))
+        top = (-similarity).argsort(axis=1, kind='stable')[:, :k]
+
+    counts = {'covered': 0, 'partial': 0, 'missing': 0}
+    total = 0.0
+    for r, requirement in enumerate(requirements):
+        best = float(similarity[r, top[r, 0]])
+        if best >= COVERED_THRESHOLD:
+            status = 'covered'
+        elif best >= PARTIAL_THRESHOLD:
+            status = 'partial'
+        else:
+            status = 'missing'
+        counts[status] += 1
+        total += 1.0 if status == 'covered' else 0.5 if status == 'partial' else 0.0
+        evidence = [
+            {'line': chunks[c], 'score': round(max(float(similarity[r, c]), 0.0) * 100, 1)}
+            for c in top[r].tolist() if similarity[r, c] >= PARTIAL_THRESHOLD
+        ]
+        result['requirements'].append({
+            'requirement': requirement,
+            'status': status,
+            'score': round(max(best, 0.0) * 100, 1),
+            'evidence': evidence,
+        })
+    result.update(counts)
+    result['coverageScore'] = round(total / len(requirements) * 100, 1)
+    return result
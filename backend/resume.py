@@ -0,0 +1,128 @@
+"""
+POST /api/resume/extract -- server-side resume parsing.
+
+The upload is streamed to a temporary file while it is hashed, never held in
+memory as a whole. Files seen before (same SHA-256) are answered from the
+Extraction table without parsing. The extracted text is stored in the blob
+store, and the returned `resume_hash` can go straight into rank_jobs and
+rank_candidates.
+
+Accepts either a raw body (Content-Type application/pdf, the DOCX type or
+text/plain, with an optional `?filename=`) or a multipart form with a
+`file` field. Either way the body is capped at MAX_UPLOAD_BYTES (plus room
+for the multipart framing) before any of it is read; Werkzeug spools larger
+form files to disk rather than memory.
+"""
+import hashlib
+import os
+import tempfile
+
+from flask import Blueprint, request, jsonify
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from auth import token_required
+from blobstore import load_texts, put_text
+from extensions import db
+from extraction import ExtractionError, detect_kind, run_extraction
+from metrics import cache_lookup
+from models import Extraction
+
+resume_bp = Blueprint('resume', __name__)
+
+MAX_UPLOAD_BYTES = 5 * 1024 * 1024  # matches the client-side limit
+CHUNK_SIZE = 64 * 1024
+# Boundaries and part headers around the one file field.
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def _too_large():
+    return ExtractionError(f'File too large. Maximum size is {MAX_UPLOAD_BYTES // (1024 * 1024)} MB.', 413)
+
+
+def _spool_upload(stream, out):
+    """Copies `stream` into `out` in chunks; returns (sha256, first bytes)."""
+    digest = hashlib.sha256()
+    head = b''
+    size = 0
+    while True:
+        try:
+            chunk = stream.read(CHUNK_SIZE)
+        except RequestEntityTooLarge:  # an unsized body ran past request.max_content_length
+            raise _too_large()
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > MAX_UPLOAD_BYTES:
+            raise _too_large()
+        if len(head) < 8:
+            head = (head + chunk)[:8]
+        digest.update(chunk)
+        out.write(chunk)
+    if not size:
+        raise ExtractionError('No file uploaded', 400)
+    out.flush()
+    return digest.hexdigest(), head
+
+
+def _cached_text(file_sha):
+    extraction = db.session.get(Extraction, file_sha)
+    # Whoever uploads the file holds its text, so the lookup is not user-scoped.
+    text = load_texts([extraction.text_sha256]).get(extraction.text_sha256) if extraction else None
+    cache_lookup('resume_extraction', text is not None)
+    return extraction, text
+
+
+@resume_bp.route('/api/resume/extract', methods=['POST'])
+@token_required
+def extract_resume(current_user):
+    # Far below the app-wide MAX_CONTENT_LENGTH; set before the form is parsed.
+    request.max_content_length = MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD
+    try:
+        files = request.files
+    except RequestEntityTooLarge:
+        error = _too_large()
+        return jsonify({'message': error.message}), error.status
+    if files:
+        upload = files.get('file')
+        if upload is None:
+            return jsonify({'message': 'Multipart uploads need a "file" field'}), 400
+        stream, filename = upload.stream, upload.filename or ''
+    else:
+        stream, filename = request.stream, request.args.get('filename', '')
+
+    fd, path = tempfile.mkstemp(prefix='sentinel-resume-')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            file_sha, head = _spool_upload(stream, out)
+
+        extraction, text = _cached_text(file_sha)
+        cached = text is not None
+        if not cached:
+            kind = detect_kind(head, filename)
+            parsed = run_extraction(path, kind)
+            text = parsed['text']
+            extraction = db.session.get(Extraction, file_sha) or Extraction(file_sha256=file_sha)
+            extraction.kind = kind
+            extraction.pages = parsed['pages']
+            extraction.truncated = parsed['truncated']
+    except ExtractionError as e:
+        return jsonify({'message': e.message}), e.status
+    finally:
+        os.unlink(path)
+
+    try:
+        extraction.text_sha256 = put_text(current_user.id, text, 'resume')
+        db.session.add(extraction)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'An error occurred while storing the resume'}), 500
+
+    return jsonify({
+        'resume_hash': extraction.text_sha256,
+        'resumeText': text,
+        'kind': extraction.kind,
+        'pages': extraction.pages,
+        'truncated': extraction.truncated,
+        'cached': cached,
+    }), 200
@@ -0,0 +1,192 @@
+from functools import partial
+
+from flask import Blueprint, g, request
+
+from auth import token_required
+from blobstore import TextRefError, check_ref, find_missing, get_texts, resolve_text_refs
+from compression import compress_response
+from columnstore import history_store, rank_history
+from requirement_coverage import analyze_coverage
+from embeddings import analysis_embeddings, refresh_serving_model
+from lexical import parse_query, parse_shortlist, shortlist_analyses
+from pipeline import MAX_CANDIDATES, POLICY_VERSION, parse_fields, parse_rerank, rank_analyses, rank_candidates
+from policy import select_policy
+from serialization import timed_json_response
+from timing import StageTimer
+
+scoring_bp = Blueprint('scoring', __name__)
+
+
+SCORING_VERSION_HEADER = 'X-Scoring-Version'
+MAX_HISTORY_PAGE = 1000
+
+
+def scoring_version(model, policy_version=POLICY_VERSION):
+    return f"{model};policy={policy_version}"
+
+
+def is_debug_timing(value):
+    return str(value).lower() in ('1', 'true', 'timings')
+
+
+def request_timer():
+    """
+    A StageTimer for the current NLP request, pre-loaded with the auth time
+    measured by token_required. `?debug=timings` adds per-item stage timings
+    to the response body.
+    """
+    timer = StageTimer(debug=is_debug_timing(request.args.get('debug', '')))
+    if 'auth_duration' in g:
+        timer.add('auth', g.auth_duration)
+    return timer
+
+
+@scoring_bp.after_request
+def compress_scoring_response(response):
+    return compress_response(response, request.headers.get('Accept-Encoding'))
+
+
+@scoring_bp.route('/api/rank_jobs', methods=['POST'])
+@token_required
+def rank_jobs(current_user):
+    timer = request_timer()
+    with timer.stage('decode'):
+        data = request.get_json()
+    if not isinstance(data, dict):
+        return timed_json_response({'message': 'Request body must be a JSON object'}, timer, 400)
+    analyses = data.get('analyses', [])
+    fields = parse_fields(request.args.get('fields', data.get('fields')))
+    rerank_k = parse_rerank(request.args.get('rerank', data.get('rerank')))
+    # `?q=` adds a BM25 stage: only the best-matching analyses are scored.
+    query = parse_query(request.args.get('q', data.get('query')))
+    shortlist = parse_shortlist(request.args.get('shortlist', data.get('shortlist')))
+
+    if not analyses:
+        return timed_json_response([], timer)
+
+    try:
+        analyses, missing = resolve_text_refs(current_user.id, analyses)
+    except TextRefError as e:
+        return timed_json_response({'message': str(e)}, timer, 400)
+    if missing:
+        # The client uploads these once via POST /api/blobs and retries.
+        return timed_json_response({'message': 'Unknown text hashes', 'missing': missing}, timer, 409)
+
+    lexical_scores = None
+    if query:
+        with timer.stage('lexical'):
+            analyses, lexical_scores = shortlist_analyses(current_user.id, analyses, query, shortlist)
+
+    model = refresh_serving_model()
+    with timer.stage('embeddings'):
+        embeddings = analysis_embeddings(analyses)
+
+    policy = select_policy(current_user.id)
+    results = rank_analyses(analyses, current_user.profession, fields, timer, rerank_k, embeddings, policy,
+                            history_store(current_user.id), lexical_scores)
+    response = timed_json_response(results, timer)
+    response.headers[SCORING_VERSION_HEADER] = scoring_version(model, policy.version)
+    return response
+
+
+@scoring_bp.route('/api/rank_candidates', methods=['POST'])
+@token_required
+def rank_candidates_route(current_user):
+    timer = request_timer()
+    with timer.stage('decode'):
+        data = request.get_json()
+    if not isinstance(data, dict):
+        return timed_json_response({'message': 'Request body must be a JSON object'}, timer, 400)
+
+    job_description = data.get('jobDescription')
+    candidates = data.get('candidates', [])
+    if job_description is not None and not isinstance(job_description, str):
+        return timed_json_response({'message': 'jobDescription must be a string'}, timer, 400)
+    if not isinstance(candidates, list) or not all(isinstance(c, dict) for c in candidates):
+        return timed_json_response({'message': 'candidates must be a list of objects'}, timer, 400)
+    if len(candidates) > MAX_CANDIDATES:
+        return timed_json_response({'message': f'At most {MAX_CANDIDATES} candidates per request'}, timer, 400)
+    if any(c.get('resumeText') is not None and not isinstance(c['resumeText'], str) for c in candidates):
+        return timed_json_response({'message': 'resumeText must be a string'}, timer, 400)
+    try:
+        if not job_description and data.get('jd_hash'):
+            check_ref('jd_hash', data['jd_hash'])
+            job_description = get_texts(current_user.id, [data['jd_hash']]).get(data['jd_hash'])
+        for candidate in candidates:
+            if not candidate.get('resumeText') and candidate.get('resume_hash'):
+                check_ref('resume_hash', candidate['resume_hash'])
+    except TextRefError as e:
+        return timed_json_response({'message': str(e)}, timer, 400)
+
+    if not job_description:
+        return timed_json_response({'message': 'jobDescription or a known jd_hash is required'}, timer, 400)
+
+    missing = find_missing(current_user.id, [c['resume_hash'] for c in candidates
+                            if not c.get('resumeText') and c.get('resume_hash')])
+    if missing:
+        return timed_json_response({'message': 'Unknown text hashes', 'missing': missing}, timer, 409)
+
+    top_k = data.get('top_k')
+    top_k = top_k if isinstance(top_k, int) and top_k > 0 else None
+    model = refresh_serving_model()
+    ranked, skipped = rank_candidates(job_description, candidates, top_k, partial(get_texts, current_user.id),
+                                      timer=timer)
+    response = timed_json_response({
+        'candidates': ranked,
+        'total': len(candidates) - len(skipped),
+        'skipped': skipped,
+    }, timer)
+    response.headers[SCORING_VERSION_HEADER] = scoring_version(model)
+    return response
+
+
+@scoring_bp.route('/api/rank_history', methods=['GET'])
+@token_required
+def rank_history_route(current_user):
+    """
+    Re-ranks everything the user has ranked before from the column store,
+    without the client resending it. `?profession=` overrides the profile's.
+    """
+    timer = request_timer()
+    store = history_store(current_user.id)
+    if store is None:
+        return timed_json_response({'message': 'Analysis history is disabled'}, timer, 404)
+    top_k = request.args.get('top_k', 50, type=int)
+    offset = request.args.get('offset', 0, type=int)
+    if top_k < 1 or offset < 0:
+        return timed_json_response({'message': 'top_k must be positive and offset non-negative'}, timer, 400)
+    top_k = min(top_k, MAX_HISTORY_PAGE)
+
+    model = refresh_serving_model()
+    policy = select_policy(current_user.id)
+    profession = request.args.get('profession') or current_user.profession
+    rows, total = rank_history(store, profession, policy, top_k, offset, timer)
+    response = timed_json_response({'results': rows, 'total': total, 'offset': offset}, timer)
+    response.headers[SCORING_VERSION_HEADER] = scoring_version(model, policy.version)
+    return response
+
+
+@scoring_bp.route('/api/cv_gap_analysis', methods=['POST'])
+@token_required
+def cv_gap_analysis(current_user):
+    timer = request_timer()
+    with timer.stage('decode'):
+        data = request.get_json() or {}
+    if not isinstance(data, dict):
+        return timed_json_response({'message': 'Request body must be a JSON object'}, timer, 400)
+
+    try:
+        analysis, missing = resolve_text_refs(current_user.id, [data])
+    except TextRefError as e:
+        return timed_json_response({'message': str(e)}, timer, 400)
+    if missing:
+        return timed_json_response({'message': 'Unknown text hashes', 'missing': missing}, timer, 409)
+    job_description = analysis[0].get('jobDescription')
+    resume_text = analysis[0].get('resumeText')
+    if not (isinstance(job_description, str) and job_description
+            and isinstance(resume_text, str) and resume_text):
+        return timed_json_response(
+            {'message': 'jobDescription (or jd_hash) and resumeText (or resume_hash) must be non-empty strings'},
+            timer, 400)
+
+    return timed_json_response(analyze_coverage(job_description, resume_text, timer), timer)
@@ -0,0 +1,222 @@
+"""
+Production entry point: preload, freeze, fork.
+
+The master process builds the app and loads the embedding model once, moves
+everything it allocated into the permanent GC generation with gc.freeze(),
+then forks the workers. Workers inherit the model weights copy-on-write
+instead of each loading their own copy, and the periodic memory report shows
+how much every worker has actually made private.
+
+    python serve.py --role scoring --workers 16 --port 5000
+    python serve.py --role auth --workers 4 --threads --port 5001
+    python serve.py --role scoring --migrate-embeddings --archive
+
+Background jobs run in processes of their own, forked by the master after
+the workers, so exactly one of each runs and no thread exists across a fork:
+--migrate-embeddings (default: SENTINEL_EMBEDDING_MIGRATE=1) re-embeds
+stored texts (see embeddings.py), --archive (default: SENTINEL_ARCHIVE=1)
+tiers and expires analyses (see coldstore.py).
+
+POSIX only (needs os.fork).
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+from werkzeug.serving import make_server
+
+from metrics import memory_usage
+
+
+# --- Memory Reporting ---
+def _mb(n):
+    return f"{n / (1024 * 1024):8.1f}"
+
+
+def report_memory(workers):
+    master = memory_usage(os.getpid())
+    print(f"[serve] {'pid':>7} {'rss MB':>8} {'pss MB':>8} {'uss MB':>8}")
+    print(f"[serve] {os.getpid():>7} {_mb(master['rss'])} {_mb(master['pss'])} {_mb(master['uss'])}  (master)")
+    total_uss = 0
+    for pid in sorted(workers):
+        usage = memory_usage(pid)
+        total_uss += usage['uss']
+        print(f"[serve] {pid:>7} {_mb(usage['rss'])} {_mb(usage['pss'])} {_mb(usage['uss'])}")
+    print(f"[serve] workers' unique total: {_mb(total_uss).strip()} MB")
+    sys.stdout.flush()
+
+
+# --- Worker ---
+def run_worker(app, listen_fd, host, port, threaded, torch_threads):
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    # Never share pooled DB connections across a fork.
+    from extensions import db
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+    # N workers each spinning up a full-width intra-op pool would oversubscribe
+    # the box; give every worker its slice of the cores instead.
+    torch = sys.modules.get('torch')
+    if torch is not None:
+        torch.set_num_threads(torch_threads)
+
+    server = make_server(host, port, app, threaded=threaded, fd=listen_fd)
+    server.serve_forever()
+    os._exit(0)
+
+
+# --- Background Jobs ---
+def _migrator(app):
+    from embeddings import EmbeddingMigrator
+    return EmbeddingMigrator(app)
+
+
+def _compactor(app):
+    from coldstore import ArchiveCompactor
+    return ArchiveCompactor(app)
+
+
+# name -> factory of an object with blocking run() and stop()
+BACKGROUND_JOBS = {'embedding migrator': _migrator, 'archive compactor': _compactor}
+
+
+def run_background(app, sock, name):
+    from extensions import db
+
+    sock.close()  # background jobs never serve requests
+    job = BACKGROUND_JOBS[name](app)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the master's SIGTERM stops it
+    signal.signal(signal.SIGTERM, lambda signum, frame: job.stop())
+    with app.app_context():
+        db.engine.dispose(close=False)
+    job.run()
+    os._exit(0)
+
+
+def spawn_background(app, sock, name):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            run_background(app, sock, name)
+        finally:
+            os._exit(1)
+    return pid
+
+
+def spawn_worker(app, listen_fd, args):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            run_worker(app, listen_fd, args.host, args.port, args.threads, args.torch_threads)
+        finally:
+            os._exit(1)
+    return pid
+
+
+# --- Master ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--role', default=os.environ.get('SENTINEL_ROLE', 'all'),
+                        choices=('auth', 'scoring', 'all'))
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--threads', action='store_true',
+                        help='Serve each worker with a thread per request.')
+    parser.add_argument('--torch-threads', type=int, default=None,
+                        help='Intra-op threads per worker (default: cores / workers).')
+    parser.add_argument('--backlog', type=int, default=2048)
+    parser.add_argument('--report-interval', type=float, default=60.0,
+                        help='Seconds between memory reports; 0 disables them.')
+    parser.add_argument('--migrate-embeddings', action=argparse.BooleanOptionalAction,
+                        default=os.environ.get('SENTINEL_EMBEDDING_MIGRATE') == '1',
+                        help='Run the embedding migrator in a dedicated process (scoring roles only).')
+    parser.add_argument('--archive', action=argparse.BooleanOptionalAction,
+                        default=os.environ.get('SENTINEL_ARCHIVE') == '1',
+                        help='Run the archive compactor in a dedicated process (scoring roles only).')
+    args = parser.parse_args(argv)
+
+    if args.torch_threads is None:
+        args.torch_threads = max(1, (os.cpu_count() or 1) // args.workers)
+
+    # Imported here so `--help` stays instant.
+    from app import create_app
+    app = create_app(args.role)
+    if args.role in ('scoring', 'all'):
+        from nlp import get_nlp_model
+        get_nlp_model()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(args.backlog)
+    sock.set_inheritable(True)
+
+    # Everything allocated so far (model weights, modules, app) is moved out of
+    # the collector's reach, so GC passes in the workers never touch -- and
+    # therefore never un-share -- those pages.
+    gc.collect()
+    gc.freeze()
+
+    workers = set()
+    for _ in range(args.workers):
+        workers.add(spawn_worker(app, sock.fileno(), args))
+    print(f"[serve] role={args.role} listening on {args.host}:{args.port} with {len(workers)} workers")
+    # Not counted among the workers: they are not respawned once they finish.
+    background = {}  # pid -> job name
+    if args.role in ('scoring', 'all'):
+        for name, enabled in (('embedding migrator', args.migrate_embeddings),
+                              ('archive compactor', args.archive)):
+            if enabled:
+                background[spawn_background(app, sock, name)] = name
+
+    stopping = False
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers | set(background):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    next_report = time.monotonic() + args.report_interval
+    while workers:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid in background:
+            name = background.pop(pid)
+            if status:
+                print(f"[serve] {name} exited with status {status}")
+            continue
+        if pid:
+            workers.discard(pid)
+            if not stopping:
+                print(f"[serve] worker {pid} exited with status {status}, respawning")
+                workers.add(spawn_worker(app, sock.fileno(), args))
+            continue
+
+        if args.report_interval and time.monotonic() >= next_report and not stopping:
+            report_memory(workers)
+            next_report = time.monotonic() + args.report_interval
+        time.sleep(0.5)
+
+    for pid in background:
+        os.waitpid(pid, 0)
+    sock.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""
+Explicit skill extraction against a versioned vocabulary.
+
+The vocabulary (data/skills_v<N>.txt) is compiled into a token trie; one
+left-to-right pass over a document's tokens finds every skill phrase,
+preferring the longest match at each position. Variants that are also plain
+English words ("Go", "Swift") additionally need the vocabulary's
+capitalization and a skill-like position (see the vocabulary header). Each
+document's skills are kept as an int bitset (bit i = skill i), so overlap
+between a job and a resume is a couple of integer ops rather than more
+model calls.
+
+Skill sets are cached per (vocabulary version, SHA-256 of the text).
+"""
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from metrics import cache_lookup
+
+SKILL_VOCAB_VERSION = 'v2'
+VOCAB_PATH = os.path.join(os.path.dirname(__file__), 'data', f'skills_{SKILL_VOCAB_VERSION}.txt')
+SKILL_CACHE_SIZE = 8192
+
+# Tokens keep the inner punctuation skills rely on: c++, c#, node.js. A slash
+# separates ("Python/Java", "CI/CD" -> ci, cd).
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.-]*[a-z0-9+#]|[a-z0-9]", re.IGNORECASE)
+AMBIGUOUS = '~'
+SENTENCE_END = '.!?\n'
+LIST_BEFORE = ',;/(&|*\u2022'
+LIST_AFTER = ',;/)&|'
+BLANKS = ' \t'
+
+_TERMINAL = object()
+
+
+def tokenize(text):
+    return [t.lower() for t in TOKEN_RE.findall(text)]
+
+
+def _skill_context(text, start, end):
+    """Whether text[start:end] reads as a skill: inside a list or mid-sentence."""
+    # Only the blanks around the match are scanned, not the text before and
+    # after it; each run of blanks borders at most one match per side, so a
+    # document costs one pass however many ambiguous words it holds.
+    i = start
+    while i and text[i - 1] in BLANKS:
+        i -= 1
+    before = text[i - 1] if i else ''
+    j = end
+    while j < len(text) and text[j] in BLANKS:
+        j += 1
+    after = text[j] if j < len(text) else ''
+    if (before and before in LIST_BEFORE) or (after and after in LIST_AFTER):
+        return True
+    return bool(before) and before not in SENTENCE_END
+
+
+class SkillIndex:
+    def __init__(self, path=VOCAB_PATH, version=SKILL_VOCAB_VERSION):
+        self.version = version
+        self.names = []
+        self.trie = {}
+        self.max_phrase = 0
+        with open(path, encoding='utf-8') as fh:
+            for line in fh:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                variants = [v.strip() for v in line.split('|') if v.strip()]
+                index = len(self.names)
+                self.names.append(variants[0].lstrip(AMBIGUOUS))
+                for variant in variants:
+                    if variant.startswith(AMBIGUOUS):
+                        cased = TOKEN_RE.findall(variant[1:])
+                        self._insert([t.lower() for t in cased], (index, cased))
+                    else:
+                        self._insert(tokenize(variant), (index, None))
+
+    def _insert(self, tokens, terminal):
+        """`terminal` is (skill index, exact tokens required, or None)."""
+        if not tokens:
+            return
+        node = self.trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node.setdefault(_TERMINAL, terminal)
+        self.max_phrase = max(self.max_phrase, len(tokens))
+
+    def extract(self, text):
+        """Returns the bitset of vocabulary skills mentioned in `text`."""
+        matches = list(TOKEN_RE.finditer(text))
+        tokens = [m.group().lower() for m in matches]
+        bits = 0
+        i = 0
+        n = len(tokens)
+        while i < n:
+            node = self.trie
+            match_index, match_len = None, 0
+            j = i
+            while j < n and tokens[j] in node:
+                node = node[tokens[j]]
+                j += 1
+                if _TERMINAL in node:
+                    index, cased = node[_TERMINAL]
+                    if cased is not None and not (
+                            [m.group() for m in matches[i:j]] == cased
+                            and _skill_context(text, matches[i].start(), matches[j - 1].end())):
+                        continue
+                    match_index, match_len = index, j - i
+            if match_index is not None:
+                bits |= 1 << match_index
+                i += match_len
+            else:
+                i += 1
+        return bits
+
+    def names_for(self, bits):
+        names = []
+        index = 0
+        while bits:
+            if bits & 1:
+                names.append(self.names[index])
+            bits >>= 1
+            index += 1
+        return names
+
+
+_index = None
+_index_lock = threading.Lock()
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_skill_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SkillIndex()
+    return _index
+
+
+def clear_skill_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+def skill_bits(text):
+    """Cached skill bitset for a document."""
+    if not text:
+        return 0
+    index = get_skill_index()
+    key = (index.version, hashlib.sha256(text.encode('utf-8')).hexdigest())
+    with _cache_lock:
+        bits = _cache.get(key)
+        if bits is not None:
+            _cache.move_to_end(key)
+    cache_lookup('skills', bits is not None)
+    if bits is None:
+        bits = index.extract(text)
+        with _cache_lock:
+            _cache[key] = bits
+            while len(_cache) > SKILL_CACHE_SIZE:
+                _cache.popitem(last=False)
+    return bits
+
+
+def skill_overlap(job_description, resume_text):
+    """
+    Returns (matched_skills, missing_skills, overlap_score). The score is the
+    share of the job's skills the resume mentions, 0.0-100.0, or None when
+    the job names no known skills.
+    """
+    index = get_skill_index()
+    required = skill_bits(job_description)
+    present = skill_bits(resume_text)
+    matched = required & present
+    missing = required & ~present
+    score = None
+    if required:
+        score = round(bin(matched).count('1') / bin(required).count('1') * 100, 1)
+    return index.names_for(matched), index.names_for(missing), score
@@ -0,0 +1,140 @@
+"""
+Shared fixtures. Every test gets a fresh SQLite database and history
+directory; the embedding model is replaced by a small deterministic encoder
+so the suite runs without downloading sentence-transformers weights.
+"""
+import hashlib
+import os
+import re
+
+import numpy as np
+import pytest
+
+# Read at import time by the modules under test.
+os.environ.setdefault('SENTINEL_PRELOAD_NLP', '0')
+os.environ.pop('SENTINEL_EMBEDDING_MIGRATE', None)
+os.environ.pop('SENTINEL_ARCHIVE', None)
+
+import nlp  # noqa: E402
+from app import create_app, setup_database  # noqa: E402
+from extensions import db  # noqa: E402
+
+DIMS = 64
+WORD_RE = re.compile(r"\w+")
+
+
+class FakeEncoder:
+    """Bag-of-words hashing encoder with the parts of SentenceTransformer we use."""
+
+    def __init__(self):
+        self.batches = []  # size of every encode() call
+
+    def tokenizer(self, batch, add_special_tokens=True):
+        return {'input_ids': [[0] * (len(WORD_RE.findall(text)) + 2) for text in batch]}
+
+    def vector(self, text):
+        vector = np.zeros(DIMS, dtype=np.float32)
+        for word in WORD_RE.findall(text.lower()):
+            vector[int(hashlib.sha256(word.encode('utf-8')).hexdigest(), 16) % DIMS] += 1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, texts, batch_size=32, normalize_embeddings=False, convert_to_numpy=True,
+               convert_to_tensor=False, **kwargs):
+        single = isinstance(texts, str)
+        batch = [texts] if single else list(texts)
+        self.batches.append(len(batch))
+        matrix = np.stack([self.vector(t) for t in batch]) if batch else np.zeros((0, DIMS), np.float32)
+        return matrix[0] if single else matrix
+
+
+class FakeUtil:
+    @staticmethod
+    def cos_sim(a, b):
+        a, b = np.atleast_2d(a), np.atleast_2d(b)
+        a = a / np.maximum(np.linalg.norm(a, axis=1, keepdims=True), 1e-12)
+        b = b / np.maximum(np.linalg.norm(b, axis=1, keepdims=True), 1e-12)
+        return a @ b.T
+
+
+@pytest.fixture
+def encoder(monkeypatch):
+    fake = FakeEncoder()
+    monkeypatch.setitem(nlp._models, nlp.serving_model(), fake)
+    monkeypatch.setattr(nlp, '_nlp_util', FakeUtil)
+    return fake
+
+
+def clear_caches():
+    """In-process caches outlive an app; a fresh database needs them empty."""
+    import blobstore
+    import embeddings
+    import models
+    import requirement_coverage
+    models.clear_user_count_cache()
+    blobstore.clear_text_cache()
+    embeddings.clear_vector_cache()
+    requirement_coverage.clear_chunk_cache()
+
+
+@pytest.fixture
+def app_config():
+    """Extra app settings; override in a test module to change them."""
+    return {}
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch, app_config):
+    import columnstore
+    monkeypatch.setattr(columnstore, 'HISTORY_DIR', str(tmp_path / 'history'))
+    monkeypatch.setattr(columnstore, '_stores', type(columnstore._stores)())
+    clear_caches()
+    app = create_app('all', {
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+        **app_config,
+    })
+    with app.app_context():
+        setup_database()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def login(client, email='user@example.com', password='user123'):
+    response = client.post('/api/login', json={'email': email, 'password': password})
+    assert response.status_code == 200, response.get_json()
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
+
+
+def signup(client, email, password='secret123', profession='Developer'):
+    response = client.post('/api/signup', json={'name': email.split('@')[0], 'email': email,
+                                                'password': password, 'profession': profession})
+    assert response.status_code == 201, response.get_json()
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
+
+
+@pytest.fixture
+def headers(client):
+    return login(client)
+
+
+def analysis(id, job_description, real=0.9, resume_text=None, **extra):
+    """An analysis as the dashboard sends it to rank_jobs."""
+    item = {
+        'id': id,
+        'jobDescription': job_description,
+        'confidence': {'label': 'REAL' if real >= 0.5 else 'FAKE',
+                       'confidences': [{'label': 'REAL', 'confidence': real},
+                                       {'label': 'FAKE', 'confidence': round(1 - real, 4)}]},
+    }
+    if resume_text is not None:
+        item['resumeText'] = resume_text
+    item.update(extra)
+    return item
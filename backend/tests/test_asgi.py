@@ -0,0 +1,75 @@
+"""The async front end serves rank_jobs natively and forwards every other route to Flask."""
+import asyncio
+import gzip
+import json
+import threading
+
+import pytest
+
+import asgi
+from conftest import analysis
+
+
+@pytest.fixture
+def asgi_app(app):
+    scoring = asgi.AsyncScoringApp(app)
+    yield scoring
+    scoring.inference_pool.shutdown()
+    scoring.db_pool.shutdown()
+
+
+def call(asgi_app, path, body=b'', headers=None, method='POST', query=b''):
+    """One request through the ASGI interface: (status, {header: value}, body)."""
+    scope = {
+        'type': 'http', 'http_version': '1.1', 'method': method, 'path': path, 'query_string': query,
+        'root_path': '', 'scheme': 'http', 'server': ('testserver', 80),
+        'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in (headers or {}).items()],
+    }
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asgi_app(scope, receive, send))
+    start = sent[0]
+    response_headers = {k.decode('latin-1'): v.decode('latin-1') for k, v in start['headers']}
+    return start['status'], response_headers, b''.join(m.get('body', b'') for m in sent[1:])
+
+
+def test_rank_jobs_matches_the_wsgi_route(client, headers, asgi_app, encoder):
+    payload = {'analyses': [analysis(1, 'Nurse, night shifts', real=0.9),
+                            analysis(2, 'Python developer building Flask APIs', real=0.9)]}
+    expected = client.post('/api/rank_jobs', json=payload, headers=headers).get_json()
+
+    status, response_headers, body = call(asgi_app, '/api/rank_jobs', json.dumps(payload).encode(), headers)
+    assert status == 200
+    assert json.loads(body) == expected
+    assert 'x-scoring-version' in response_headers
+    assert 'decode;dur=' in response_headers['server-timing']
+
+
+def test_body_is_parsed_off_the_event_loop(headers, asgi_app, encoder, monkeypatch):
+    threads = []
+    original = asgi.decode_body
+    monkeypatch.setattr(asgi, 'decode_body',
+                        lambda raw, encoding: threads.append(threading.current_thread().name)
+                        or original(raw, encoding))
+    body = gzip.compress(json.dumps({'analyses': [analysis(1, 'Python developer')]}).encode())
+    status, _, response = call(asgi_app, '/api/rank_jobs', body, {**headers, 'Content-Encoding': 'gzip'})
+    assert status == 200 and [row['id'] for row in json.loads(response)] == [1]
+    assert len(threads) == 1 and threads[0].startswith('sentinel-db')
+
+
+def test_errors_are_json(headers, asgi_app):
+    status, _, body = call(asgi_app, '/api/rank_jobs', b'{"analyses": [')
+    assert status == 401
+    status, _, body = call(asgi_app, '/api/rank_jobs', b'{"analyses": [', headers)
+    assert status == 400 and 'valid JSON' in json.loads(body)['message']
+
+
+def test_other_routes_are_forwarded_to_flask(asgi_app):
+    status, _, body = call(asgi_app, '/api/users/count', method='GET')
+    assert status == 200 and json.loads(body) == {'count': 2}
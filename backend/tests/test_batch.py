@@ -0,0 +1,46 @@
+import batch
+from conftest import analysis
+from pipeline import rank_analyses, parse_fields
+from policy import get_policy
+
+JOBS = ['Python developer building Flask APIs', 'Senior data engineer, Spark and SQL',
+        'Registered nurse, night shifts', 'Python developer building Flask APIs']
+
+
+def test_rank_analyses_encodes_each_kind_in_one_call(encoder):
+    items = [analysis(i, jd, resume_text='Python Flask SQL developer') for i, jd in enumerate(JOBS)]
+    ranked = rank_analyses(items, 'Developer')
+    assert len(ranked) == len(JOBS)
+    # Profession, the three distinct job descriptions, the one resume.
+    assert encoder.batches == [1, 3, 1]
+
+
+def test_unsafe_items_do_not_encode_their_resume(encoder):
+    items = [analysis(1, JOBS[0], real=0.1, resume_text='Python developer')]
+    ranked = rank_analyses(items, 'Developer')
+    assert ranked[0]['cvMatchScore'] is None
+    assert encoder.batches == [1, 1]
+
+
+def _score(monkeypatch, chunk, fields, resume_text=None):
+    monkeypatch.setattr(batch, '_worker_state', {
+        'profession': 'Developer', 'resume_text': resume_text,
+        'fields': parse_fields(fields), 'policy': get_policy(),
+    })
+    return batch._score_chunk(chunk)
+
+
+def test_score_chunk_keeps_input_order_without_ids(encoder, monkeypatch):
+    chunk = [analysis(i, jd, real=real) for i, (jd, real) in enumerate(zip(JOBS, [0.1, 0.95, 0.5, 0.8]))]
+    rows, ranked = _score(monkeypatch, chunk, 'base_real_score')
+    assert rows == 4
+    assert [row['base_real_score'] for row in ranked] == [10.0, 95.0, 50.0, 80.0]
+    assert all(set(row) == {'base_real_score'} for row in ranked)
+
+
+def test_score_chunk_keeps_input_order_with_repeated_ids(encoder, monkeypatch):
+    chunk = [analysis(7, jd, real=real) for jd, real in zip(JOBS, [0.2, 0.9, 0.6, 0.7])]
+    _, ranked = _score(monkeypatch, chunk, '*', resume_text='Python developer')
+    assert [row['base_real_score'] for row in ranked] == [20.0, 90.0, 60.0, 70.0]
+    assert all(batch.INPUT_INDEX not in row for row in ranked)
+    assert all(row['resumeText'] == 'Python developer' for row in ranked)
@@ -0,0 +1,88 @@
+"""The content-addressed text store is scoped to the users who stored each text."""
+import blobstore
+from blobstore import hash_text
+from conftest import analysis, signup
+
+JD = 'Confidential: senior SRE role, Kubernetes and Terraform, salary 180k'
+
+
+def upload(client, headers, *texts):
+    response = client.post('/api/blobs', json={'texts': list(texts)}, headers=headers)
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['hashes']
+
+
+def missing(client, headers, *hashes):
+    response = client.post('/api/blobs/missing', json={'hashes': list(hashes)}, headers=headers)
+    assert response.status_code == 200
+    return response.get_json()['missing']
+
+
+def rank_by_hash(client, headers, sha):
+    item = analysis(1, None)
+    del item['jobDescription']
+    item['jd_hash'] = sha
+    return client.post('/api/rank_jobs?fields=id,jobDescription', json={'analyses': [item]}, headers=headers)
+
+
+def test_owner_resolves_hash(client, headers, encoder):
+    [sha] = upload(client, headers, JD)
+    assert sha == hash_text(JD)
+    assert missing(client, headers, sha) == []
+    response = rank_by_hash(client, headers, sha)
+    assert response.status_code == 200
+    assert response.get_json() == [{'id': 1, 'jobDescription': JD}]
+
+
+def test_other_users_cannot_read_or_probe_a_hash(client, headers, encoder):
+    [sha] = upload(client, headers, JD)
+    other = signup(client, 'mallory@example.com')
+
+    assert missing(client, other, sha) == [sha]
+    response = rank_by_hash(client, other, sha)
+    assert response.status_code == 409
+    assert response.get_json()['missing'] == [sha]
+
+    response = client.post('/api/rank_candidates', json={'jd_hash': sha, 'candidates': []}, headers=other)
+    assert response.status_code == 400
+    response = client.post('/api/cv_gap_analysis', json={'jd_hash': sha, 'resumeText': 'x'}, headers=other)
+    assert response.status_code == 409
+
+
+def test_release_is_per_user_and_evicts_the_cache(client, headers, encoder):
+    other = signup(client, 'bob@example.com')
+    [sha] = upload(client, headers, JD)
+    upload(client, other, JD)
+
+    assert client.delete(f'/api/blobs/{sha}', headers=headers).status_code == 200
+    assert sha not in blobstore._text_cache
+    assert missing(client, headers, sha) == [sha]
+    assert rank_by_hash(client, headers, sha).status_code == 409
+    # Bob still holds his reference.
+    assert rank_by_hash(client, other, sha).status_code == 200
+
+    assert client.delete(f'/api/blobs/{sha}', headers=other).status_code == 200
+    assert missing(client, other, sha) == [sha]
+    assert client.delete(f'/api/blobs/{sha}', headers=other).status_code == 404
+
+
+def test_failed_upload_leaves_no_cache_entry(client, headers, monkeypatch):
+    from extensions import db
+
+    def fail():
+        raise RuntimeError('disk full')
+
+    monkeypatch.setattr(db.session, 'commit', fail)
+    response = client.post('/api/blobs', json={'texts': [JD]}, headers=headers)
+    assert response.status_code == 500
+    assert hash_text(JD) not in blobstore._text_cache
+    monkeypatch.undo()
+    assert missing(client, headers, hash_text(JD)) == [hash_text(JD)]
+
+
+def test_malformed_refs_are_rejected(client, headers, encoder):
+    for bad in ({'sha': 'x'}, ['a', 'b'], 'not-a-hash', hash_text(JD).upper()):
+        assert rank_by_hash(client, headers, bad).status_code == 400
+    response = client.post('/api/cv_gap_analysis', headers=headers,
+                           json={'jobDescription': JD, 'resume_hash': {'sha': 'x'}})
+    assert response.status_code == 400
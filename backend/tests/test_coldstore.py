@@ -0,0 +1,89 @@
+import datetime
+
+import coldstore
+from conftest import analysis
+from extensions import db
+from models import Analysis
+
+OLD = datetime.datetime.utcnow() - datetime.timedelta(days=90)
+
+
+def seed(client, headers):
+    items = [analysis(1, 'Senior Python developer, remote', resumeFileName='cv-old.pdf'),
+             analysis(10 ** 15, 'Registered nurse, night shifts')]
+    assert client.post('/api/analyses', headers=headers, json={'analyses': items}).status_code == 201
+
+
+def age(client_id, when=OLD):
+    Analysis.query.filter_by(client_id=client_id).update({'created_at': when})
+    db.session.commit()
+
+
+def search(client, headers, q):
+    return [a['id'] for a in client.get(f'/api/analyses?q={q}', headers=headers).get_json()['analyses']]
+
+
+def fts_is_consistent():
+    try:
+        db.session.execute(db.text("INSERT INTO analysis_fts(analysis_fts, rank) VALUES ('integrity-check', 1)"))
+        return True
+    except Exception:
+        db.session.rollback()
+        return False
+
+
+def test_tiering_follows_created_at_not_the_client_id(app, client, headers):
+    seed(client, headers)
+    with app.app_context():
+        compactor = coldstore.ArchiveCompactor(app, hot_days=30)
+        # Client id 1 looks ancient and 10**15 lies in the future; neither was stored long ago.
+        assert compactor.run_once() == (0, 0)
+        age(10 ** 15)
+        assert compactor.run_once() == (0, 1)
+        assert db.session.query(Analysis.tier).filter_by(client_id=10 ** 15).scalar() == 'cold'
+    assert search(client, headers, 'nurse') == [10 ** 15]
+
+
+def test_retention_follows_created_at(app, client, headers):
+    seed(client, headers)
+    with app.app_context():
+        age(1)
+        assert coldstore.ArchiveCompactor(app, retention_days=60).run_once()[0] == 1
+    assert [a['id'] for a in client.get('/api/analyses', headers=headers).get_json()['analyses']] == [10 ** 15]
+
+
+def test_updating_a_cold_row_keeps_the_index_in_step(app, client, headers):
+    seed(client, headers)
+    with app.app_context():
+        age(1)
+        coldstore.ArchiveCompactor(app, hot_days=30).run_once()
+        coldstore.load_dictionaries()
+        Analysis.query.filter_by(client_id=1).update({'resume_file_name': 'cv-new.pdf'})
+        db.session.commit()
+        assert fts_is_consistent()
+    assert search(client, headers, 'python') == [1]
+    assert search(client, headers, 'new') == [1]
+    assert search(client, headers, 'old') == []
+    assert client.delete('/api/analyses/1', headers=headers).status_code == 200
+    with app.app_context():
+        assert fts_is_consistent()
+
+
+def test_out_of_range_ids_are_rejected(client, headers):
+    for bad in (2 ** 63, -2 ** 63 - 1):
+        response = client.post('/api/analyses', headers=headers, json=analysis(bad, 'Developer'))
+        assert response.status_code == 400
+    response = client.post('/api/analyses', headers={**headers, 'Content-Type': 'application/json'},
+                           data='{"id": 1e400, "jobDescription": "Developer"}')
+    assert response.status_code == 400
+    assert client.delete(f'/api/analyses/{2 ** 64}', headers=headers).status_code == 404
+
+
+def test_create_app_starts_no_compactor(monkeypatch, tmp_path):
+    import threading
+    from app import create_app
+
+    monkeypatch.setenv('SENTINEL_ARCHIVE', '1')
+    before = set(threading.enumerate())
+    create_app('scoring', {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'x.db'}"})
+    assert set(threading.enumerate()) <= before
@@ -0,0 +1,34 @@
+import json
+
+from columnstore import ID_BYTES, _decode_id, _encode_id
+from conftest import analysis
+
+
+def test_rank_history_returns_ids_as_rank_jobs_does(client, headers, encoder):
+    items = [analysis(1712345678901, 'Python developer', real=0.9),
+             analysis('job-2', 'Data engineer', real=0.8),
+             analysis(3, 'Nurse', real=0.2)]
+    ranked = client.post('/api/rank_jobs', headers=headers, json={'analyses': items}).get_json()
+
+    response = client.get('/api/rank_history', headers=headers)
+    assert response.status_code == 200
+    history = response.get_json()['results']
+    assert [row['id'] for row in history] == [row['id'] for row in ranked]
+    assert {type(row['id']) for row in history} == {int, str}
+
+
+def test_ids_round_trip():
+    for analysis_id in (0, 1712345678901, -5, 'job-2', '17'):
+        assert _decode_id(_encode_id(analysis_id)) == analysis_id
+    # Too long to store whole: a prefix, still decodable.
+    for analysis_id in ('x' * 100, '\u00e9' * 100, '"' * 100, ['job'] * 30):
+        raw = _encode_id(analysis_id)
+        text = analysis_id if isinstance(analysis_id, str) else json.dumps(analysis_id)
+        assert len(raw) <= ID_BYTES and text.startswith(_decode_id(raw))
+
+
+def test_rank_history_rejects_bad_paging(client, headers, encoder):
+    client.post('/api/rank_jobs', headers=headers, json={'analyses': [analysis(1, 'Python developer')]})
+    for query in ('top_k=0', 'top_k=-3', 'offset=-1'):
+        assert client.get(f'/api/rank_history?{query}', headers=headers).status_code == 400
+    assert len(client.get('/api/rank_history?top_k=1', headers=headers).get_json()['results']) == 1
@@ -0,0 +1,31 @@
+import gzip
+import json
+
+from compression import MAX_DECOMPRESSED_BYTES
+from conftest import analysis
+
+
+def post(client, headers, body, **extra):
+    return client.post('/api/rank_jobs', data=body,
+                       headers={**headers, 'Content-Type': 'application/json', **extra})
+
+
+def test_gzip_request_body_is_decoded(client, headers, encoder):
+    body = gzip.compress(json.dumps({'analyses': [analysis(1, 'Python developer')]}).encode())
+    response = post(client, headers, body, **{'Content-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert [row['id'] for row in response.get_json()] == [1]
+
+
+def test_body_inflating_past_the_cap_is_rejected_with_json_413(client, headers, encoder):
+    # Valid JSON right up to the cap, so a silent truncation would not parse either way.
+    padding = b' ' * MAX_DECOMPRESSED_BYTES
+    body = gzip.compress(b'{"analyses": []' + padding + b'}')
+    response = post(client, headers, body, **{'Content-Encoding': 'gzip'})
+    assert response.status_code == 413
+    assert 'too large' in response.get_json()['message']
+
+
+def test_malformed_gzip_is_a_bad_request(client, headers):
+    response = post(client, headers, b'not gzip at all', **{'Content-Encoding': 'gzip'})
+    assert response.status_code == 400
@@ -0,0 +1,10 @@
+import threading
+
+from app import create_app
+
+
+def test_create_app_starts_no_migrator(monkeypatch, tmp_path):
+    monkeypatch.setenv('SENTINEL_EMBEDDING_MIGRATE', '1')
+    create_app('scoring', {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'x.db'}"})
+    assert not any(t.name == 'sentinel-embedding-migrator' for t in threading.enumerate())
+
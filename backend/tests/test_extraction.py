@@ -0,0 +1,50 @@
+import io
+
+import resume
+from extraction import _decode_text
+
+
+def test_plain_text_without_bom_is_not_read_as_utf16():
+    text = 'Résumé – café, naïve'
+    assert _decode_text(text.encode('cp1252')) == text
+    assert _decode_text(text.encode('utf-8')) == text
+    assert _decode_text(text.encode('utf-16')) == text
+
+
+def test_utf8_split_by_the_read_limit_stays_utf8():
+    raw = 'Résumé'.encode('utf-8')
+    assert _decode_text(raw[:-1]) == 'Résum'
+
+
+def test_text_upload_is_extracted(client, headers):
+    body = 'Python developer, Zürich'.encode('cp1252')
+    response = client.post('/api/resume/extract?filename=cv.txt', data=body,
+                           headers={**headers, 'Content-Type': 'text/plain'})
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['resumeText'] == 'Python developer, Zürich'
+
+
+def test_oversized_multipart_upload_is_rejected_before_parsing(client, headers, monkeypatch):
+    monkeypatch.setattr(resume, 'MAX_UPLOAD_BYTES', 1024)
+    monkeypatch.setattr(resume, 'MULTIPART_OVERHEAD', 1024)
+    data = {'file': (io.BytesIO(b'x' * 4096), 'cv.txt')}
+    response = client.post('/api/resume/extract', data=data, headers=headers,
+                           content_type='multipart/form-data')
+    assert response.status_code == 413
+    assert 'too large' in response.get_json()['message']
+
+
+def test_oversized_raw_upload_is_rejected(client, headers, monkeypatch):
+    monkeypatch.setattr(resume, 'MAX_UPLOAD_BYTES', 1024)
+    response = client.post('/api/resume/extract?filename=cv.txt', data=b'x' * 4096,
+                           headers={**headers, 'Content-Type': 'text/plain'})
+    assert response.status_code == 413
+
+
+def test_raw_upload_over_the_request_cap_is_rejected(client, headers, monkeypatch):
+    monkeypatch.setattr(resume, 'MAX_UPLOAD_BYTES', 1024)
+    monkeypatch.setattr(resume, 'MULTIPART_OVERHEAD', 0)
+    response = client.post('/api/resume/extract?filename=cv.txt', data=b'x' * 4096,
+                           headers={**headers, 'Content-Type': 'text/plain'})
+    assert response.status_code == 413
+    assert 'too large' in response.get_json()['message']
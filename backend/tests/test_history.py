@@ -0,0 +1,80 @@
+from conftest import analysis, signup
+
+JOBS = [
+    (1, 'Senior Python developer, remote', 0.9),
+    (2, 'Python data engineer in Berlin', 0.3),
+    (3, 'Registered nurse, night shifts', 0.8),
+]
+
+
+def save(client, headers, items):
+    return client.post('/api/analyses', headers=headers, json={'analyses': items})
+
+
+def seed(client, headers):
+    response = save(client, headers, [analysis(i, jd, real=real) for i, jd, real in JOBS])
+    assert response.status_code == 201
+    return response.get_json()
+
+
+def test_save_skips_ids_already_stored(client, headers):
+    assert seed(client, headers) == {'saved': 3, 'skipped': 0}
+    assert seed(client, headers) == {'saved': 0, 'skipped': 3}
+
+
+def test_save_rejects_items_without_an_id(client, headers):
+    response = save(client, headers, [{'jobDescription': 'No id'}])
+    assert response.status_code == 400
+
+
+def test_save_rejects_non_string_texts(client, headers):
+    for item in (analysis(1, {'text': 'Python developer'}), analysis(1, 'Python developer', resume_text=['cv'])):
+        response = save(client, headers, [item])
+        assert response.status_code == 400
+        assert 'message' in response.get_json()
+    assert client.get('/api/analyses', headers=headers).get_json()['analyses'] == []
+
+
+def ids(response):
+    return [a['id'] for a in response.get_json()['analyses']]
+
+
+def test_search_matches_prefixes_and_filters(client, headers):
+    seed(client, headers)
+
+    assert ids(client.get('/api/analyses?q=pyth', headers=headers)) in ([1, 2], [2, 1])
+    assert ids(client.get('/api/analyses?q=python+remote', headers=headers)) == [1]
+    assert ids(client.get('/api/analyses?risk=high', headers=headers)) == [2]
+    assert ids(client.get('/api/analyses?min_score=50', headers=headers)) == [3, 1]
+    assert client.get('/api/analyses?risk=maybe', headers=headers).status_code == 400
+
+
+def test_search_pages_newest_first_without_stats(client, headers):
+    seed(client, headers)
+    response = client.get('/api/analyses?page=2&per_page=2', headers=headers)
+    body = response.get_json()
+    assert ids(response) == [1]
+    assert (body['total'], body['pages']) == (3, 2)
+    assert 'stats' not in body
+
+
+def test_stats_count_labels_across_the_whole_history(client, headers):
+    seed(client, headers)
+    stats = client.get('/api/analyses/stats', headers=headers).get_json()
+    assert (stats['total'], stats['real'], stats['fake']) == (3, 2, 1)
+    assert stats['fakePercentage'] == '33.3'
+
+
+def test_history_is_per_user(client, headers):
+    seed(client, headers)
+    other = signup(client, 'other@example.com')
+    assert client.get('/api/analyses', headers=other).get_json()['total'] == 0
+    assert client.delete('/api/analyses/1', headers=other).status_code == 404
+
+
+def test_delete_removes_the_row_from_search(client, headers):
+    seed(client, headers)
+    assert client.delete('/api/analyses/1', headers=headers).get_json() == {'deleted': 1}
+    assert client.get('/api/analyses?q=remote', headers=headers).get_json()['total'] == 0
+    assert client.delete('/api/analyses', headers=headers).get_json() == {'deleted': 2}
+    assert client.get('/api/analyses/stats', headers=headers).get_json()['total'] == 0
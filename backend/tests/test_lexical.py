@@ -0,0 +1,82 @@
+"""BM25 stage: indexes only job descriptions, syncs on blob changes, shortlists rank_jobs."""
+import lexical
+from blobstore import hash_text
+from conftest import analysis
+
+JDS = [
+    'Registered nurse with BLS certification for the night shift',
+    'Backend engineer: Terraform, Kubernetes and PostgreSQL',
+    'Data analyst fluent in SQL and Tableau dashboards',
+]
+RESUME = 'Nurse resume: BLS certification, ACLS, patient care'
+
+
+def upload(client, headers, texts, kinds):
+    response = client.post('/api/blobs', json={'texts': texts, 'kinds': kinds}, headers=headers)
+    assert response.status_code == 201, response.get_json()
+
+
+def search(client, headers, query):
+    response = client.post('/api/search_texts', json={'query': query, 'alpha': 1.0}, headers=headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_only_job_descriptions_are_indexed(client, headers):
+    upload(client, headers, JDS + [RESUME], ['jd'] * len(JDS) + ['resume'])
+    body = search(client, headers, 'BLS certification')
+    assert body['indexed'] == len(JDS)
+    assert [r['hash'] for r in body['results']] == [hash_text(JDS[0])]
+
+
+def test_index_follows_uploads_and_deletes(client, headers, app, monkeypatch):
+    upload(client, headers, JDS[:1], ['jd'])
+    assert search(client, headers, 'terraform')['results'] == []
+
+    upload(client, headers, JDS[1:2], ['jd'])
+    assert [r['hash'] for r in search(client, headers, 'terraform')['results']] == [hash_text(JDS[1])]
+
+    # Unchanged blobs: the index is reused without re-reading the refs.
+    diffs = []
+    original = lexical.load_texts
+    monkeypatch.setattr(lexical, 'load_texts', lambda hashes: diffs.append(hashes) or original(hashes))
+    search(client, headers, 'terraform')
+    assert diffs == []
+
+    assert client.delete(f'/api/blobs/{hash_text(JDS[1])}', headers=headers).status_code == 200
+    body = search(client, headers, 'terraform')
+    assert body['results'] == [] and body['indexed'] == 1
+
+
+def test_rank_jobs_scores_only_the_lexical_shortlist(client, headers, encoder):
+    analyses = [analysis(i, jd) for i, jd in enumerate(JDS)]
+    response = client.post('/api/rank_jobs?q=sql+tableau&shortlist=5&fields=id,lexicalScore',
+                           json={'analyses': analyses}, headers=headers)
+    assert response.status_code == 200
+    assert response.get_json() == [{'id': 2, 'lexicalScore': 100.0}]
+    assert 'lexical;dur=' in response.headers['Server-Timing']
+
+    response = client.post('/api/rank_jobs?fields=id,lexicalScore', json={'analyses': analyses}, headers=headers)
+    assert [row['lexicalScore'] for row in response.get_json()] == [None] * len(JDS)
+
+
+def test_shortlist_drops_non_string_job_descriptions(client, headers, encoder):
+    analyses = [analysis(0, {'text': JDS[2]}), analysis(1, JDS[2])]
+    response = client.post('/api/rank_jobs?q=sql&fields=id', json={'analyses': analyses}, headers=headers)
+    assert response.status_code == 200
+    assert response.get_json() == [{'id': 1}]
+
+
+def test_search_ignores_malformed_hashes_and_clamps_the_shortlist(client, headers, monkeypatch):
+    upload(client, headers, JDS, ['jd'] * len(JDS))
+    shortlists = []
+    original = lexical.lexical_shortlist
+    monkeypatch.setattr(lexical, 'lexical_shortlist',
+                        lambda index, query, shortlist, restrict: shortlists.append(shortlist)
+                        or original(index, query, shortlist, restrict))
+    response = client.post('/api/search_texts', headers=headers, json={
+        'query': 'sql', 'alpha': 1.0, 'shortlist': 10 ** 9,
+        'hashes': [{'sha': 1}, ['x'], hash_text(JDS[2])]})
+    assert response.status_code == 200
+    assert [r['hash'] for r in response.get_json()['results']] == [hash_text(JDS[2])]
+    assert shortlists == [lexical.MAX_SHORTLIST]
@@ -0,0 +1,16 @@
+"""Query timing keeps its per-connection bookkeeping balanced."""
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+import metrics  # noqa: F401  (registers the Engine listeners)
+
+
+def test_failed_statements_do_not_leak_start_times():
+    engine = create_engine('sqlite://')
+    with engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(text('SELECT * FROM missing_table'))
+        conn.execute(text('SELECT 1'))
+        assert conn.info.get('sentinel_query_start') == []
@@ -0,0 +1,99 @@
+import itertools
+import json
+import math
+
+import pytest
+
+import policy
+from conftest import analysis
+from pipeline import rank_analyses
+from policy import DEFAULT_POLICY, ScoringPolicy, get_policy, load_policies, select_policy
+
+
+def per_item(p, base, relevance, cv):
+    """The original rank_jobs branches, one item at a time."""
+    is_safe = base >= p.safe_threshold
+    is_relevant = relevance > p.relevance_cutoff
+    if is_relevant:
+        personalized = min(base * p.relevant_boost, p.boost_cap)
+    elif base > p.penalty_floor:
+        personalized = base * p.irrelevant_penalty
+    else:
+        personalized = base
+    composite = personalized
+    if is_safe and cv is not None:
+        composite = (p.authenticity_weight * personalized) + (p.cv_weight * cv)
+    return is_safe, is_relevant, personalized, composite
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Policies loaded by a test are forgotten afterwards."""
+    monkeypatch.setattr(policy, 'POLICIES', dict(policy.POLICIES))
+    monkeypatch.setattr(policy, '_config', dict(policy._config))
+
+
+def write_config(tmp_path, config):
+    path = tmp_path / 'policies.json'
+    path.write_text(json.dumps(config))
+    return str(path)
+
+
+@pytest.mark.parametrize('p', [DEFAULT_POLICY, ScoringPolicy(version='x', safe_threshold=70.0, boost_cap=90.0)])
+def test_evaluate_matches_the_per_item_rules(p):
+    # Boundaries of every branch: thresholds, cutoff, penalty floor, the cap.
+    cases = list(itertools.product([0.0, 49.9, 50.0, 60.0, 60.1, 70.0, 85.0, 100.0],
+                                   [0.0, 10.0, 10.1, 55.0], [None, 0.0, 73.4]))
+    base, relevance, cv = zip(*cases)
+    result = p.evaluate(base, relevance, [math.nan if c is None else c for c in cv])
+    for i, case in enumerate(cases):
+        is_safe, is_relevant, personalized, composite = per_item(p, *case)
+        assert result['is_safe'][i] == is_safe, case
+        assert result['is_relevant'][i] == is_relevant, case
+        assert result['personalized'][i] == pytest.approx(personalized), case
+        assert result['composite'][i] == pytest.approx(composite), case
+
+
+def test_rank_analyses_orders_safe_items_by_composite(encoder):
+    items = [analysis(1, 'Nurse', real=0.95), analysis(2, 'Developer', real=0.3),
+             analysis(3, 'Python developer', real=0.7), analysis(4, 'Developer', real=0.5)]
+    ranked = rank_analyses(items, 'Developer')
+    assert [row['is_safe'] for row in ranked] == [True, True, True, False]
+    composites = [row['composite_score'] for row in ranked[:3]]
+    assert composites == sorted(composites, reverse=True)
+    assert ranked[-1]['id'] == 2
+
+
+def test_loaded_policies_inherit_the_default(registry, tmp_path):
+    load_policies(write_config(tmp_path, {'policies': [{'version': '2', 'relevant_boost': 1.25}]}))
+    assert get_policy('2').relevant_boost == 1.25
+    assert get_policy('2').safe_threshold == DEFAULT_POLICY.safe_threshold
+    assert get_policy() is DEFAULT_POLICY
+
+
+@pytest.mark.parametrize('config', [
+    {'policies': [{'version': '2', 'boost': 2}]},
+    {'default': '3'},
+    {'policies': [{'version': '2'}], 'experiment': {'1': 0.6, '2': 0.6}},
+])
+def test_invalid_policy_files_are_rejected(registry, tmp_path, config):
+    with pytest.raises(ValueError):
+        load_policies(write_config(tmp_path, config))
+
+
+def test_users_keep_their_experiment_arm(registry, tmp_path):
+    load_policies(write_config(tmp_path, {'policies': [{'version': '2', 'safe_threshold': 80.0}],
+                                          'experiment': {'2': 0.5}}))
+    arms = [select_policy(user_id).version for user_id in range(1000)]
+    assert arms == [select_policy(user_id).version for user_id in range(1000)]
+    assert 400 < arms.count('2') < 600
+
+
+def test_rank_jobs_applies_and_reports_the_users_policy(registry, tmp_path, client, headers, encoder):
+    load_policies(write_config(tmp_path, {'policies': [{'version': '2', 'safe_threshold': 80.0}],
+                                          'experiment': {'2': 1.0}}))
+    response = client.post('/api/rank_jobs', headers=headers,
+                           json={'analyses': [analysis(1, 'Python developer', real=0.7)]})
+    assert response.status_code == 200
+    assert response.headers['X-Scoring-Version'].endswith(';policy=2')
+    assert response.get_json()[0]['risk_level'] == 'HIGH'
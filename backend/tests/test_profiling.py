@@ -0,0 +1,70 @@
+"""Signed-header profiling: only valid, unexpired, path-bound tokens profile a request."""
+import os
+import time
+
+import pytest
+
+from profiling import ADMIN_PATH, PROFILE_HEADER, PROFILE_ID_HEADER, make_token, sign, verify_token
+
+SECRET = 'test-secret'
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {'PROFILE_SECRET': SECRET, 'PROFILE_DIR': str(tmp_path / 'profiles')}
+
+
+def test_verify_token():
+    token = make_token(SECRET, '/api/rank_jobs', 'sample')
+    assert verify_token(SECRET, token, '/api/rank_jobs') == 'sample'
+    assert verify_token(SECRET, token, '/api/rank_candidates') is None
+    assert verify_token('other-secret', token, '/api/rank_jobs') is None
+
+    expires, mode, signature = token.split('.')
+    assert verify_token(SECRET, f"{expires}.cprofile.{signature}", '/api/rank_jobs') is None
+    assert verify_token(SECRET, f"{int(expires) + 1}.{mode}.{signature}", '/api/rank_jobs') is None
+
+    past = int(time.time()) - 1
+    assert verify_token(SECRET, f"{past}.sample.{sign(SECRET, past, 'sample', '/api/rank_jobs')}",
+                        '/api/rank_jobs') is None
+    for garbage in (None, '', 'abc', '1.2', 'x.cprofile.y', f"{past + 100}.bogus.{signature}"):
+        assert verify_token(SECRET, garbage, '/api/rank_jobs') is None
+
+
+@pytest.mark.parametrize('mode, suffix', [('cprofile', 'pstats'), ('sample', 'collapsed')])
+def test_signed_request_is_profiled(client, headers, app_config, mode, suffix):
+    token = make_token(SECRET, '/api/verify', mode)
+    response = client.get('/api/verify', headers={**headers, PROFILE_HEADER: token})
+    assert response.status_code == 200
+    profile_id = response.headers[PROFILE_ID_HEADER]
+    assert os.path.exists(os.path.join(app_config['PROFILE_DIR'], f"{profile_id}.{suffix}"))
+
+    admin = {PROFILE_HEADER: make_token(SECRET, ADMIN_PATH)}
+    listed = client.get(ADMIN_PATH, headers=admin).get_json()['profiles']
+    assert [p['id'] for p in listed] == [profile_id]
+    assert client.get(f'{ADMIN_PATH}/{profile_id}', headers=admin).status_code == 200
+
+
+def test_unsigned_or_misdirected_requests_are_not_profiled(client, headers, app_config):
+    for token in (None, 'garbage', make_token(SECRET, '/api/user')):
+        extra = {PROFILE_HEADER: token} if token else {}
+        response = client.get('/api/verify', headers={**headers, **extra})
+        assert response.status_code == 200
+        assert PROFILE_ID_HEADER not in response.headers
+    assert os.listdir(app_config['PROFILE_DIR']) == []
+
+
+def test_admin_routes_need_an_admin_token(client):
+    assert client.get(ADMIN_PATH).status_code == 403
+    wrong_path = {PROFILE_HEADER: make_token(SECRET, '/api/rank_jobs')}
+    assert client.get(ADMIN_PATH, headers=wrong_path).status_code == 403
+    admin = {PROFILE_HEADER: make_token(SECRET, ADMIN_PATH)}
+    assert client.get(f'{ADMIN_PATH}/..%2Fusers', headers=admin).status_code == 404
+
+
+def test_profiling_is_off_without_a_secret(tmp_path, monkeypatch):
+    monkeypatch.delenv('SENTINEL_PROFILE_SECRET', raising=False)
+    from app import create_app
+    app = create_app('auth', {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'off.db'}"})
+    assert all(f.__name__ != '_start_profile' for f in app.before_request_funcs.get(None, []))
+    assert 'profiling.list_profiles' not in app.view_functions
@@ -0,0 +1,66 @@
+"""rank_jobs response projection (`fields`) and the JSON encoder behind it."""
+import json
+
+import pytest
+
+import serialization
+from pipeline import DEFAULT_FIELDS, SCORE_FIELDS, parse_fields
+from conftest import analysis
+
+
+@pytest.mark.parametrize('raw, expected', [
+    (None, DEFAULT_FIELDS),
+    ('', DEFAULT_FIELDS),
+    ([], DEFAULT_FIELDS),
+    ('id, risk_level,', ('id', 'risk_level')),
+    (['id', 'composite_score', 3], ('id', 'composite_score')),
+    (' , ', DEFAULT_FIELDS),
+    ('id,*', None),
+])
+def test_parse_fields(raw, expected):
+    assert parse_fields(raw) == expected
+
+
+def rank(client, headers, query='', **body):
+    body.setdefault('analyses', [analysis(1, 'Senior Python developer', resume_text='Python developer'),
+                                 analysis(2, 'Send us a fee to start', real=0.1)])
+    response = client.post(f'/api/rank_jobs{query}', json=body, headers=headers)
+    assert response.status_code == 200, response.data
+    return response.get_json()
+
+
+def test_default_projection_drops_echoed_inputs(client, headers, encoder):
+    rows = rank(client, headers)
+    assert [row['id'] for row in rows] == [1, 2]
+    for row in rows:
+        assert set(row) == set(DEFAULT_FIELDS)
+        assert 'jobDescription' not in row and 'resumeText' not in row
+
+
+def test_explicit_fields_from_query_win_over_body(client, headers, encoder):
+    rows = rank(client, headers, '?fields=id,risk_level', fields='*')
+    assert rows == [{'id': 1, 'risk_level': 'LOW'}, {'id': 2, 'risk_level': 'HIGH'}]
+
+
+def test_all_fields_keep_every_input_key(client, headers, encoder):
+    rows = rank(client, headers, fields='*')
+    assert rows[0]['jobDescription'] == 'Senior Python developer'
+    assert rows[0]['resumeText'] == 'Python developer'
+    assert set(SCORE_FIELDS) <= set(rows[0])
+
+
+def test_non_object_body_is_rejected(client, headers):
+    response = client.post('/api/rank_jobs', json=[1, 2], headers=headers)
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('payload', [
+    [{'id': 1, 'score': 87.5, 'alert': 'Authentic – “résumé”', 'ok': True, 'cv': None}],
+    {'big': 2 ** 70, 'nested': [[], {}, -0.5]},
+])
+def test_dumps_matches_stdlib(payload, monkeypatch):
+    expected = json.loads(json.dumps(payload))
+    assert json.loads(serialization.dumps(payload)) == expected
+    monkeypatch.setattr(serialization, 'orjson', None)
+    assert serialization.dumps(payload) == json.dumps(payload, separators=(',', ':'),
+                                                       ensure_ascii=False).encode('utf-8')
@@ -0,0 +1,67 @@
+"""rank_candidates ranks resumes against one job description."""
+from blobstore import hash_text
+
+JD = 'Python developer building Flask APIs with SQL'
+RESUMES = {
+    'strong': 'Python Flask SQL developer building APIs',
+    'partial': 'Python scripting and spreadsheets',
+    'none': 'Registered nurse, night shifts',
+}
+
+
+def rank(client, headers, **body):
+    return client.post('/api/rank_candidates', json=body, headers=headers)
+
+
+def test_candidates_are_ranked_by_cv_match(client, headers, encoder):
+    candidates = [{'id': key, 'resumeText': text} for key, text in RESUMES.items()]
+    response = rank(client, headers, jobDescription=JD, candidates=candidates)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [c['id'] for c in body['candidates']] == ['strong', 'partial', 'none']
+    assert [c['rank'] for c in body['candidates']] == [1, 2, 3]
+    assert body['total'] == 3 and body['skipped'] == []
+
+
+def test_top_k_truncates_the_ranking(client, headers, encoder):
+    candidates = [{'id': key, 'resumeText': text} for key, text in RESUMES.items()]
+    body = rank(client, headers, jobDescription=JD, candidates=candidates, top_k=1).get_json()
+    assert [c['id'] for c in body['candidates']] == ['strong']
+    assert body['total'] == 3
+
+
+def test_candidates_without_text_are_skipped(client, headers, encoder):
+    candidates = [{'id': 1, 'resumeText': RESUMES['strong']}, {'id': 2}, {'id': 3, 'resumeText': ''}]
+    body = rank(client, headers, jobDescription=JD, candidates=candidates).get_json()
+    assert [c['id'] for c in body['candidates']] == [1]
+    assert body['skipped'] == [2, 3]
+    assert body['total'] == 1
+
+
+def test_stored_resumes_are_resolved_by_hash(client, headers, encoder):
+    client.post('/api/blobs', json={'texts': [JD, RESUMES['strong']]}, headers=headers)
+    candidates = [{'id': 1, 'resume_hash': hash_text(RESUMES['strong'])},
+                  {'id': 2, 'resumeText': RESUMES['none']}]
+    response = rank(client, headers, jd_hash=hash_text(JD), candidates=candidates)
+    assert response.status_code == 200
+    assert [c['id'] for c in response.get_json()['candidates']] == [1, 2]
+
+
+def test_unknown_hashes_are_reported(client, headers, encoder):
+    sha = hash_text('never uploaded')
+    response = rank(client, headers, jobDescription=JD, candidates=[{'id': 1, 'resume_hash': sha}])
+    assert response.status_code == 409
+    assert response.get_json()['missing'] == [sha]
+
+
+def test_malformed_input_is_rejected(client, headers, encoder):
+    candidate = {'id': 1, 'resumeText': RESUMES['strong']}
+    for body in ({'jobDescription': {'text': JD}, 'candidates': [candidate]},
+                 {'jd_hash': {'sha': 1}, 'candidates': [candidate]},
+                 {'jobDescription': JD, 'candidates': [{'id': 1, 'resume_hash': {'sha': 1}}]},
+                 {'jobDescription': JD, 'candidates': [{'id': 1, 'resume_hash': 'not-a-hash'}]},
+                 {'jobDescription': JD, 'candidates': [{'id': 1, 'resumeText': ['cv']}]},
+                 {'jobDescription': JD, 'candidates': ['cv']}):
+        response = rank(client, headers, **body)
+        assert response.status_code == 400, body
+        assert 'message' in response.get_json()
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+import nlp
+import requirement_coverage
+from requirement_coverage import embed_chunks
+
+JOB = """Requirements:
+- 3+ years of Python development experience
+- Experience running PostgreSQL in production
+- Strong written communication skills
+"""
+RESUME = """Built Python development tooling for five years
+Ran PostgreSQL clusters in production at scale
+"""
+
+
+class NarrowEncoder:
+    """A second model with another embedding width."""
+
+    def tokenizer(self, batch, add_special_tokens=True):
+        return {'input_ids': [[0] for _ in batch]}
+
+    def encode(self, texts, **kwargs):
+        return np.ones((len(texts), 8), dtype=np.float32) / np.sqrt(8)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    requirement_coverage.clear_chunk_cache()
+    yield
+    requirement_coverage.clear_chunk_cache()
+
+
+def test_chunk_cache_is_per_model(encoder, monkeypatch):
+    assert embed_chunks(['python developer with flask']).shape == (1, 64)
+    monkeypatch.setitem(nlp._models, 'narrow-model', NarrowEncoder())
+    monkeypatch.setitem(nlp._serving, 'model', 'narrow-model')
+    assert embed_chunks(['python developer with flask', 'ran postgres in production']).shape == (2, 8)
+
+
+def test_warm_chunks_are_not_re_encoded(encoder):
+    embed_chunks(['python developer with flask'])
+    embed_chunks(['python developer with flask', 'ran postgres in production'])
+    assert encoder.batches == [1, 1]
+
+
+def test_gap_analysis_route(client, headers, encoder):
+    response = client.post('/api/cv_gap_analysis', headers=headers,
+                           json={'jobDescription': JOB, 'resumeText': RESUME})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert len(body['requirements']) == 3
+    assert body['covered'] + body['partial'] + body['missing'] == 3
+
+
+@pytest.mark.parametrize('payload', [
+    {'jobDescription': JOB, 'resumeText': ['not', 'a', 'string']},
+    {'jobDescription': {'text': JOB}, 'resumeText': RESUME},
+    {'jobDescription': JOB},
+])
+def test_gap_analysis_rejects_missing_or_non_string_texts(client, headers, payload):
+    response = client.post('/api/cv_gap_analysis', headers=headers, json=payload)
+    assert response.status_code == 400
@@ -0,0 +1,68 @@
+"""`?rerank=<k>` rescores the top k safe items with a resume by the cross-encoder."""
+import numpy as np
+import pytest
+
+import nlp
+from conftest import analysis
+
+FIELDS = 'id,composite_score,cvMatchScore,rerankScore,is_safe'
+ITEMS = [
+    analysis(1, 'Python developer building Flask APIs', resume_text='Python Flask developer building APIs'),
+    analysis(2, 'Python developer for data pipelines', resume_text='Python developer'),
+    analysis(3, 'Backend developer, Go services', resume_text='Python Flask developer'),
+    analysis(4, 'Python developer building Flask APIs', real=0.2, resume_text='Python Flask developer'),
+    analysis(5, 'Python developer building Flask APIs'),
+]
+
+
+class FakeCrossEncoder:
+    """Prefers the data-pipelines job, whatever the bi-encoder thought."""
+
+    def __init__(self):
+        self.pairs = []
+
+    def predict(self, pairs, batch_size=32, convert_to_numpy=True):
+        self.pairs.extend(pairs)
+        return np.array([0.95 if 'pipelines' in jd else 0.05 for jd, _ in pairs])
+
+
+@pytest.fixture
+def cross_encoder(monkeypatch):
+    fake = FakeCrossEncoder()
+    monkeypatch.setattr(nlp, '_reranker', fake)
+    return fake
+
+
+def rank(client, headers, query=''):
+    response = client.post(f'/api/rank_jobs?fields={FIELDS}{query}', json={'analyses': ITEMS}, headers=headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_only_the_top_k_are_rescored_and_reordered(client, headers, encoder, cross_encoder):
+    before = rank(client, headers)
+    assert all(row['rerankScore'] is None for row in before)
+    assert cross_encoder.pairs == []
+    top = [row['id'] for row in before if row['is_safe'] and row['id'] != 5][:2]
+
+    after = rank(client, headers, '&rerank=2')
+    rescored = [row for row in after if row['rerankScore'] is not None]
+    assert sorted(row['id'] for row in rescored) == sorted(top) == [1, 2]
+    assert [row['id'] for row in rescored] == [2, 1]
+    assert len(cross_encoder.pairs) == 2
+    # The rescored items trade places only among the positions they held.
+    positions = [i for i, row in enumerate(before) if row['id'] in top]
+    assert [after[i]['id'] for i in positions] == [row['id'] for row in rescored]
+    assert [row['composite_score'] for row in rescored] == \
+        sorted((row['composite_score'] for row in rescored), reverse=True)
+    # Everything else keeps its place and its scores.
+    for i, row in enumerate(before):
+        if i not in positions:
+            assert after[i] == row
+
+
+def test_unsafe_items_and_items_without_a_resume_are_never_rescored(client, headers, encoder, cross_encoder):
+    rows = {row['id']: row for row in rank(client, headers, '&rerank=100')}
+    assert rows[4]['rerankScore'] is None and rows[5]['rerankScore'] is None
+    assert rows[2]['rerankScore'] == 95.0
+    assert {resume for _, resume in cross_encoder.pairs} == {ITEMS[i]['resumeText'] for i in range(3)}
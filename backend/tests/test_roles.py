@@ -0,0 +1,48 @@
+"""Each role serves only its own blueprints; split processes share one database."""
+import pytest
+
+from app import create_app
+from conftest import analysis, login
+from extensions import db
+
+
+@pytest.fixture
+def role_app(app):
+    """create_app(role) over the database the `app` fixture set up."""
+    apps = []
+
+    def make(role):
+        apps.append(create_app(role, {'TESTING': True,
+                                      'SQLALCHEMY_DATABASE_URI': app.config['SQLALCHEMY_DATABASE_URI']}))
+        return apps[-1]
+
+    yield make
+    for role_app in apps:
+        with role_app.app_context():
+            db.engine.dispose()
+
+
+def test_auth_role_serves_no_scoring_routes(role_app):
+    client = role_app('auth').test_client()
+    headers = login(client)
+    assert client.get('/api/verify', headers=headers).status_code == 200
+    for path in ('/api/rank_jobs', '/api/rank_candidates', '/api/blobs', '/api/analyses'):
+        assert client.post(path, json={}, headers=headers).status_code == 404
+
+
+def test_scoring_role_serves_no_auth_routes(role_app, encoder):
+    auth = role_app('auth').test_client()
+    scoring = role_app('scoring').test_client()
+    assert scoring.post('/api/login', json={'email': 'user@example.com', 'password': 'user123'}).status_code == 404
+    assert scoring.post('/api/signup', json={}).status_code == 404
+
+    # A token issued by the auth processes is accepted by the scoring ones.
+    response = scoring.post('/api/rank_jobs', json={'analyses': [analysis(1, 'Python developer')]},
+                            headers=login(auth))
+    assert response.status_code == 200
+    assert [row['id'] for row in response.get_json()] == [1]
+
+
+def test_unknown_role_is_rejected():
+    with pytest.raises(ValueError):
+        create_app('admin')
@@ -0,0 +1,44 @@
+"""Vocabulary skill matching: slash-separated lists and ambiguous words."""
+import pytest
+
+from skills import get_skill_index, skill_overlap
+
+
+def names(text):
+    index = get_skill_index()
+    return index.names_for(index.extract(text))
+
+
+def test_slash_separated_skills_and_plain_words():
+    assert skill_overlap('Must know Python/Java and AWS/GCP. Ready to go!', 'Python, Java, AWS') == \
+        (['Python', 'Java', 'AWS'], ['Google Cloud'], 75.0)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('Experience with Go and Rust.', ['Go', 'Rust']),
+    ('Skills: Go, Rust', ['Go', 'Rust']),
+    ('Go, Swift or Dart', ['Go', 'Swift', 'Dart']),
+    ('Python/Go', ['Python', 'Go']),
+    ('TypeScript (TS) preferred', ['TypeScript']),
+    ('CI/CD pipelines and A/B testing', ['A/B testing', 'CI/CD']),
+    ('Microsoft Excel', ['Excel']),
+    ('Skills:\t Go \t,  Rust', ['Go', 'Rust']),
+])
+def test_ambiguous_skills_in_skill_context(text, expected):
+    assert names(text) == expected
+
+
+@pytest.mark.parametrize('text', [
+    'Go to our careers page to apply.',
+    'We need swift onboarding for the rest of the team.',
+    'Ready to go! Spring internship, no ts files.',
+    'You will excel at this.',
+])
+def test_ambiguous_words_in_prose_are_not_skills(text):
+    assert names(text) == []
+
+
+def test_many_ambiguous_words_take_one_pass():
+    # Quadratic if every match re-read the text before it: ~10^10 characters.
+    text = 'Go, Swift, ' * 50000
+    assert names(text) == ['Go', 'Swift']
@@ -0,0 +1,46 @@
+"""Server-Timing: fixed stage names, in pipeline order, with a total."""
+import re
+
+from conftest import analysis
+from timing import STAGES
+
+ENTRY_RE = re.compile(r'^([a-z_]+);dur=(\d+\.\d{2})$')
+
+
+def stages(response):
+    entries = [ENTRY_RE.match(entry) for entry in response.headers['Server-Timing'].split(', ')]
+    assert all(entries), response.headers['Server-Timing']
+    return {m.group(1): float(m.group(2)) for m in entries}
+
+
+def rank(client, headers, query=''):
+    items = [analysis(1, 'Python developer', resume_text='Python Flask developer'),
+             analysis(2, 'Registered nurse')]
+    response = client.post(f'/api/rank_jobs{query}', json={'analyses': items}, headers=headers)
+    assert response.status_code == 200
+    return response
+
+
+def test_rank_jobs_reports_every_stage_that_ran(client, headers, encoder):
+    response = rank(client, headers)
+    timings = stages(response)
+    assert list(timings) == [s for s in STAGES if s in timings] + ['total']
+    for stage in ('auth', 'decode', 'embeddings', 'confidence', 'profession_encode', 'jd_encode',
+                  'cv_encode', 'similarity', 'skills', 'policy', 'sort', 'serialize'):
+        assert stage in timings
+    assert 'rerank' not in timings and 'lexical' not in timings
+    assert abs(timings['total'] - sum(v for k, v in timings.items() if k != 'total')) < 0.1
+    assert response.headers['Timing-Allow-Origin'] == '*'
+    assert all('_timings' not in row for row in response.get_json())
+
+
+def test_debug_timings_are_attached_per_item(client, headers, encoder):
+    rows = rank(client, headers, '?debug=timings').get_json()
+    assert all(set(row['_timings']) <= set(STAGES) for row in rows)
+    assert 'similarity' in rows[0]['_timings']
+
+
+def test_errors_are_timed_too(client, headers):
+    response = client.post('/api/rank_jobs', json=[], headers=headers)
+    assert response.status_code == 400
+    assert set(stages(response)) == {'auth', 'decode', 'serialize', 'total'}
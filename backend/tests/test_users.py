@@ -0,0 +1,45 @@
+"""The materialized user count follows signups and deletes, and seeding reads the row itself."""
+import models
+from conftest import signup
+from extensions import db
+from models import Counter, User, USER_COUNTER, init_db
+
+
+def count(client):
+    response = client.get('/api/users/count')
+    assert response.status_code == 200
+    return response.get_json()['count']
+
+
+def test_count_follows_inserts_and_deletes(app, client):
+    assert count(client) == 2
+    signup(client, 'new@example.com')
+    assert count(client) == 3
+
+    with app.app_context():
+        db.session.delete(User.query.filter_by(email='new@example.com').one())
+        db.session.commit()
+        assert db.session.get(Counter, USER_COUNTER).value == User.query.count() == 2
+    assert count(client) == 2
+
+
+def test_rolled_back_signup_leaves_the_counter_alone(app):
+    with app.app_context():
+        db.session.add(User(name='x', email='x@example.com', password='x'))
+        db.session.flush()
+        db.session.rollback()
+        assert db.session.get(Counter, USER_COUNTER).value == 2
+
+
+def test_init_db_ignores_a_stale_cached_count(app, monkeypatch):
+    with app.app_context():
+        # Rows removed behind the mapper's back, e.g. by another process,
+        # while this one still caches the old count.
+        db.session.execute(db.text("DELETE FROM user"))
+        db.session.execute(db.text("UPDATE counter SET value = 0 WHERE name = :name"), {'name': USER_COUNTER})
+        db.session.commit()
+        monkeypatch.setitem(models._user_count_cache, 'value', 2)
+        monkeypatch.setitem(models._user_count_cache, 'expires', float('inf'))
+
+        init_db()
+        assert User.query.count() == 2
@@ -0,0 +1,59 @@
+"""
+Per-stage request timing, surfaced as a `Server-Timing` header.
+
+Browsers show these durations in the devtools network panel, so a slow
+Ranking load can be attributed to a stage without server access. Stage
+names are fixed so dashboards and clients can rely on them.
+"""
+import time
+from contextlib import contextmanager
+
+# Wall-clock cost of each startup stage, in seconds. Filled in by the app
+# factory and by the lazy NLP loader.
+STARTUP_TIMINGS = {}
+
+# Reported in this order; stages that did not run are omitted.
+STAGES = (
+    'auth', 'decode', 'lexical', 'embeddings', 'confidence', 'profession_encode', 'jd_encode',
+    'cv_encode', 'similarity', 'skills', 'history', 'policy', 'sort', 'rerank', 'serialize',
+)
+
+
+class StageTimer:
+    def __init__(self, debug=False):
+        self.totals = {}
+        # With debug on, per-item stage durations are collected as well and
+        # can be attached to each result row.
+        self.debug = debug
+        self.item = None
+
+    def add(self, stage, seconds):
+        self.totals[stage] = self.totals.get(stage, 0.0) + seconds
+        if self.item is not None:
+            self.item[stage] = self.item.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def start_item(self):
+        self.item = {} if self.debug else None
+
+    def finish_item(self):
+        item, self.item = self.item, None
+        if item is None:
+            return None
+        return {stage: round(seconds * 1000, 3) for stage, seconds in item.items()}
+
+    def header(self):
+        parts = []
+        for stage in STAGES:
+            if stage in self.totals:
+                parts.append(f"{stage};dur={self.totals[stage] * 1000:.2f}")
+        total = sum(self.totals.values())
+        parts.append(f"total;dur={total * 1000:.2f}")
+        return ', '.join(parts)
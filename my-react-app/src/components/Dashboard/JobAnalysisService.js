@@ -1,6 +1,14 @@
 // Service for managing job description analyses
 const STORAGE_KEY = "jobDescriptionAnalyses";
 const RESUME_KEY = "userResumes"; // Per-user active resume store (keyed by email)
+const API_BASE = "http://localhost:5000";
+const SYNC_BATCH = 1000; // server limit per POST /api/analyses
+let pendingSync = null; // in-flight syncPending(), shared by concurrent callers
+
+const authHeaders = () => ({
+  "Content-Type": "application/json",
+  Authorization: `Bearer ${localStorage.getItem("token")}`,
+});
 
 export const JobAnalysisService = {
 
@@ -58,6 +66,9 @@ export const JobAnalysisService = {
 
       const updatedAnalyses = [newAnalysis, ...allAnalyses];
       localStorage.setItem(STORAGE_KEY, JSON.stringify(updatedAnalyses));
+      JobAnalysisService.syncToServer([newAnalysis]).catch((error) =>
+        console.error("Error syncing analysis:", error)
+      );
       return newAnalysis;
     } catch (error) {
       console.error("Error adding analysis:", error);
@@ -65,8 +76,8 @@ export const JobAnalysisService = {
     }
   },
 
-  // Delete an analysis by ID
-  delete: (id) => {
+  // Delete an analysis by ID (locally at once; resolves once the server copy is gone too)
+  delete: async (id) => {
     try {
       const data = localStorage.getItem(STORAGE_KEY);
       let allAnalyses = data ? JSON.parse(data) : [];
@@ -74,6 +85,10 @@ export const JobAnalysisService = {
         (analysis) => analysis.id !== id
       );
       localStorage.setItem(STORAGE_KEY, JSON.stringify(updatedAnalyses));
+      await fetch(`${API_BASE}/api/analyses/${id}`, {
+        method: "DELETE",
+        headers: authHeaders(),
+      }).catch((error) => console.error("Error deleting synced analysis:", error));
       return true;
     } catch (error) {
       console.error("Error deleting analysis:", error);
@@ -81,8 +96,8 @@ export const JobAnalysisService = {
     }
   },
 
-  // Clear all analyses for a specific user
-  clearAll: (userEmail) => {
+  // Clear all analyses for a specific user (locally and on the server)
+  clearAll: async (userEmail) => {
     try {
       const data = localStorage.getItem(STORAGE_KEY);
       let allAnalyses = data ? JSON.parse(data) : [];
@@ -90,6 +105,10 @@ export const JobAnalysisService = {
         (analysis) => analysis.userEmail !== userEmail
       );
       localStorage.setItem(STORAGE_KEY, JSON.stringify(remainingAnalyses));
+      await fetch(`${API_BASE}/api/analyses`, {
+        method: "DELETE",
+        headers: authHeaders(),
+      }).catch((error) => console.error("Error clearing synced analyses:", error));
       return true;
     } catch (error) {
       console.error("Error clearing analyses:", error);
@@ -123,6 +142,82 @@ export const JobAnalysisService = {
     };
   },
 
+  // ─────────────────────────────────────────────────────────────────────────
+  // SERVER HISTORY
+  // Analyses are mirrored to the backend so the History page can search and
+  // page through them server-side. Saving is idempotent per analysis id.
+  // ─────────────────────────────────────────────────────────────────────────
+
+  // Upload analyses to the server (ids it already has are skipped there);
+  // each stored batch is flagged `synced` locally so it is never sent again
+  syncToServer: async (analyses) => {
+    for (let i = 0; i < analyses.length; i += SYNC_BATCH) {
+      const batch = analyses.slice(i, i + SYNC_BATCH);
+      const response = await fetch(`${API_BASE}/api/analyses`, {
+        method: "POST",
+        headers: authHeaders(),
+        body: JSON.stringify({ analyses: batch }),
+      });
+      if (!response.ok) throw new Error(`Sync failed (${response.status})`);
+      JobAnalysisService.markSynced(batch.map((analysis) => analysis.id));
+    }
+  },
+
+  // Upload only the user's analyses not yet flagged as synced
+  syncPending: (userEmail) => {
+    if (!pendingSync) {
+      pendingSync = JobAnalysisService.syncToServer(
+        JobAnalysisService.getAll(userEmail).filter((analysis) => !analysis.synced)
+      ).finally(() => {
+        pendingSync = null;
+      });
+    }
+    return pendingSync;
+  },
+
+  markSynced: (ids) => {
+    try {
+      const data = localStorage.getItem(STORAGE_KEY);
+      const allAnalyses = data ? JSON.parse(data) : [];
+      const synced = new Set(ids);
+      localStorage.setItem(
+        STORAGE_KEY,
+        JSON.stringify(
+          allAnalyses.map((analysis) =>
+            synced.has(analysis.id) ? { ...analysis, synced: true } : analysis
+          )
+        )
+      );
+    } catch (error) {
+      console.error("Error marking analyses synced:", error);
+    }
+  },
+
+  // Label counts over the user's whole server history, in getStats' shape
+  fetchStats: async () => {
+    const response = await fetch(`${API_BASE}/api/analyses/stats`, {
+      headers: authHeaders(),
+    });
+    if (!response.ok) throw new Error(`Stats failed (${response.status})`);
+    return response.json();
+  },
+
+  // Full-text search with score/risk filters; resolves to
+  // { analyses, total, page, perPage, pages }
+  search: async ({ q = "", minScore, maxScore, risk, page = 1, perPage = 20 } = {}) => {
+    const params = new URLSearchParams({ page, per_page: perPage });
+    if (q.trim()) params.set("q", q.trim());
+    if (minScore !== undefined && minScore !== "") params.set("min_score", minScore);
+    if (maxScore !== undefined && maxScore !== "") params.set("max_score", maxScore);
+    if (risk) params.set("risk", risk);
+
+    const response = await fetch(`${API_BASE}/api/analyses?${params}`, {
+      headers: authHeaders(),
+    });
+    if (!response.ok) throw new Error(`Search failed (${response.status})`);
+    return response.json();
+  },
+
   // ─────────────────────────────────────────────────────────────────────────
   // ACTIVE RESUME STORE (per-user, session-scoped)
   // Resume is stored separately from analyses so the user can upload once
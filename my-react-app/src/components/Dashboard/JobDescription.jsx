@@ -3,71 +3,30 @@ import "./JobDescription.css";
 import { Client } from "@gradio/client";
 import JobAnalysisService from "./JobAnalysisService";
 
-// Import file parsing libraries
-import * as pdfjsLib from "pdfjs-dist/build/pdf";
-import mammoth from "mammoth";
-
-// Set up the PDF.js worker (required for it to run in the browser)
-// Using unpkg and the new .mjs extension for PDF.js v4/v5+
-pdfjsLib.GlobalWorkerOptions.workerSrc = `https://unpkg.com/pdfjs-dist@${pdfjsLib.version}/build/pdf.worker.min.mjs`;
 // ─────────────────────────────────────────────────────────────────────────────
-// ROBUST PDF / TEXT / DOCX EXTRACTOR
+// RESUME EXTRACTION (server-side)
 // ─────────────────────────────────────────────────────────────────────────────
+// PDF / DOCX / TXT parsing happens in the backend, which caches the text by
+// file hash, so re-uploading the same file is instant.
 async function extractTextFromFile(file) {
-  const fileExt = file.name.slice(file.name.lastIndexOf(".")).toLowerCase();
-
-  try {
-    // --- PDF Extraction ---
-    if (file.type === "application/pdf" || fileExt === ".pdf") {
-      const arrayBuffer = await file.arrayBuffer();
-      const pdf = await pdfjsLib.getDocument({ data: arrayBuffer }).promise;
-      let fullText = "";
-
-      for (let i = 1; i <= pdf.numPages; i++) {
-        const page = await pdf.getPage(i);
-        const textContent = await page.getTextContent();
-        const pageText = textContent.items.map((item) => item.str).join(" ");
-        fullText += pageText + "\n";
-      }
-
-      if (fullText.trim().length < 20) {
-        throw new Error("Could not extract enough text. Is this a scanned image PDF?");
-      }
-      return fullText.trim();
-    } 
-    
-    // --- DOCX Extraction ---
-    else if (
-      file.type === "application/vnd.openxmlformats-officedocument.wordprocessingml.document" || 
-      fileExt === ".docx"
-    ) {
-      const arrayBuffer = await file.arrayBuffer();
-      const result = await mammoth.extractRawText({ arrayBuffer });
-      if (!result.value || result.value.trim().length < 20) {
-        throw new Error("Could not extract text from this Word document.");
-      }
-      return result.value.trim();
-    } 
-    
-    // --- TXT / Plain Text Extraction ---
-    else {
-      return new Promise((resolve, reject) => {
-        const reader = new FileReader();
-        reader.onload = (e) => {
-          const text = e.target.result;
-          if (!text || text.trim().length < 20) {
-            reject(new Error("File appears to be empty or unreadable."));
-          } else {
-            resolve(text.trim());
-          }
-        };
-        reader.onerror = () => reject(new Error("Failed to read text file."));
-        reader.readAsText(file, "utf-8");
-      });
+  const token = localStorage.getItem("token");
+  const response = await fetch(
+    `http://localhost:5000/api/resume/extract?filename=${encodeURIComponent(file.name)}`,
+    {
+      method: "POST",
+      headers: {
+        "Content-Type": file.type || "application/octet-stream",
+        "Authorization": `Bearer ${token}`
+      },
+      body: file
     }
-  } catch (error) {
-    throw new Error(`Failed to parse file: ${error.message}`);
+  );
+
+  const data = await response.json().catch(() => ({}));
+  if (!response.ok) {
+    throw new Error(`Failed to parse file: ${data.message || response.statusText}`);
   }
+  return data.resumeText;
 }
 
 // ─────────────────────────────────────────────────────────────────────────────
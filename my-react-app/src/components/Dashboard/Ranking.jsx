@@ -2,6 +2,52 @@ import React, { useState, useEffect } from "react";
 import "./Ranking.css";
 import JobAnalysisService from "./JobAnalysisService";
 
+// gzip the request body when the browser supports CompressionStream; the
+// history upload is mostly repetitive text and shrinks several-fold.
+const encodeBody = async (payload) => {
+  const json = JSON.stringify(payload);
+  if (typeof CompressionStream === "undefined") {
+    return { body: json, headers: {} };
+  }
+  const stream = new Blob([json]).stream().pipeThrough(new CompressionStream("gzip"));
+  const body = await new Response(stream).arrayBuffer();
+  return { body, headers: { "Content-Encoding": "gzip" } };
+};
+
+const API_BASE = "http://localhost:5000";
+
+const sha256Hex = async (text) => {
+  const digest = await crypto.subtle.digest("SHA-256", new TextEncoder().encode(text));
+  return Array.from(new Uint8Array(digest))
+    .map((b) => b.toString(16).padStart(2, "0"))
+    .join("");
+};
+
+// Replace the large texts with their SHA-256 so repeat rankings only send
+// hashes. Returns the slim items plus hash -> text and hash -> kind maps for
+// re-uploads (the backend only search-indexes job descriptions).
+const toHashedAnalyses = async (analyses) => {
+  const texts = new Map();
+  const kinds = new Map();
+  const items = await Promise.all(
+    analyses.map(async (a) => {
+      const item = { id: a.id, confidence: a.confidence };
+      if (a.jobDescription) {
+        item.jd_hash = await sha256Hex(a.jobDescription);
+        texts.set(item.jd_hash, a.jobDescription);
+        kinds.set(item.jd_hash, "jd");
+      }
+      if (a.resumeText) {
+        item.resume_hash = await sha256Hex(a.resumeText);
+        texts.set(item.resume_hash, a.resumeText);
+        if (!kinds.has(item.resume_hash)) kinds.set(item.resume_hash, "resume");
+      }
+      return item;
+    })
+  );
+  return { items, texts, kinds };
+};
+
 const Ranking = ({ user }) => {
   const [rankedJobs, setRankedJobs] = useState([]);
   const [loading, setLoading] = useState(true);
@@ -23,18 +69,43 @@ const Ranking = ({ user }) => {
         }
 
         const token = localStorage.getItem("token");
-        const response = await fetch("http://localhost:5000/api/rank_jobs", {
-          method: "POST",
-          headers: {
-            "Content-Type": "application/json",
-            Authorization: `Bearer ${token}`,
-          },
-          body: JSON.stringify({ analyses: localAnalyses }),
-        });
+        const postJson = async (path, payload) => {
+          const { body, headers } = await encodeBody(payload);
+          return fetch(`${API_BASE}${path}`, {
+            method: "POST",
+            headers: {
+              "Content-Type": "application/json",
+              Authorization: `Bearer ${token}`,
+              ...headers,
+            },
+            body,
+          });
+        };
+
+        let response;
+        if (window.crypto?.subtle) {
+          const { items, texts, kinds } = await toHashedAnalyses(localAnalyses);
+          response = await postJson("/api/rank_jobs", { analyses: items });
+
+          // First sight of some texts: upload just those once, then retry.
+          if (response.status === 409) {
+            const { missing = [] } = await response.json();
+            await postJson("/api/blobs", {
+              texts: missing.map((h) => texts.get(h)),
+              kinds: missing.map((h) => kinds.get(h)),
+            });
+            response = await postJson("/api/rank_jobs", { analyses: items });
+          }
+        } else {
+          response = await postJson("/api/rank_jobs", { analyses: localAnalyses });
+        }
 
         if (response.ok) {
+          // The backend returns only ids + scores; join them back onto the
+          // locally stored analyses for display.
           const data = await response.json();
-          setRankedJobs(data);
+          const byId = new Map(localAnalyses.map((a) => [a.id, a]));
+          setRankedJobs(data.map((scores) => ({ ...byId.get(scores.id), ...scores })));
         }
       } catch (err) {
         console.error("Ranking fetch error:", err);
@@ -2,34 +2,90 @@ import React, { useEffect, useState } from "react";
 import "./Results.css";
 import JobAnalysisService from "./JobAnalysisService";
 
+const PAGE_SIZE = 20;
+const SEARCH_DEBOUNCE_MS = 300;
+
 function Results({ user, jobDescriptionData }) {
   const [analyses, setAnalyses] = useState([]);
   const [stats, setStats] = useState(null);
   const [selectedAnalysis, setSelectedAnalysis] = useState(null);
 
-  const loadAnalyses = () => {
-    if (user?.email) {
+  // ── Server-side search state ──────────────────────────────────────────────
+  const [query, setQuery] = useState("");
+  const [minScore, setMinScore] = useState("");
+  const [risk, setRisk] = useState("");
+  const [page, setPage] = useState(1);
+  const [pages, setPages] = useState(1);
+  const [matches, setMatches] = useState(0);
+  const [offline, setOffline] = useState(false);
+
+  // Counts ignore the filters, so they are only refetched when the history
+  // itself changes, not on every search or page.
+  const loadStats = async () => {
+    if (!user?.email) return;
+    try {
+      // Mirror anything not on the server yet (saved offline, or before
+      // server history existed); already-synced analyses are not resent.
+      await JobAnalysisService.syncPending(user.email);
+      setStats(await JobAnalysisService.fetchStats());
+    } catch (error) {
+      console.error("Error loading stats:", error);
+      setStats(JobAnalysisService.getStats(user.email));
+    }
+  };
+
+  const loadAnalyses = async () => {
+    if (!user?.email) return;
+    try {
+      await JobAnalysisService.syncPending(user.email);
+      const data = await JobAnalysisService.search({
+        q: query,
+        minScore,
+        risk,
+        page,
+        perPage: PAGE_SIZE,
+      });
+      setAnalyses(data.analyses);
+      setMatches(data.total);
+      setPages(Math.max(data.pages, 1));
+      setOffline(false);
+    } catch (error) {
+      // Backend unreachable: fall back to the full local list, unfiltered.
+      console.error("Error searching analyses:", error);
       const allAnalyses = JobAnalysisService.getAll(user.email);
-      const statistics = JobAnalysisService.getStats(user.email);
       setAnalyses(allAnalyses);
-      setStats(statistics);
+      setMatches(allAnalyses.length);
+      setPages(1);
+      setOffline(true);
     }
   };
 
   useEffect(() => {
-    loadAnalyses();
+    loadStats();
   }, [jobDescriptionData, user]);
 
-  const handleDelete = (id) => {
+  useEffect(() => {
+    const timer = setTimeout(loadAnalyses, SEARCH_DEBOUNCE_MS);
+    return () => clearTimeout(timer);
+  }, [jobDescriptionData, user, query, minScore, risk, page]);
+
+  // Any filter change starts again from the first page.
+  useEffect(() => {
+    setPage(1);
+  }, [query, minScore, risk]);
+
+  const handleDelete = async (id) => {
     if (window.confirm("Are you sure you want to delete this analysis?")) {
-      JobAnalysisService.delete(id);
+      await JobAnalysisService.delete(id);
+      loadStats();
       loadAnalyses();
     }
   };
 
-  const handleClearAll = () => {
+  const handleClearAll = async () => {
     if (window.confirm("Are you sure you want to clear all analyses?")) {
-      JobAnalysisService.clearAll(user?.email);
+      await JobAnalysisService.clearAll(user?.email);
+      loadStats();
       loadAnalyses();
     }
   };
@@ -51,7 +107,7 @@ function Results({ user, jobDescriptionData }) {
     return "Weak Match";
   };
 
-  if (analyses.length === 0) {
+  if (!stats || stats.total === 0) {
     return (
       <div className="results-container">
         <div className="results-content">
@@ -84,6 +140,45 @@ function Results({ user, jobDescriptionData }) {
           </button>
         </div>
 
+        {/* ── Search & Filters ─────────────────────────────────────────── */}
+        <div className="history-search">
+          <input
+            type="search"
+            className="history-search-input"
+            placeholder="Search job descriptions and resume file names…"
+            value={query}
+            onChange={(e) => setQuery(e.target.value)}
+            disabled={offline}
+          />
+          <input
+            type="number"
+            className="history-search-score"
+            placeholder="Min real %"
+            min="0"
+            max="100"
+            value={minScore}
+            onChange={(e) => setMinScore(e.target.value)}
+            disabled={offline}
+          />
+          <select
+            className="history-search-risk"
+            value={risk}
+            onChange={(e) => setRisk(e.target.value)}
+            disabled={offline}
+          >
+            <option value="">Any risk</option>
+            <option value="low">Low risk</option>
+            <option value="high">High risk</option>
+          </select>
+          <span className="history-search-count">
+            {offline ? "Offline – showing local history" : `${matches} found`}
+          </span>
+        </div>
+
+        {analyses.length === 0 && (
+          <div className="no-matches">No analyses match your search.</div>
+        )}
+
         {/* ── Grid ─────────────────────────────────────────────────────── */}
         <div className="analyses-grid">
           {analyses.map((analysis) => {
@@ -212,6 +307,21 @@ function Results({ user, jobDescriptionData }) {
           })}
         </div>
 
+        {/* ── Pagination ───────────────────────────────────────────────── */}
+        {pages > 1 && (
+          <div className="history-pagination">
+            <button onClick={() => setPage(page - 1)} disabled={page <= 1}>
+              ← Previous
+            </button>
+            <span>
+              Page {page} of {pages}
+            </span>
+            <button onClick={() => setPage(page + 1)} disabled={page >= pages}>
+              Next →
+            </button>
+          </div>
+        )}
+
         {/* ── Detailed Modal ────────────────────────────────────────────── */}
         {selectedAnalysis && (
           <div className="modal-overlay" onClick={handleCloseModal}>